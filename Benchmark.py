@@ -0,0 +1,580 @@
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from StatementParser import MyLexer
+
+
+# 计时工具：重复执行若干次取最短耗时，减少系统抖动的影响
+def best_time(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        cost = time.perf_counter() - start
+        if best is None or cost < best: best = cost
+    return best
+
+
+# 生成大量注释的UDIL程序：单行注释、多行注释、行尾注释以及含注释符号的文本常量交替出现
+def commented_program(lines):
+    pattern = [
+        "// 单行注释：声明变量 v{i}",
+        "int v{i} = {i}; // 行尾注释",
+        "/* 多行注释开始 {i}",
+        "   多行注释中的 // 不是单行注释",
+        "*/ v{i} = v{i} + 1; /* 行内注释 */ text t{i} = \"//not a comment {i}\";",
+    ]
+    result = []
+    for i in range(lines):
+        result.append(pattern[i % len(pattern)].format(i=i - i % len(pattern)))
+    return "\n".join(result) + "\n"
+
+
+# 注释处理基准：注释在词法分析时丢弃，耗时应随行数线性增长
+def bench_comments(sizes=(12500, 25000, 50000)):
+    lexer = MyLexer()
+    lexer.debug = False
+    lexer.build()
+    print("注释处理（词法分析）基准：")
+    print("%10s %10s %12s %14s" % ("行数", "词法单元", "耗时(s)", "每行耗时(us)"))
+    base = None
+    for lines in sizes:
+        data = commented_program(lines)
+        count = len(lexer.exec(data))
+        cost = best_time(lambda: lexer.exec(data))
+        per_line = cost / lines * 1e6
+        if base is None: base = per_line
+        print("%10d %10d %12.4f %14.3f  (x%.2f)" % (lines, count, cost, per_line, per_line / base))
+
+
+# 导入耗时预算（秒）：解释器按任务启动，导入耗时直接计入每个任务的延迟
+import_budget = 0.15
+
+# 在全新的解释器进程中导入CodeCompiler，记录导入耗时、首次取得语法分析器的耗时、导入时的输出以及已载入的重量级模块
+import_probe = '''
+import io, sys, time, contextlib
+out = io.StringIO()
+start = time.perf_counter()
+with contextlib.redirect_stdout(out):
+    import CodeCompiler
+imported = time.perf_counter()
+CodeCompiler.get_parser()
+ready = time.perf_counter()
+heavy = [m for m in ("jpype", "turtle", "tkinter") if m in sys.modules]
+print(imported - start, ready - imported, len(out.getvalue()), ",".join(heavy) or "-")
+'''
+
+
+# 冷启动基准：导入应当没有副作用，Java桥接、绘图与文法构建均推迟到首次使用
+def bench_import(repeat=5):
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", import_probe], cwd=here, capture_output=True, text=True)
+        cost, parser_cost, printed, heavy = output.stdout.split()
+        results.append((float(cost), float(parser_cost), int(printed), heavy))
+    cost = min(r[0] for r in results)
+    parser_cost = min(r[1] for r in results)
+    print("冷启动（导入）基准：")
+    print("导入CodeCompiler耗时：%.4fs（预算 %.2fs，%s）" % (cost, import_budget,
+                                                  "符合预算" if cost <= import_budget else "超出预算"))
+    print("首次取得语法分析器耗时：%.4fs" % parser_cost)
+    print("导入时输出字符数：%d" % results[0][2])
+    print("导入时载入的重量级模块：%s" % results[0][3])
+
+
+# 调度基准：若干长循环程序与一批短程序一起调度，短程序的完成延迟不应随长循环数量增长
+def bench_scheduler(loops=(0, 2, 8), shorts=50, quota=100):
+    from CodeCompiler import Interpreter, MySymbolTable, Scheduler
+    short_program = "int a = 0;\nwhile (a < 20) {\na = a + 1;\n}\nint b = a * 2;\n"
+    long_program = "int a = 0;\nwhile (a < 100000) {\na = a + 1;\n}\n"
+
+    def interpreter(text):
+        result = Interpreter(MySymbolTable(), engine="vm")
+        result.debug = False
+        result.print_text = False
+        result.parse_program(text)
+        return result
+
+    print("多程序调度基准（配额 %d 条语句）：" % quota)
+    print("%8s %14s %14s %14s" % ("长循环数", "短程序p50(s)", "短程序p99(s)", "长循环CPU(s)"))
+    for count in loops:
+        scheduler = Scheduler(quota)
+        for i in range(count): scheduler.add(interpreter(long_program), name="loop-" + str(i))
+        programs = [scheduler.add(interpreter(short_program), name="short-" + str(i)) for i in range(shorts)]
+        for program in programs: program.submitted = time.perf_counter()
+        scheduler.run()
+        latency = sorted(program.latency() for program in programs)
+        loop_cpu = sum(program.cpu_time for program in scheduler.programs if program not in programs)
+        print("%8d %14.4f %14.4f %14.4f" % (count, latency[len(latency) // 2], latency[len(latency) * 99 // 100],
+                                            loop_cpu))
+
+
+# 优化基准程序：循环中含常量表达式、循环不变表达式、条件为常量的分支以及无用的表达式语句
+optimizer_program = """int n = 50000;
+int i = 0;
+int s = 0;
+int k = 7;
+while (i < n) {
+s = s + k * 3 + (k - 1) * 2 * (60 * 60 - 1);
+if (1 < 2) {
+s = s + 1;
+} else {
+s = s - 1;
+}
+s + k;
+i = i + 1;
+}
+"""
+
+
+# 优化遍基准：分别只启用单个优化遍、全部启用与全部关闭，比较两种执行引擎的执行耗时，并检查结果一致
+def bench_optimizer(engines=("tree", "vm")):
+    from CodeCompiler import Interpreter, MySymbolTable
+    from Optimizer import PassManager
+    names = [p.name for p in PassManager().passes]
+    configs = [("none", [])] + [(name, [name]) for name in names] + [("all", names)]
+
+    def run(engine, enabled):
+        optimizer = PassManager()
+        for name in names: optimizer.enable(name, name in enabled)
+        result = Interpreter(MySymbolTable(), engine=engine)
+        result.debug = False
+        result.print_text = False
+        result.optimizer = optimizer
+        result.parse_program(optimizer_program)
+        start = time.perf_counter()
+        result.exec_root()
+        return time.perf_counter() - start, result.symbol_table.lookup("s"), optimizer.stats
+
+    print("优化遍基准：")
+    print("%8s %18s %12s %10s  %s" % ("引擎", "启用的优化遍", "耗时(s)", "加速比", "处理数"))
+    for engine in engines:
+        base, expected = None, None
+        for label, enabled in configs:
+            cost, value, stats = min(run(engine, enabled) for _ in range(3))
+            if base is None: base, expected = cost, value
+            print("%8s %18s %12.4f %10.2f  %s%s" % (engine, label, cost, base / cost,
+                                                  sum(stats.values()), "" if value == expected else "  结果不一致！"))
+
+
+# 性能分析基准：比较不启用与启用语句级性能分析时的执行耗时，并输出最耗时的语句
+def bench_profiler(engines=("tree", "vm")):
+    from CodeCompiler import Interpreter, MySymbolTable
+    from Profiler import Profiler
+
+    def run(engine, profiler):
+        result = Interpreter(MySymbolTable(), engine=engine)
+        result.debug = False
+        result.print_text = False
+        result.parse_program(optimizer_program)
+        if profiler: result.set_profiler(profiler)
+        start = time.perf_counter()
+        result.exec_root()
+        return time.perf_counter() - start
+
+    print("性能分析基准：")
+    for engine in engines:
+        plain = min(run(engine, None) for _ in range(3))
+        profiler = Profiler()
+        profiled = run(engine, profiler)
+        print("%s引擎：不分析 %.4fs，分析 %.4fs（x%.2f）" % (engine, plain, profiled, profiled / plain))
+        print(profiler.report(limit=5))
+
+
+# 诊断输出基准：解释器保持默认的调试与语句打印开关，比较输出到标准输出、只收集错误与关闭输出时的耗时
+def bench_diagnostics(iterations=3000):
+    from CodeCompiler import Interpreter, MySymbolTable
+    from Diagnostics import diagnostics, ERROR
+    program = ("int a = 1;\nint i = 0;\nwhile (i < %d) {\ni = i + 1;\nb = a;\n}\n") % iterations
+
+    def run():
+        result = Interpreter(MySymbolTable())
+        result.parse_program(program)
+        result.exec_root()
+
+    def printed():
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): run()
+
+    def collected():
+        with diagnostics.collect(ERROR): run()
+
+    def disabled():
+        saved = diagnostics.sinks
+        diagnostics.set_sinks()
+        try:
+            run()
+        finally:
+            diagnostics.sinks = saved
+            diagnostics.refresh()
+
+    print("诊断输出基准（每次迭代一次符号查找失败）：")
+    for label, func in (("标准输出", printed), ("只收集错误", collected), ("关闭输出", disabled)):
+        print("%10s %10.4fs" % (label, best_time(func)))
+
+
+# 生成含各类语句的UDIL程序，用于词法分析与语法分析基准，返回程序文本与语句数
+def generated_program(statements):
+    pattern = [
+        "int v{i} = {i} * 2 + 1;",
+        "real r{i} = v{i} / 3.5 - (v{i} + 2) * 0.5;",
+        "text t{i} = \"item\" + \"{i}\";",
+        "list l{i} = [v{i}, r{i}, t{i}, [1, 2, 3]];",
+        "if (v{i} > 10) {{\nv{i} = v{i} - 1;\n}} else {{\nv{i} = v{i} + 1;\n}}",
+        "while (v{i} < 5) {{\nv{i} = v{i} + 1;\n}}",
+        "v{i} = l{i}[0] + l{i}[3][1];",
+    ]
+    lines = []
+    for i in range(statements):
+        lines.append(pattern[i % len(pattern)].format(i=i - i % len(pattern)))
+    return "\n".join(lines) + "\n", statements
+
+
+# 生成深度为 depth 的嵌套表达式文本，交替使用加减乘与括号
+def deep_expression(depth):
+    text = "a"
+    for i in range(depth):
+        text = "(" + text + " " + "+-*"[i % 3] + " " + str(i % 7 + 1) + ")"
+    return text
+
+
+# 基准解释器：关闭调试输出与语句打印
+def quiet_interpreter(engine="tree"):
+    from CodeCompiler import Interpreter, MySymbolTable
+    result = Interpreter(MySymbolTable(), engine=engine)
+    result.debug = False
+    result.print_text = False
+    return result
+
+
+# 各基准负载：返回 (语句数, 执行一次的函数)，语句数为一次执行处理的语句（或表达式求值）数
+def workload_lexer(statements=20000):
+    lexer = MyLexer()
+    lexer.debug = False
+    lexer.build()
+    data, count = generated_program(statements)
+    return count, lambda: lexer.exec(data)
+
+
+def workload_parser(statements=5000):
+    from CodeCompiler import get_parser
+    parser = get_parser()
+    data, count = generated_program(statements)
+    return count, lambda: parser.exec(data)
+
+
+def workload_parser_exec(statements=5000):
+    from CodeCompiler import get_parser
+    parser = get_parser()
+    data, count = generated_program(statements)
+    return count, lambda: parser.exec(data, tree=False)
+
+
+def workload_expression(depth=200, evaluations=2000):
+    interpreter = quiet_interpreter()
+    interpreter.parse_program("int a = 3;\nreal x = " + deep_expression(depth) + ";\n")
+    interpreter.exec_root()
+    expression = interpreter.root.statements[1].expression
+    parser = interpreter.expression_parser
+
+    def run():
+        for _ in range(evaluations): parser.parser_exp(expression)
+
+    return evaluations, run
+
+
+def loop_workload(engine, iterations):
+    program = ("int n = %d;\nint i = 0;\nint s = 0;\nwhile (i < n) {\ns = s + i * 2;\n"
+               "if (s > 1000000) {\ns = s - 1000000;\n}\ni = i + 1;\n}\n") % iterations
+
+    def run():
+        interpreter = quiet_interpreter(engine)
+        interpreter.parse_program(program)
+        interpreter.exec_root()
+
+    return 4 + iterations * 3, run
+
+
+def workload_loop_tree(iterations=50000):
+    return loop_workload("tree", iterations)
+
+
+def workload_loop_vm(iterations=50000):
+    return loop_workload("vm", iterations)
+
+
+def workload_list(size=20000, iterations=20000):
+    program = ("list l = [" + ", ".join(str(i % 97) for i in range(size)) + "];\n"
+               "int i = 0;\nint s = 0;\nwhile (i < %d) {\ns = s + l[i];\ni = i + 1;\n}\n") % iterations
+
+    def run():
+        interpreter = quiet_interpreter("vm")
+        interpreter.parse_program(program)
+        interpreter.exec_root()
+
+    return 4 + iterations * 2, run
+
+
+def sync_workload(backend, program, calls):
+    source = program + ("int b = 0;\nint i = 0;\nsync(\"context-in\", \"a\") = 41;\nsync(\"context-out\", \"a\") = 0;\n"
+                        "while (i < %d) {\nsync(\"program\", \"%s\") = code;\nb = sync(\"context-out\", \"a\");\n"
+                        "i = i + 1;\n}\n") % (calls, backend)
+
+    def run():
+        interpreter = quiet_interpreter()
+        interpreter.parse_program(source)
+        interpreter.exec_root()
+
+    return 6 + calls * 3, run
+
+
+def workload_sync_python(calls=2000):
+    return sync_workload("python", "text code = \"a = a + 1\";\n", calls)
+
+
+def workload_sync_udil(calls=2000):
+    return sync_workload("udil", "code{\na = a + 1;\n}\n", calls)
+
+
+workloads = {
+    "lexer": workload_lexer,
+    "parser": workload_parser,
+    "parser-exec": workload_parser_exec,
+    "expression": workload_expression,
+    "loop-tree": workload_loop_tree,
+    "loop-vm": workload_loop_vm,
+    "list": workload_list,
+    "sync-python": workload_sync_python,
+    "sync-udil": workload_sync_udil,
+}
+
+
+# 执行一个负载：耗时取多次执行的最短时间，峰值内存在单独一次执行中由 tracemalloc 统计，执行中的输出丢弃
+def measure(workload, repeat=3):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        statements, run = workload()
+        cost = best_time(run, repeat)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"statements": statements, "seconds": cost, "statements_per_second": statements / cost,
+            "peak_memory_kb": peak / 1024}
+
+
+# 基准套件：执行各负载并输出每秒语句数与峰值内存；save 保存结果作为基线，compare 与已保存的基线对比
+def bench_suite(names=None, save=None, compare=None):
+    baseline = {}
+    if compare and os.path.exists(compare):
+        with open(compare, encoding="utf-8") as file: baseline = json.load(file)
+    results = {}
+    print("基准套件：")
+    print("%-12s %10s %10s %14s %14s  %s" % ("负载", "语句数", "耗时(s)", "语句/秒", "峰值内存(KB)", "与基线对比"))
+    for name in names or list(workloads):
+        result = measure(workloads[name])
+        results[name] = result
+        diff = ""
+        if name in baseline:
+            old = baseline[name]
+            diff = "速度 %+.1f%%，内存 %+.1f%%" % (
+                (result["statements_per_second"] / old["statements_per_second"] - 1) * 100,
+                (result["peak_memory_kb"] / max(old["peak_memory_kb"], 1e-9) - 1) * 100)
+        print("%-12s %10d %10.4f %14.0f %14.1f  %s" % (name, result["statements"], result["seconds"],
+                                                     result["statements_per_second"], result["peak_memory_kb"], diff))
+    if save:
+        with open(save, "w", encoding="utf-8") as file: json.dump(results, file, indent=2, sort_keys=True)
+        print("结果已保存为基线：" + save)
+    return results
+
+
+# 增量解析基准：大程序首次解析后修改其中一行再次解析，只有修改过的语句重新进行语法分析
+def bench_reparse(sizes=(2000, 8000, 32000)):
+    from CodeCompiler import Interpreter, MySymbolTable
+    print("增量解析基准：")
+    print("%10s %14s %14s %10s %10s" % ("语句数", "首次解析(s)", "修改后解析(s)", "复用", "重新分析"))
+    for size in sizes:
+        data, _ = generated_program(size)
+        lines = data.split("\n")
+        middle = len(lines) // 2
+        interpreter = Interpreter(MySymbolTable())
+        start = time.perf_counter()
+        interpreter.parse_program(data)
+        cold = time.perf_counter() - start
+        lines[middle] = lines[middle].replace("1", "2")
+        lines.insert(middle, "// 编辑器插入的注释")
+        edited = "\n".join(lines)
+        start = time.perf_counter()
+        interpreter.parse_program(edited)
+        warm = time.perf_counter() - start
+        cache = interpreter.statement_cache
+        print("%10d %14.4f %14.4f %10d %10d" % (size, cold, warm, cache.reused, cache.parsed))
+
+
+
+# 生成嵌套深度为 depth 的程序：if 与 while 交替嵌套，每层有一条赋值语句
+def nested_program(depth):
+    lines = ["int a = 0;"]
+    for i in range(depth):
+        lines.append(("if (a < %d) {" if i % 2 == 0 else "while (a < %d) {") % (i + 1))
+        lines.append("a = a + 1;")
+    lines.append("}" * depth)
+    return "\n".join(lines) + "\n"
+
+
+def bench_nesting(depths=(500, 1000, 2000), size=5000):
+    from CodeCompiler import get_parser
+    parser = get_parser()
+    print("嵌套语句解析基准：")
+    print("%10s %14s %16s" % ("嵌套深度", "解析(s)", "显示全部文本(s)"))
+    for depth in depths:
+        data = nested_program(depth)
+        parse = best_time(lambda: parser.exec(data, quiet=True, tree=False))
+        statements = parser.exec(data, quiet=True, tree=False)
+        render = best_time(lambda: [s.text for s in statements], 1)
+        print("%10d %14.4f %16.4f" % (depth, parse, render))
+    data, count = generated_program(size)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = parser.exec(data, quiet=True, tree=False)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print("语法分析结果占用内存：%d 条语句，共 %.1f KB，每条语句 %.0f 字节" % (count, retained / 1024, retained / count))
+    del result
+
+
+
+# 语法分析规模基准：分析时间应与语句数成线性关系，每条语句的耗时基本不随程序规模变化
+def bench_scaling(sizes=(25000, 50000, 100000)):
+    from CodeCompiler import get_parser
+    parser = get_parser()
+    print("语法分析规模基准：")
+    print("%10s %14s %16s %14s %16s" % ("语句数", "只构建语句(s)", "每条语句(us)", "构建语法树(s)", "每条语句(us)"))
+    for size in sizes:
+        data, count = generated_program(size)
+        start = time.perf_counter()
+        statements = parser.exec(data, quiet=True, tree=False)
+        exec_only = time.perf_counter() - start
+        assert len(statements) == count
+        del statements
+        start = time.perf_counter()
+        node = parser.exec(data, quiet=True)
+        tree = time.perf_counter() - start
+        assert len(node.child) == count
+        del node
+        print("%10d %14.4f %16.2f %14.4f %16.2f" % (count, exec_only, exec_only / count * 1e6, tree,
+                                                    tree / count * 1e6))
+
+
+
+# 预编译文件基准：解析源代码与载入预编译文件（.udilc）的耗时对比
+def bench_compiled(sizes=(2000, 8000, 32000)):
+    import tempfile
+    from CodeCompiler import Interpreter, MySymbolTable, compiled_path
+    print("预编译文件基准：")
+    print("%10s %14s %14s %14s %14s" % ("语句数", "解析源代码(s)", "载入预编译(s)", "源文件(KB)", "预编译(KB)"))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            data, count = generated_program(size)
+            path = os.path.join(directory, "program%d.udil" % size)
+            with open(path, "w", encoding="utf-8") as file: file.write(data)
+            interpreter = Interpreter(MySymbolTable())
+            start = time.perf_counter()
+            interpreter.parse_file(path)
+            cold = time.perf_counter() - start
+            warm = best_time(lambda: Interpreter(MySymbolTable()).parse_file(path))
+            print("%10d %14.4f %14.4f %14.1f %14.1f" % (count, cold, warm, os.path.getsize(path) / 1024,
+                                                         os.path.getsize(compiled_path(path)) / 1024))
+
+
+
+# 列表构建基准：在循环中按下标逐个追加元素，每个元素的耗时应不随列表长度增长
+def bench_lists(sizes=(5000, 20000, 80000), engines=("tree", "vm")):
+    print("列表构建基准：")
+    print("%8s %10s %12s %14s" % ("引擎", "元素数", "耗时(s)", "每个元素(us)"))
+    for engine in engines:
+        for size in sizes:
+            program = "list l;\nint i = 0;\nwhile (i < %d) {\nl[i] = i;\ni = i + 1;\n}\n" % size
+            interpreter = quiet_interpreter(engine)
+            interpreter.parse_program(program)
+            start = time.perf_counter()
+            interpreter.exec_root()
+            cost = time.perf_counter() - start
+            assert len(interpreter.symbol_table.read("l")) == size
+            print("%8s %10d %12.4f %14.2f" % (engine, size, cost, cost / size * 1e6))
+
+
+# 循环体中声明临时变量：每次迭代进入新的作用域，作用域帧从帧池中取得并复用
+def bench_frames(iterations=(5000, 20000, 80000), engines=("tree", "vm")):
+    print("循环作用域基准：")
+    print("%8s %10s %12s %14s" % ("引擎", "迭代次数", "耗时(s)", "每次迭代(us)"))
+    for engine in engines:
+        for count in iterations:
+            program = ("int s = 0;\nint i = 0;\nwhile (i < %d) {\nint t = i * 2;\nreal r = t / 2.0;\n"
+                       "if (t > 10) {\nint u = t - 10;\ns = s + 1;\n}\ni = i + 1;\n}\n" % count)
+            interpreter = quiet_interpreter(engine)
+            interpreter.parse_program(program)
+            start = time.perf_counter()
+            interpreter.exec_root()
+            cost = time.perf_counter() - start
+            assert interpreter.symbol_table.read("s") == max(count - 6, 0)
+            print("%8s %10d %12.4f %14.2f" % (engine, count, cost, cost / count * 1e6))
+
+
+# 目标类型未知的表达式：文本与列表变量作为循环中的条件、同步语句的键，类型推导后只按一种模式求值
+def bench_types(iterations=(5000, 20000), engines=("tree", "vm")):
+    print("静态类型基准：")
+    print("%8s %10s %12s %14s" % ("引擎", "迭代次数", "耗时(s)", "每次迭代(us)"))
+    for engine in engines:
+        for count in iterations:
+            program = ("text flag = \"on\";\nlist items = [1, 2];\nreal total = 0.0;\nint i = 0;\n"
+                       "while (i < %d) {\nif (flag) {\ntotal = total + i;\n}\nif (items) {\ntotal = total - 0.5;\n}\n"
+                       "sync(\"context-out-clear\", \"total\") = total;\ni = i + 1;\n}\n" % count)
+            interpreter = quiet_interpreter(engine)
+            interpreter.parse_program(program)
+            start = time.perf_counter()
+            interpreter.exec_root()
+            cost = time.perf_counter() - start
+            assert interpreter.symbol_table.read("i") == count
+            print("%8s %10d %12.4f %14.2f" % (engine, count, cost, cost / count * 1e6))
+
+
+benchmarks = {
+    "comments": bench_comments,
+    "import": bench_import,
+    "scheduler": bench_scheduler,
+    "optimizer": bench_optimizer,
+    "profiler": bench_profiler,
+    "diagnostics": bench_diagnostics,
+    "reparse": bench_reparse,
+    "nesting": bench_nesting,
+    "scaling": bench_scaling,
+    "compiled": bench_compiled,
+    "lists": bench_lists,
+    "frames": bench_frames,
+    "types": bench_types,
+    "suite": bench_suite,
+}
+
+baseline_path = "benchmark_baseline.json"  # 默认的基线文件
+
+# 用法：python Benchmark.py [基准名...]
+#      python Benchmark.py suite [负载名...] [--save [文件]] [--compare [文件]]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--save", "--compare"):
+        if flag in args:
+            i = args.index(flag)
+            given = (i + 1 < len(args)) and not args[i + 1].startswith("--") and (args[i + 1] not in workloads)
+            options[flag[2:]] = args[i + 1] if given else baseline_path
+            del args[i:i + (2 if given else 1)]
+    if args and args[0] == "suite":
+        bench_suite(args[1:], **options)
+    else:
+        for name in args or list(benchmarks):
+            benchmarks[name]()
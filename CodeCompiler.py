@@ -1,41 +1,135 @@
 import json
-from ply import lex, yacc
 from StatementParser import *
 import subprocess
+import re
+import hashlib
+import pickle
+import threading
 import os
-import jpype
+import sys
+import io
+import contextlib
+import queue
+import traceback
+import time
+import zlib
+import atexit
+import shutil
+import tempfile
+
+from Diagnostics import diagnostics, DEBUG, TEXT
+
+
+# 未定义标记：作用域布局中已预留但尚未声明的槽位，以及查找失败的结果
+class Undefined:
+    # 序列化后载入时仍为同一个标记对象
+    def __reduce__(self):
+        return "UNDEFINED"
+
+
+UNDEFINED = Undefined()
+
+
+# 列表值：写时复制的列表。refs 为持有该列表的位置（变量、列表元素、同步上下文）的个数，只增不减；
+# 持有者多于一个时，按索引赋值先复制再修改，其余持有者的值不受影响。
+# 下标超出长度时原地扩展，在循环中逐个追加元素的总耗时与元素个数成线性关系
+class ListValue(list):
+    __slots__ = ('refs',)
+
+    def __init__(self, elements=()):
+        super().__init__(elements)
+        self.refs = 0
+
+
+# 值被保存到变量、列表元素或同步上下文中时调用，列表值增加一个持有者
+def hold(value):
+    if type(value) is ListValue: value.refs += 1
+    return value
+
+
+# 由列表表达式求得的元素构建列表值
+def list_value(elements):
+    result = ListValue(elements)
+    for element in result: hold(element)
+    return result
+
+
+# 返回可以原地修改的列表：只有一个持有者时为原列表，否则（包括后端程序返回的普通列表）为副本，
+# 副本中的子列表各增加一个持有者
+def own_list(value):
+    if (type(value) is ListValue) and (value.refs <= 1): return value
+    result = list_value(value)
+    result.refs = 1
+    return result
 
 
 class MySymbolTable:
-    def __init__(self):
-        self.table = {}  # 符号表的主体，使用字典存储
-        self.parent = None  # 父母级符号表，应对多级作用域
+    __slots__ = ('slots', 'types', 'values', 'parent', 'brother', 'layout')
+
+    def __init__(self, layout=None, parent=None):
+        self.slots = {}  # 符号表的主体，名称 -> 槽位下标
+        self.types = []  # 各槽位的类型
+        self.values = []  # 各槽位的值，未声明的槽位为 UNDEFINED
+        self.parent = parent  # 父母级符号表，应对多级作用域
         self.brother = []  # 兄弟级符号表，应对函数作用域
+        self.layout = None  # 静态作用域布局（Scope），插入布局以外的符号后置为None
+        if layout is not None: self.adopt(layout)
+
+    # 按静态作用域布局预留槽位，父符号表的布局与外层作用域不一致时不采用布局
+    def adopt(self, layout):
+        if (layout.parent is not None) and ((self.parent is None) or (self.parent.layout is not layout.parent)):
+            return
+        self.types.extend([None] * (layout.size - len(self.types)))
+        self.values.extend([UNDEFINED] * (layout.size - len(self.values)))
+        self.layout = layout
 
     # 插入符号，返回True/False
     def insert(self, name, symbol_type, symbol_value):
         """插入符号到符号表"""
-        if name not in self.table:
-            self.table[name] = {'type': symbol_type, 'value': symbol_value}
+        if name not in self.slots:
+            slot = None
+            if self.layout is not None: slot = self.layout.slots.get(name)
+            if slot is None:
+                # 布局以外的符号：追加槽位，该符号表不再按布局直接访问
+                slot = len(self.values)
+                self.types.append(symbol_type)
+                self.values.append(hold(symbol_value))
+                self.layout = None
+            else:
+                self.types[slot] = symbol_type
+                self.values[slot] = hold(symbol_value)
+            self.slots[name] = slot
             return True
         else:
-            print(f"Error: Identifier '{name}' already declared in the same scope.")
+            diagnostics.error(f"Error: Identifier '{name}' already declared in the same scope.")
             return False
 
-    # 查找符号，返回Object/None
+    # 定位符号，返回(符号表, 槽位)/None，不打印错误
+    def locate(self, name):
+        temp_symbol_table = self
+        while temp_symbol_table is not None:
+            slot = temp_symbol_table.slots.get(name)
+            if slot is not None:
+                return temp_symbol_table, slot
+            temp_symbol_table = temp_symbol_table.parent
+        return None
+
+    # 查找符号，返回(类型, 值)/None
     def lookup(self, name):
         """查找符号在符号表中的信息"""
-        if name in self.table:
-            return self.table[name]
-        else:
-            temp_symbol_table = self.parent
-            while temp_symbol_table is not None:
-                if name in temp_symbol_table.table:
-                    return temp_symbol_table.table[name]
-                temp_symbol_table = temp_symbol_table.parent
-            print(f"Error: Identifier '{name}' not found in the all scope.")
-            self.display()
+        location = self.locate(name)
+        if location is None:
+            diagnostics.error(f"Error: Identifier '{name}' not found in the all scope.")
+            if diagnostics.enabled(DEBUG): self.display()  # 符号表内容只在输出调试信息时生成
             return None
+        table, slot = location
+        return table.types[slot], table.values[slot]
+
+    # 读取符号的值，查找失败时返回 UNDEFINED
+    def read(self, name):
+        lookup = self.lookup(name)
+        if lookup is None: return UNDEFINED
+        return lookup[1]
 
     # 删除符号，返回True/False，参数为0则全部清空
     def delete(self, name):
@@ -45,39 +139,65 @@ class MySymbolTable:
             temp_symbol_table = self
             while temp_symbol_table is not None:
                 if name == 0:
-                    temp_symbol_table.table.clear()
-                elif name in temp_symbol_table.table:
-                    temp_symbol_table.table.pop(name, None)
+                    temp_symbol_table.clear()
+                elif name in temp_symbol_table.slots:
+                    slot = temp_symbol_table.slots.pop(name)
+                    temp_symbol_table.types[slot] = None
+                    temp_symbol_table.values[slot] = UNDEFINED
                     return True
                 temp_symbol_table = temp_symbol_table.parent
             return True
 
+    # 清空符号，保留预留的槽位
+    def clear(self):
+        self.slots.clear()
+        self.types = [None] * len(self.types)
+        self.values = [UNDEFINED] * len(self.values)
+
+    # 清空已声明的符号，用于作用域帧池回收符号表：按布局预留的槽位恢复为未声明，
+    # 没有布局时（插入过布局以外的符号）截断全部槽位
+    def reset(self):
+        if self.layout is None:
+            del self.types[:]
+            del self.values[:]
+        else:
+            for slot in self.slots.values():
+                self.types[slot] = None
+                self.values[slot] = UNDEFINED
+        self.slots.clear()
+        self.parent = None
+
+    # 截断全部槽位后按新的布局重新预留
+    def relayout(self, layout):
+        del self.types[:]
+        del self.values[:]
+        self.layout = None
+        if layout is not None: self.adopt(layout)
+
     # 更新符号，返回True/False/None
     def update(self, name, symbol_type, symbol_value):
         """更新符号在符号表中的信息"""
-        if name in self.table:
-            if self.table[name]["type"] is not symbol_type: return False
-            self.table[name] = {'type': symbol_type, 'value': symbol_value}
-            return True
-        else:
-            temp_symbol_table = self.parent
-            while temp_symbol_table is not None:
-                if name in temp_symbol_table.table:
-                    if temp_symbol_table.table[name]["type"] is not symbol_type: return False
-                    temp_symbol_table.table[name] = {'type': symbol_type, 'value': symbol_value}
-                    return True
-                temp_symbol_table = temp_symbol_table.parent
-            print(f"Error: Identifier '{name}' not found in the all scope.")
+        location = self.locate(name)
+        if location is None:
+            diagnostics.error(f"Error: Identifier '{name}' not found in the all scope.")
             return None
+        table, slot = location
+        if table.types[slot] is not symbol_type: return False
+        table.values[slot] = hold(symbol_value)
+        return True
+
+    # 本级符号表的所有符号，返回[(名称, 类型, 值)]
+    def items(self):
+        return [(name, self.types[slot], self.values[slot]) for name, slot in self.slots.items()]
 
     # 打印符号，显示所有符号
     def display(self):
         """显示各级符号表内容"""
-        print("Symbol Table:")
+        diagnostics.debug("Symbol Table:")
         temp = self
         while temp is not None:
-            for name, info in temp.table.items():
-                print(f"Name: {name}, Type: {info['type']}, Value: {info['value']}")
+            for name, symbol_type, value in temp.items():
+                diagnostics.debug(f"Name: {name}, Type: {symbol_type}, Value: {value}")
             temp = temp.parent
 
     # 字典转为JSON字符串
@@ -91,479 +211,1240 @@ class MySymbolTable:
         return my_dict
 
 
-symbol_table = MySymbolTable()
-state = False
-# 定义词法分析器（Lex）
-tokens = (
-    'NUMBER',  # 算术 整数
-    'FLOAT',  # 算术 实数
-    'PLUS',  # 算术 加法
-    'MINUS',  # 算术 减法
-    'TIMES',  # 算术 乘法
-    'DIVIDE',  # 算术 除法
-    'MOD',  # 算术 求余
-    'LPAREN',  # 算术 括号
-    'RPAREN',  # 算术 括号
-    'IDENTIFIER',  # 算术 变量
-    'DEQUAL',  # 逻辑 等于 ==
-    'NOTEQU',  # 逻辑 不等 !=
-    'OR',  # 逻辑 或 ||
-    'AND',  # 逻辑 与 &&
-    'NOT',  # 逻辑 非 !!
-    'MORETHAN',  # 逻辑 大于 >
-    'LESSTHAN',  # 逻辑 小于 <
-    'MORETHANEQ',  # 逻辑 大于等于 >=
-    'LESSTHANEQ',  # 逻辑 小于等于 <=
-    'LBRACK',  # 列表 方括号
-    'RBRACK',  # 列表 方括号
-    'COMMA',  # 列表 逗号
-    'TEXT',  # 文本 单纯文本
-)
-# 注意，算术表达式的计算优先级高于逻辑表达式，表达式（算术表达式，逻辑表达式，文本表达式）
-t_PLUS = r'\+'
-t_MINUS = r'-'
-t_TIMES = r'\*'
-t_DIVIDE = r'/'
-t_MOD = r'%'
-t_LPAREN = r'\('
-t_RPAREN = r'\)'
-t_DEQUAL = r'=='
-t_NOTEQU = r'!='
-t_OR = r'\|\|'
-t_AND = r'&&'
-t_NOT = r'!!'
-t_MORETHAN = r'>'
-t_LESSTHAN = r'<'
-t_MORETHANEQ = r'>='
-t_LESSTHANEQ = r'<='
-t_LBRACK = r'\['
-t_RBRACK = r'\]'
-t_COMMA = r','
-t_ignore = ' \t'
-
-
-def t_FLOAT(t):
-    r'\d+(\.\d+)'
-    t.value = float(t.value)
-    return t
-
-
-def t_NUMBER(t):
-    r'\d+'
-    t.value = int(t.value)
-    return t
-
-
-def t_IDENTIFIER(t):
-    r'[a-zA-Z_][a-zA-Z_0-9]*'
-    t.type = 'IDENTIFIER'
-    return t
-
-
-quotation = "\""
-rule = "([^" + quotation + r"\\]|\\.)*"
-
-
-@lex.TOKEN(quotation + rule + quotation)
-def t_TEXT(t):
-    t.type = 'TEXT'
-    return t
-
-
-def t_error(t):
-    print(f"Unexpected character: {t.value[0]}")
-    t.lexer.skip(1)
-
-
-lexer_exp = lex.lex()
-lexer_exp2 = lex.lex()
-
-# 定义语法分析器（Yacc）
-
-precedence = (
-    ('left', 'LESSTHAN', 'MORETHAN', 'LESSTHANEQ', 'MORETHANEQ', 'DEQUAL', 'NOTEQU', 'AND', 'OR', 'NOT'),
-    ('left', 'PLUS', 'MINUS'),
-    ('left', 'TIMES', 'DIVIDE'),
-    ('right', 'UMINUS'),  # Unary minus operator
-)
-
-
-def p_logic_expression(p):
-    '''logic_expression :  math_expression
-                | logic_expression LESSTHAN logic_expression
-                | logic_expression MORETHAN logic_expression
-                | logic_expression LESSTHANEQ logic_expression
-                | logic_expression MORETHANEQ logic_expression
-                | logic_expression DEQUAL logic_expression
-                | logic_expression NOTEQU logic_expression
-                | logic_expression AND logic_expression
-                | logic_expression OR logic_expression
-                | NOT logic_expression
-    '''
-
-    if len(p) == 2:
-        p[0] = p[1]
-
-    if len(p) == 3:
-        if p[2] == 0:
-            p[0] = 1
+# 作用域帧池：if/while 代码块的符号表在退出代码块时清空后放回池中，再次进入代码块（包括循环的下一次迭代）时取出复用，
+# 每次进入都得到空的作用域，又不必反复创建符号表
+class FramePool:
+    def __init__(self, capacity=64):
+        self.frames = []  # 已回收的符号表
+        self.capacity = capacity  # 最多保留的符号表数
+
+    # 取得父符号表为 parent、按静态作用域布局 layout 预留槽位的空符号表。
+    # 同一代码块反复进入时（例如循环的各次迭代）取出的符号表布局相同，无需重新预留槽位
+    def acquire(self, layout, parent):
+        if not self.frames: return MySymbolTable(layout, parent)
+        frame = self.frames.pop()
+        frame.parent = parent
+        if (frame.layout is not layout) or (layout is None) or (
+                (layout.parent is not None) and ((parent is None) or (parent.layout is not layout.parent))):
+            frame.relayout(layout)
+        return frame
+
+    def release(self, frame):
+        frame.reset()
+        if len(self.frames) < self.capacity: self.frames.append(frame)
+
+
+# 静态作用域：加载程序时为每个声明分配槽位，运行时同一作用域的符号表按此布局预留槽位
+class Scope:
+    def __init__(self, parent=None, table=None):
+        self.parent = parent
+        self.slots = {}  # 名称 -> 槽位下标
+        self.size = 0  # 槽位数量
+        self.readers = {}  # 名称 -> 读取函数
+        self.locators = {}  # 名称 -> 定位函数
+        self.evaluators = {}  # (表达式文本, 模式) -> 绑定到本作用域的求值函数
+        self.types = {}  # 名称 -> 变量值的静态类型，由类型推导填写，没有记录的变量类型未知
+        self.declared = {}  # 名称 -> 变量的声明类型，由类型推导填写
+        self.modes = {}  # 表达式 -> 目标类型未知时的求值模式
+        self.assignments = {}  # (名称, 表达式) -> 赋值的类型是否必然正确
+        if table is not None:
+            # 沿用已有符号表的槽位，新的声明排在其后
+            self.slots = dict(table.slots)
+            self.size = len(table.values)
+
+    # 序列化时只保存槽位布局与静态类型，读取函数、定位函数与求值函数在载入后按需重新生成
+    def __getstate__(self):
+        return self.parent, self.slots, self.size, self.types, self.declared
+
+    def __setstate__(self, state):
+        self.__init__(state[0])
+        self.slots, self.size = state[1], state[2]
+        if len(state) > 3: self.types, self.declared = state[3], state[4]
+
+    # 声明符号，分配槽位
+    def declare(self, name):
+        if name not in self.slots:
+            self.slots[name] = self.size
+            self.size += 1
+
+    # 解析符号，返回(作用域深度, 槽位)/None
+    def resolve(self, name):
+        depth = 0
+        scope = self
+        while scope is not None:
+            if name in scope.slots:
+                return depth, scope.slots[name]
+            scope = scope.parent
+            depth += 1
+        return None
+
+    # 目标类型未知时表达式的求值模式（logic/text/obj），类型未知时为None，需要依次尝试各模式
+    def mode(self, exp):
+        if exp in self.modes: return self.modes[exp]
+        mode = type_modes.get(expression_type(exp, self.types))
+        self.modes[exp] = mode
+        return mode
+
+    # 把表达式赋值给变量时类型是否必然正确：按文本求值的结果必然是文本，其他类型需要表达式的静态类型与声明一致
+    def assignable(self, name, exp):
+        key = (name, exp)
+        if key in self.assignments: return self.assignments[key]
+        declared = self.declared.get(name)
+        result = (declared == "text") or (
+                (declared in ("int", "real", "list")) and (expression_type(exp, self.types) == declared))
+        self.assignments[key] = result
+        return result
+
+    # 定位函数 f(table) -> (符号表, 槽位)/None
+    # 符号表的布局为本作用域时，各级父符号表的布局必然与外层作用域一致（见 adopt），可直接按深度和槽位访问；
+    # 布局不一致或槽位尚未声明时按名称查找
+    def locator(self, name):
+        if name in self.locators: return self.locators[name]
+        resolved = self.resolve(name)
+        scope = self
+        if resolved is None:
+            locate = lambda table: table.locate(name)
         else:
-            p[0] = 0
-    if len(p) == 4:
-        if p[2] == '<':
-            if p[1] < p[3]:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '>':
-            if p[1] > p[3]:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '<=':
-            if p[1] <= p[3]:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '>=':
-            if p[1] >= p[3]:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '==':
-            if p[1] == p[3]:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '!=':
-            if p[1] != p[3]:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '&&':
-            if p[1] * p[3] != 0:
-                p[0] = 1
-            else:
-                p[0] = 0
-        if p[2] == '||':
-            if (p[1] != 0) or (p[3] != 0):
-                p[0] = 1
-            else:
-                p[0] = 0
-        return p[0]
-
-
-def p_expr_uminus(p):
-    'math_expression : MINUS math_expression %prec UMINUS'
-    p[0] = -p[2]
-
-
-def p_math_expression(p):
-    '''
-    math_expression : math_expression PLUS term
-               | math_expression MINUS term
-               | term
-    '''
-    if len(p) == 2:
-        p[0] = p[1]
-    else:
-        if p[2] == '+':
-            p[0] = p[1] + p[3]
-        elif p[2] == '-':
-            p[0] = p[1] - p[3]
-
-
-def p_term(p):
-    '''
-    term : term TIMES factor
-         | term DIVIDE factor
-         | term MOD factor
-         | factor
-    '''
-    if len(p) == 2:
-        p[0] = p[1]
-    else:
-        if p[2] == '*':
-            p[0] = p[1] * p[3]
-        elif p[2] == '/':
-            if p[3] == 0:
-                global state
-                state = False
-                print("除数为0错误！")
-                p[0] = 0
-                return
-            p[0] = p[1] / p[3]
-        elif p[2] == '%':
-            p[0] = p[1] % p[3]
-
-
-def p_factor(p):
-    '''
-    factor : NUMBER
-           | FLOAT
-           | IDENTIFIER-logic
-           | index-logic
-           | LPAREN math_expression RPAREN
-    '''
-    if len(p) == 2: p[0] = p[1]
-    if len(p) == 4: p[0] = p[2]
-
-
-def p_IDENTIFIER_logic(p):
-    '''
-    IDENTIFIER-logic : IDENTIFIER
-    '''
-    global state
-    if symbol_table.lookup(p[1]):  # 如果是变量
-        temp = symbol_table.lookup(p[1])["value"]
-        if (type(temp) is not int) and (type(temp) is not float):
-            state = False
-            p[0] = 0
+            depth, slot = resolved
+
+            def locate(table):
+                if table.layout is scope:
+                    frame = table
+                    for _ in range(depth):
+                        frame = frame.parent
+                    if frame.values[slot] is not UNDEFINED:
+                        return frame, slot
+                return table.locate(name)
+        self.locators[name] = locate
+        return locate
+
+    # 读取函数 f(table) -> 值/UNDEFINED，查找失败时与 lookup 一样打印错误
+    def reader(self, name):
+        if name in self.readers: return self.readers[name]
+        resolved = self.resolve(name)
+        scope = self
+        if resolved is None:
+            read = lambda table: table.read(name)
+        elif resolved[0] == 0:
+            slot = resolved[1]
+
+            def read(table):
+                if table.layout is scope:
+                    value = table.values[slot]
+                    if value is not UNDEFINED: return value
+                return table.read(name)
+        elif resolved[0] == 1:
+            slot = resolved[1]
+
+            def read(table):
+                if table.layout is scope:
+                    value = table.parent.values[slot]
+                    if value is not UNDEFINED: return value
+                return table.read(name)
         else:
-            p[0] = temp
-    else:
-        print(f"Undefined variable: {p[1]}")
-        state = False
-        p[0] = 0
+            depth, slot = resolved
+
+            def read(table):
+                if table.layout is scope:
+                    frame = table
+                    for _ in range(depth):
+                        frame = frame.parent
+                    value = frame.values[slot]
+                    if value is not UNDEFINED: return value
+                return table.read(name)
+        self.readers[name] = read
+        return read
+
+
+# 变量解析：加载程序时为就地执行的语句标注所在作用域，并为各作用域的声明分配槽位
+class MyResolver:
+    # 解析根语句块，根符号表按根作用域布局预留槽位，之后推导各作用域中变量的静态类型
+    def resolve(self, root, table):
+        inherited = list(table.slots)
+        scope = Scope(table=table)
+        self.resolve_statements(root.statements, scope)
+        table.adopt(scope)
+        MyTypeChecker().check(root, scope, inherited)
+        return scope
+
+    def resolve_statements(self, statements, scope):
+        for statement in statements:
+            self.resolve_statement(statement, scope)
+
+    def resolve_statement(self, statement, scope):
+        statement.scope = scope
+        if (type(statement) is DeclarationStatement) or (type(statement) is DeclAssgnStatement):
+            scope.declare(statement.ID)
+        if (type(statement) is SYNCReadStatement) and statement.s_type:
+            scope.declare(statement.key)
+        if type(statement) is BlockStatement:
+            # 代码块只登记名称，块内语句作为数据，在其他上下文中执行时按名称查找
+            scope.declare(statement.ID)
+        if type(statement) is IfStatement:
+            statement.main_scope = Scope(scope)
+            self.resolve_statements(statement.main_block, statement.main_scope)
+            if statement.else_block:
+                statement.else_scope = Scope(scope)
+                self.resolve_statements(statement.else_block, statement.else_scope)
+        if type(statement) is WhileStatement:
+            statement.main_scope = Scope(scope)
+            self.resolve_statements(statement.main_block, statement.main_scope)
+
+
+UNTYPED = object()  # 类型推导中尚未推导出类型的变量
+
+numeric_types = ("int", "real", "number")  # 数值类型，number 表示整数或实数
+type_modes = {"int": "logic", "real": "logic", "number": "logic", "text": "text", "list": "obj", "block": "obj"}
+constant_types = {"int": "int", "real": "real", "text": "text"}  # 常量的静态类型
+declaration_types = {"int": "int", "real": "real", "text": "text", "list": "list"}  # 声明语句默认值的静态类型
+
+
+# 合并两个静态类型：相同时不变，整数与实数合并为number，其他情况类型未知
+def join_types(a, b):
+    if a is UNTYPED: return b
+    if (b is UNTYPED) or (a == b): return a
+    if (a in numeric_types) and (b in numeric_types): return "number"
+    return None
+
+
+# 算术运算结果的静态类型
+def arithmetic_type(left, right):
+    if (left == "int") and (right == "int"): return "int"
+    if ("real" in (left, right)) and (left in numeric_types) and (right in numeric_types): return "real"
+    return "number"
+
+
+# 表达式按 逻辑 -> 文本 -> 对象 依次求值时，求值成功所用模式下值的静态类型，无法确定时为None。
+# 只有变量、索引与 + 运算可能按多种模式求值：数值变量只能按逻辑求值成功，文本变量只能按文本，
+# 列表与代码块只能按对象；+ 的一侧为数值时只能是算术运算，一侧为文本时只能是文本拼接。
+# types 为变量名 -> 静态类型
+def expression_type(exp, types):
+    t = type(exp)
+    if t is InvariantExpression: return expression_type(exp.expression, types)
+    if t is ConstantExpression: return constant_types.get(exp.data_type)
+    if t is IdentifierExpression: return types.get(exp.name)
+    if t is ListExpression: return "list"
+    if (t is ParenExpression) or (t is UnaryExpression):
+        # 只有逻辑模式接受括号与负号
+        inner = expression_type(exp.expression if t is ParenExpression else exp.operand, types)
+        if inner is UNTYPED: return UNTYPED
+        return inner if inner in numeric_types else "number"
+    if t is BinaryExpression:
+        left, right = expression_type(exp.left, types), expression_type(exp.right, types)
+        if (left is UNTYPED) or (right is UNTYPED): return UNTYPED
+        if exp.operator in logic_operations: return "int"
+        if exp.operator == '/': return "real"
+        if (exp.operator == '+') and (left not in numeric_types) and (right not in numeric_types):
+            return "text" if "text" in (left, right) else None
+        return arithmetic_type(left, right)
+    return None
+
+
+# 类型推导与检查：加载程序时按各变量的全部声明与赋值推导其值的静态类型，记录到所在作用域（Scope.types/declared），
+# 目标类型未知的表达式据此只按一种模式求值，类型必然正确的赋值在运行时不再检查，必然不匹配的赋值给出警告。
+# 变量在本作用域的声明尚未执行时会按名称找到外层的同名变量，因此变量的类型为各级作用域中同名声明的合并。
+# 推导是保守的：符号表中已有的符号、被同步读语句按名称更新的变量类型未知；
+# 程序中有按名称修改当前符号表或执行其他语句的同步写语句时不做推导
+class MyTypeChecker:
+    def __init__(self, limit=16):
+        self.limit = limit  # 推导的最大轮数，超过时不记录类型
+        self.scopes = []  # 各作用域
+        self.names = {}  # 作用域 -> 在该作用域中声明的名称
+        self.declarations = []  # (作用域, 名称, 声明语句)
+        self.assignments = []  # 对变量的赋值语句
+        self.poisoned = set()  # 被同步读语句按名称更新的变量
+        self.unsafe = False
+
+    def check(self, root, scope, inherited=()):
+        self.collect(root.statements, scope)
+        if self.unsafe: return
+        names = self.names.setdefault(scope, set())
+        names.update(inherited)
+        base = {(scope, name): None for name in inherited}  # 已有的符号：值来自程序以外
+        declared = dict(base)
+        for s, name, statement in self.declarations:
+            declared_type = self.declared_type(statement)
+            if declared.get((s, name), declared_type) != declared_type: declared_type = None
+            declared[(s, name)] = declared_type
+        # 赋值写入的值通过了类型检查（或已证明类型正确），类型为被赋值变量的声明类型，
+        # 赋值可能写入本作用域或外层作用域中的任一同名声明
+        assigned = dict(base)
+        for statement in self.assignments:
+            name, s = statement.variable, statement.scope
+            while s is not None:
+                if name in self.names.get(s, ()):
+                    declared_type = declared.get((s, name))
+                    if declared_type not in ("statement", "block"):  # 这两种变量的赋值必然检查失败，不会写入
+                        value = declaration_types.get(declared_type)
+                        assigned[(s, name)] = join_types(assigned.get((s, name), UNTYPED), value)
+                s = s.parent
+        # 变量的类型可能依赖其他变量，反复推导直到不再变化
+        values = {}
+        for _ in range(self.limit):
+            visible = {s: self.visible(s, values) for s in self.scopes}
+            current = dict(assigned)
+            for s, name, statement in self.declarations:
+                key = (s, name)
+                current[key] = join_types(current.get(key, UNTYPED), self.value_type(statement, visible[s]))
+            if current == values: break
+            values = current
+        else:
+            return
+        for s in self.scopes:
+            s.types = self.known(self.visible(s, values))
+            s.declared = self.known(self.visible(s, declared))
+        for statement in self.assignments:
+            self.check_assignment(statement)
+
+    # 收集声明与赋值，代码块中的语句作为数据，不在这里收集
+    def collect(self, statements, scope):
+        self.scopes.append(scope)
+        names = self.names.setdefault(scope, set())
+        for statement in statements:
+            t = type(statement)
+            if (t is DeclarationStatement) or (t is DeclAssgnStatement) or (t is BlockStatement):
+                names.add(statement.ID)
+                self.declarations.append((scope, statement.ID, statement))
+            elif t is SYNCReadStatement:
+                if statement.s_type:
+                    names.add(statement.key)
+                    self.declarations.append((scope, statement.key, statement))
+                else:
+                    self.poisoned.add(statement.key)
+            elif t is SYNCWriteStatement:
+                item = statement.key[0] if len(statement.key) == 2 else None
+                if (type(item) is ConstantExpression) and (type(item.value) is str):
+                    if item.value.replace("\"", '') in ("context-current", "statement"): self.unsafe = True
+                elif item is not None:
+                    self.unsafe = True  # 无法静态确定同步的对象
+            elif (t is AssignmentStatement) and (type(statement.variable) is not list):
+                self.assignments.append(statement)
+            elif t is IfStatement:
+                self.collect(statement.main_block, statement.main_scope)
+                if statement.else_block: self.collect(statement.else_block, statement.else_scope)
+            elif t is WhileStatement:
+                self.collect(statement.main_block, statement.main_scope)
+
+    # 作用域中可见的各变量的类型：合并本作用域与各级外层作用域中的同名声明
+    def visible(self, scope, types):
+        result = {}
+        s = scope
+        while s is not None:
+            for name in self.names.get(s, ()):
+                result[name] = join_types(result.get(name, UNTYPED), types.get((s, name), UNTYPED))
+            s = s.parent
+        for name in self.poisoned:
+            if name in result: result[name] = None
+        return result
+
+    # 只保留类型确定的变量
+    def known(self, types):
+        return {name: t for name, t in types.items() if (t is not None) and (t is not UNTYPED)}
+
+    def declared_type(self, statement):
+        if type(statement) is BlockStatement: return "block"
+        if type(statement) is SYNCReadStatement: return statement.s_type
+        return statement.data_type
+
+    # 声明语句写入的值的静态类型
+    def value_type(self, statement, types):
+        t = type(statement)
+        if t is BlockStatement: return "block"
+        if t is SYNCReadStatement: return None
+        if t is DeclarationStatement: return declaration_types.get(statement.data_type)
+        if statement.data_type == "text": return "text"  # 按文本求值
+        value = expression_type(statement.expression, types)
+        if (statement.data_type == "int") or (statement.data_type == "real"):
+            # 按逻辑求值，结果必然是数值
+            return value if (value is UNTYPED) or (value in numeric_types) else "number"
+        if type(statement.expression) in (IdentifierExpression, ListExpression): return value  # 按对象求值
+        return None
 
+    # 赋值的类型必然不匹配时给出警告，运行时仍按原来的方式报告错误
+    def check_assignment(self, statement):
+        scope, name = statement.scope, statement.variable
+        declared = scope.declared.get(name)
+        value = expression_type(statement.expression, scope.types)
+        if (declared not in ("int", "real", "text", "list")) or (value is None) or (value == "number"): return
+        if value != declared:
+            diagnostics.warning(f"类型检查：变量 {name} 的类型为 {declared}，赋值表达式的类型为 {value}",
+                                statement.position)
+
+
+state = False  # 表达式求值状态，求值过程中出现语义错误时置为False
+
+# 表达式编译
+# 注意：表达式树在语法分析阶段已经构建，这里按求值模式（logic/text/obj）把表达式树编译为构造函数 build(scope)，
+# 绑定到静态作用域后得到求值函数 f(table)，变量在运行时才到符号表 table 中读取。
+# 各模式可接受的表达式与表达式文本在对应文法下的解析结果一致，不符合该模式的表达式编译结果为None
+
+# 算术运算
+math_operations = {
+    '+': lambda x, y: x + y,
+    '-': lambda x, y: x - y,
+    '*': lambda x, y: x * y,
+    '%': lambda x, y: x % y,
+}
 
-def p_index_logic(p):
-    '''
-    index-logic : index
-    '''
-    global state
-    if isinstance(p[1], int):  # 如果是整数
-        p[0] = p[1]
-    elif isinstance(p[1], float):  # 如果是实数
-        p[0] = p[1]
-    elif isinstance(p[1], ExpressionStatement) or isinstance(p[1], DeclAssgnStatement):  # 如果是可表达式语句
-        global parser_logic
-        p[0] = parser_logic.parse(str(p[1].expression), lexer=lex.lex())
-        if not (isinstance(p[0], int) or isinstance(p[0], float)):
-            state = False
-            p[0] = 0
+# 逻辑运算：结果为1/0
+logic_operations = {
+    '<': lambda x, y: 1 if x < y else 0,
+    '>': lambda x, y: 1 if x > y else 0,
+    '<=': lambda x, y: 1 if x <= y else 0,
+    '>=': lambda x, y: 1 if x >= y else 0,
+    '==': lambda x, y: 1 if x == y else 0,
+    '!=': lambda x, y: 1 if x != y else 0,
+    '&&': lambda x, y: 1 if x * y != 0 else 0,
+    '||': lambda x, y: 1 if (x != 0) or (y != 0) else 0,
+}
 
 
-def p_index(p):
-    '''
-    index : IDENTIFIER LBRACK math_expression RBRACK
-                | index LBRACK math_expression RBRACK
-    '''
-    global state
-    if (type(p[1]) is str) and ("\"" not in p[1]):
-        if symbol_table.lookup(p[1]):  # 如果是变量
-            temp = symbol_table.lookup(p[1])["value"]
-            if type(temp) is list: p[0] = temp[p[3]]
-            if type(temp) is BlockStatement: p[0] = temp.statements[p[3]]
-        else:
-            print(f"Undefined variable: {p[1]}")
-            state = False
-    else:
-        if type(p[1]) is list:
-            p[0] = p[1][p[3]]
-        elif type(p[1]) is BlockStatement:
-            p[0] = p[1].statements[p[3]]
-        else:
-            state = False
-            print("表达式解析错误-对非语句块的语句进行索引")
+# 常量构造函数
+def constant(value):
+    evaluator = lambda table: value
+    return lambda scope: evaluator
 
 
-def p_text_expression(p):
-    '''
-    text_expression : text_expression PLUS text_expression
-               | TEXT
-               | IDENTIFIER
-               | index-text
-    '''
-    global state
-    if len(p) == 4:
-        if (type(p[1]) is not str) or (type(p[3]) is not str):
-            state = False
-            return
-        if "\"" in p[1] and "\"" not in p[3]: p[0] = p[1][0:-1] + p[3] + "\""
-        if "\"" not in p[1] and "\"" in p[3]: p[0] = "\"" + p[1] + p[3][1:]
-        if "\"" not in p[1] and "\"" not in p[3]: p[0] = "\"" + p[1] + p[3] + "\""
-        if "\"" in p[1] and "\"" in p[3]: p[0] = p[1][0:-1] + p[3][1:]
-    if len(p) == 2:
-        if "\"" in p[1]:
-            p[0] = p[1]
-        else:
-            if symbol_table.lookup(p[1]):  # 如果是变量
-                p[0] = symbol_table.lookup(p[1])["value"]
-                if type(p[0]) is not str:
-                    state = False
-                    p[0] = "\"\""
-                elif "\"" not in p[0]:
-                    p[0] = "\"" + p[0] + "\""
-            else:
-                print(f"Undefined variable: {p[1]}")
-                state = False
-                p[0] = "\"\""
+# 变量读取函数：有静态作用域时按槽位读取，否则按名称查找
+def reader(scope, name):
+    if scope is None: return lambda table: table.read(name)
+    return scope.reader(name)
 
 
-def p_index_text(p):
-    '''
-    index-text : index
-    '''
+# 对变量的值进行索引
+def index_symbol(name, temp, position):
     global state
-    if isinstance(p[1], str):  # 如果是整数
-        p[0] = p[1]
-        if "\"" not in p[0]:
-            p[0] = "\"" + p[0] + "\""
-    elif isinstance(p[1], ExpressionStatement) or isinstance(p[1], DeclAssgnStatement):  # 如果是可表达式语句
-        global parser_text
-        p[0] = parser_text.parse(str(p[1].expression), lexer=lex.lex())
-        if not (isinstance(p[0], str)):
-            state = False
-            p[0] = "\"\""
-        else:
-            p[0] = p[1]
-            if "\"" not in p[0]:
-                p[0] = "\"" + p[0] + "\""
-    else:
-        state = False
-        p[0] = "\"\""
-
-
-def p_obj_expression(p):
-    '''
-    obj_expression : IDENTIFIER
-               | index
-               | list
-    '''
+    if temp is not UNDEFINED:  # 如果是变量
+        if isinstance(temp, list): return temp[position]
+        if type(temp) is BlockStatement: return temp.statements[position]
+        return None
+    diagnostics.error(f"Undefined variable: {name}")
+    state = False
+    return None
+
+
+# 对求得的对象进行索引：对象为标识符（不含引号的文本）时先查找符号表
+def index_value(table, target, position):
     global state
-    if type(p[1]) is str:
-        if symbol_table.lookup(p[1]):  # 如果是变量
-            p[0] = symbol_table.lookup(p[1])["value"]
-        else:
-            print(f"Undefined variable: {p[1]}")
-            state = False
-    else:
-        p[0] = p[1]
-
-
-def p_list(p):
-    '''list : LBRACK elements RBRACK
-            | LBRACK RBRACK
-    '''
-    if len(p) == 3: p[0] = []
-    if len(p) == 4:
-        p[0] = p[2]
-
-
-def p_elements(p):
-    '''elements : element COMMA elements
-                | element
-    '''
-    if len(p) == 4:
-        p[0] = [p[1]] + p[3]
-    else:
-        p[0] = [p[1]]
-
-
-def p_element(p):
-    '''element : NUMBER
-               | list
-               | FLOAT
-               | TEXT
-               | IDENTIFIER
-               | other
-    '''
+    if (type(target) is str) and ("\"" not in target):
+        return index_symbol(target, table.read(target), position)
+    if isinstance(target, list):
+        return target[position]
+    elif type(target) is BlockStatement:
+        return target.statements[position]
+    state = False
+    diagnostics.error("表达式解析错误-对非语句块的语句进行索引")
+    return None
+
+
+# 文本取值：对变量的值加上引号
+def text_symbol(name, value):
     global state
-    if (type(p[1]) is str) and ("\"" not in p[1]):
-        if symbol_table.lookup(p[1]):  # 如果是变量
-            p[0] = symbol_table.lookup(p[1])["value"]
-            return
-        else:
-            print(f"Undefined variable: {p[1]}")
+    if value is not UNDEFINED:  # 如果是变量
+        if type(value) is not str:
             state = False
-    p[0] = p[1]
+            return "\"\""
+        elif "\"" not in value:
+            return "\"" + value + "\""
+        return value
+    diagnostics.error(f"Undefined variable: {name}")
+    state = False
+    return "\"\""
 
 
-def p_other(p):
-    '''other : logic_expression
-                | text_expression
-    '''
-    p[0] = p[1]
-    global state
-    if type(p[1]) is str:
-        state = True
+# 文本取值：带引号的为文本本身，否则视为标识符到符号表中查找
+def text_value(table, value):
+    if "\"" in value:
+        return value
+    return text_symbol(value, table.read(value))
 
 
-def p_error(p):
-    # print("Expression Parse - Syntax error")
+# 对象取值：返回变量的值
+def obj_symbol(name, value):
     global state
-    # print(7749)
-    # print(p)
+    if value is not UNDEFINED:  # 如果是变量
+        return value
+    diagnostics.error(f"Undefined variable: {name}")
     state = False
+    return None
+
+
+# 对象取值：文本视为标识符到符号表中查找
+def obj_value(table, value):
+    if type(value) is str:
+        return obj_symbol(value, table.read(value))
+    return value
+
+
+# 表达式编译器：每个方法返回构造函数/None
+class MyExpressionCompiler:
+    def compile(self, exp, mode):
+        if mode == "logic": return self.logic(exp)
+        if mode == "text": return self.text(exp)
+        if mode == "obj": return self.obj(exp)
+        return None
+
+    # 逻辑表达式：比较运算，或算术表达式
+    def logic(self, exp):
+        if type(exp) is InvariantExpression:
+            return self.invariant(exp, self.logic(exp.expression))
+        if (type(exp) is BinaryExpression) and (exp.operator in logic_operations):
+            build_left, build_right = self.logic(exp.left), self.logic(exp.right)
+            if (build_left is None) or (build_right is None): return None
+            operation = logic_operations[exp.operator]
+
+            def build(scope):
+                left, right = build_left(scope), build_right(scope)
+                return lambda table: operation(left(table), right(table))
+
+            return build
+        return self.math(exp)
+
+    # 算术表达式：start 表示表达式文本是否从算术表达式的开头开始，只有开头允许出现负号，
+    # 例如 a*-b 、a+-b 不是合法的算术表达式
+    def math(self, exp, start=True):
+        if type(exp) is InvariantExpression:
+            return self.invariant(exp, self.math(exp.expression, start))
+        if type(exp) is ConstantExpression:
+            if (exp.data_type == "int") or (exp.data_type == "real"): return constant(exp.value)
+            return None
+        if type(exp) is IdentifierExpression:
+            return self.identifier_logic(exp.name)
+        if type(exp) is IndexExpression:
+            return self.index_logic(exp)
+        if type(exp) is ParenExpression:
+            return self.math(exp.expression)
+        if (type(exp) is UnaryExpression) and (exp.operator == "-"):
+            if not start: return None
+            build_operand = self.math(exp.operand)
+            if build_operand is None: return None
+
+            def build(scope):
+                operand = build_operand(scope)
+                return lambda table: -operand(table)
+
+            return build
+        if (type(exp) is BinaryExpression) and (exp.operator in math_operations or exp.operator == '/'):
+            build_left, build_right = self.math(exp.left, start), self.math(exp.right, False)
+            if (build_left is None) or (build_right is None): return None
+            if exp.operator == '/': return self.divide(build_left, build_right)
+            operation = math_operations[exp.operator]
+
+            def build(scope):
+                left, right = build_left(scope), build_right(scope)
+                return lambda table: operation(left(table), right(table))
+
+            return build
+        return None
+
+    # 循环不变表达式：每次进入循环后第一次求值成功时缓存结果，同一次循环中之后直接返回缓存的结果
+    def invariant(self, exp, build_inner):
+        if build_inner is None: return None
+        loop = exp.loop
+
+        def build(scope):
+            inner = build_inner(scope)
+            cached = [-1, None]  # (循环执行次数, 值)
+
+            def invariant(table):
+                if cached[0] == loop.entries: return cached[1]
+                value = inner(table)
+                if state:
+                    cached[0] = loop.entries
+                    cached[1] = value
+                return value
+
+            return invariant
+
+        return build
+
+    def divide(self, build_left, build_right):
+        def build(scope):
+            left, right = build_left(scope), build_right(scope)
+
+            def divide(table):
+                x, y = left(table), right(table)
+                if y == 0:
+                    global state
+                    state = False
+                    diagnostics.error("除数为0错误！")
+                    return 0
+                return x / y
+
+            return divide
+
+        return build
+
+    def identifier_logic(self, name):
+        def build(scope):
+            read = reader(scope, name)
+
+            def identifier_logic(table):
+                global state
+                temp = read(table)
+                if temp is not UNDEFINED:  # 如果是变量
+                    if (type(temp) is not int) and (type(temp) is not float):
+                        state = False
+                        return 0
+                    return temp
+                diagnostics.error(f"Undefined variable: {name}")
+                state = False
+                return 0
+
+            return identifier_logic
+
+        return build
+
+    def index_logic(self, exp):
+        build_index = self.index(exp)
+        if build_index is None: return None
+
+        def build(scope):
+            index = build_index(scope)
+
+            def index_logic(table):
+                global state
+                value = index(table)
+                if isinstance(value, int):  # 如果是整数
+                    return value
+                elif isinstance(value, float):  # 如果是实数
+                    return value
+                elif isinstance(value, ExpressionStatement) or isinstance(value, DeclAssgnStatement):  # 如果是可表达式语句
+                    result = expression_cache.run(value.expression, "logic", table)
+                    if not (isinstance(result, int) or isinstance(result, float)):
+                        state = False
+                        result = 0
+                    return result
+                return None
+
+            return index_logic
+
+        return build
+
+    # 索引：下标为算术表达式
+    def index(self, exp):
+        build_position = self.math(exp.position)
+        if build_position is None: return None
+        if type(exp.target) is IdentifierExpression:
+            name = exp.target.name
+
+            def build(scope):
+                read, position = reader(scope, name), build_position(scope)
+                return lambda table: index_symbol(name, read(table), position(table))
+
+            return build
+        build_target = self.index(exp.target)
+        if build_target is None: return None
+
+        def build(scope):
+            target, position = build_target(scope), build_position(scope)
+            return lambda table: index_value(table, target(table), position(table))
+
+        return build
+
+    # 文本表达式：文本、变量、索引及其拼接
+    def text(self, exp):
+        if type(exp) is InvariantExpression:
+            return self.invariant(exp, self.text(exp.expression))
+        if (type(exp) is BinaryExpression) and (exp.operator == '+'):
+            build_left, build_right = self.text(exp.left), self.text(exp.right)
+            if (build_left is None) or (build_right is None): return None
+
+            def build(scope):
+                left, right = build_left(scope), build_right(scope)
+
+                def concat(table):
+                    global state
+                    x, y = left(table), right(table)
+                    if (type(x) is not str) or (type(y) is not str):
+                        state = False
+                        return None
+                    if "\"" in x and "\"" not in y: return x[0:-1] + y + "\""
+                    if "\"" not in x and "\"" in y: return "\"" + x + y[1:]
+                    if "\"" not in x and "\"" not in y: return "\"" + x + y + "\""
+                    return x[0:-1] + y[1:]
+
+                return concat
+
+            return build
+        if type(exp) is ConstantExpression:
+            if exp.data_type == "text": return constant(exp.value)
+            return None
+        if type(exp) is IdentifierExpression:
+            name = exp.name
+
+            def build(scope):
+                read = reader(scope, name)
+                return lambda table: text_symbol(name, read(table))
+
+            return build
+        if type(exp) is IndexExpression:
+            return self.index_text(exp)
+        return None
+
+    def index_text(self, exp):
+        build_index = self.index(exp)
+        if build_index is None: return None
+
+        def build(scope):
+            index = build_index(scope)
+
+            def index_text(table):
+                global state
+                value = index(table)
+                if isinstance(value, str):  # 如果是文本
+                    if "\"" not in value:
+                        value = "\"" + value + "\""
+                    return value
+                elif isinstance(value, ExpressionStatement) or isinstance(value, DeclAssgnStatement):  # 如果是可表达式语句
+                    result = expression_cache.run(value.expression, "text", table)
+                    if not (isinstance(result, str)):
+                        state = False
+                        return "\"\""
+                    if "\"" not in result:
+                        result = "\"" + result + "\""
+                    return result
+                state = False
+                return "\"\""
+
+            return index_text
+
+        return build
 
+    # 对象表达式：变量、索引、列表
+    def obj(self, exp):
+        if type(exp) is InvariantExpression:
+            return self.invariant(exp, self.obj(exp.expression))
+        if type(exp) is IdentifierExpression:
+            name = exp.name
 
-parser_logic = yacc.yacc(start='logic_expression', debug=False)  # 逻辑表达式解析
-parser_text = yacc.yacc(start='text_expression', debug=False)  # 文本表达式解析
-parser_obj = yacc.yacc(start='obj_expression', debug=False)  # 文本表达式解析
+            def build(scope):
+                read = reader(scope, name)
+                return lambda table: obj_symbol(name, read(table))
+
+            return build
+        if type(exp) is IndexExpression:
+            build_index = self.index(exp)
+            if build_index is None: return None
+
+            def build(scope):
+                index = build_index(scope)
+                return lambda table: obj_value(table, index(table))
+
+            return build
+        if type(exp) is ListExpression:
+            return self.list(exp)
+        return None
+
+    def list(self, exp):
+        build_elements = [self.element(e) for e in exp.elements]
+        if None in build_elements: return None
+
+        def build(scope):
+            elements = [build_element(scope) for build_element in build_elements]
+            return lambda table: list_value([element(table) for element in elements])
+
+        return build
+
+    # 列表元素：列表，或以文本开头的文本表达式，或逻辑表达式
+    def element(self, exp):
+        if type(exp) is ListExpression:
+            return self.list(exp)
+        first = exp
+        while type(first) in (BinaryExpression, IndexExpression, InvariantExpression):
+            if type(first) is BinaryExpression:
+                first = first.left
+            elif type(first) is IndexExpression:
+                first = first.target
+            else:
+                first = first.expression
+        if (type(first) is ConstantExpression) and (first.data_type == "text"):
+            build_other = self.text(exp)
+        else:
+            build_other = self.logic(exp)
+        if build_other is None: return None
+
+        def build(scope):
+            other = build_other(scope)
+
+            def other_value(table):
+                global state
+                value = other(table)
+                if type(value) is str:
+                    state = True
+                return value
+
+            return other_value
+
+        return build
+
+
+# 表达式编译缓存：以（表达式，求值模式）为键，每个表达式只编译一次，之后按作用域绑定为求值函数
+class ExpressionCache:
+    def __init__(self, capacity=4096):
+        self.compiler = MyExpressionCompiler()
+        self.table = {}  # (表达式, 模式) -> 构造函数，表达式不符合该模式时为None
+        self.unbound = {}  # (表达式, 模式) -> 按名称查找变量的求值函数
+        self.capacity = capacity
+
+    # 编译表达式，返回构造函数/None
+    def compile(self, exp, mode):
+        key = (exp, mode)
+        if key in self.table:
+            return self.table[key]
+        result = self.compiler.compile(exp, mode)
+        if len(self.table) >= self.capacity:
+            self.table.pop(next(iter(self.table)))  # 淘汰最早编译的表达式
+        self.table[key] = result
+        return result
+
+    # 编译并绑定到静态作用域，返回求值函数/None
+    def bind(self, exp, mode, scope=None):
+        evaluators = self.unbound if scope is None else scope.evaluators
+        key = (exp, mode)
+        if key in evaluators:
+            return evaluators[key]
+        build = self.compile(exp, mode)
+        evaluator = build(scope) if build is not None else None
+        if (scope is None) and (len(evaluators) >= self.capacity):
+            evaluators.pop(next(iter(evaluators)))
+        evaluators[key] = evaluator
+        return evaluator
+
+    # 编译并在符号表上求值，不重置求值状态，返回求值结果
+    def run(self, exp, mode, table, scope=None):
+        global state
+        evaluator = self.bind(exp, mode, scope)
+        if evaluator is None:
+            state = False
+            return None
+        return evaluator(table)
+
+    def clear(self):
+        self.table.clear()
+        self.unbound.clear()
+
+
+expression_cache = ExpressionCache()
 
 
 class MyExpressionParser:
     def __init__(self, table: MySymbolTable):
         self.symbol_table = table
-        # self.symbol_table.insert("x", "int", 10)
-        # self.symbol_table.insert("y", "list", [20])
-        # self.symbol_table.insert("z", "list", [[30]])
         self.count = 0
+        self.profiler = None  # 性能分析器，统计表达式求值耗时
 
-    def parser_exp(self, exp, obj=False, logic=False, text=False):
-        global symbol_table
-        symbol_table = self.symbol_table
-        global parser_logic
-        global parser_text
-        global parser_obj
-        # symbol_table.display()
-        global state
-        state = True
+    # scope 为表达式所在语句的静态作用域，None 时按名称查找变量
+    def parser_exp(self, exp, obj=False, logic=False, text=False, scope=None):
         if obj:
-            result = parser_obj.parse(exp, lexer=lexer_exp)
-            if state:
-                return result
-            else:
-                return None
+            return self.evaluate(exp, "obj", scope)
         if logic:
-            result = parser_logic.parse(exp, lexer=lexer_exp)
-            if state:
-                return result
-            else:
-                return None
+            return self.evaluate(exp, "logic", scope)
         if text:
-            result = parser_text.parse(exp, lexer=lexer_exp)
-            if state:
-                return result
-            else:
-                return None
-        result = parser_logic.parse(exp, lexer=lexer_exp)
+            return self.evaluate(exp, "text", scope)
+        # 目标类型未知时按静态类型推导选定的模式求值，类型未知时依次尝试 逻辑 -> 文本 -> 对象
+        mode = scope.mode(exp) if scope is not None else None
+        if mode is not None: return self.evaluate(exp, mode, scope)
+        result = self.evaluate(exp, "logic", scope)
         if state: return result
-        state = True
-        result = parser_text.parse(exp, lexer=lexer_exp)
+        result = self.evaluate(exp, "text", scope)
         if state: return result
-        state = True
-        result = parser_obj.parse(exp, lexer=lexer_exp)
+        result = self.evaluate(exp, "obj", scope)
         if state: return result
         return None
 
+    # 在当前符号表上对表达式求值，求值失败返回None
+    def evaluate(self, exp, mode, scope=None):
+        global state
+        state = True
+        if self.profiler is not None:
+            start = time.perf_counter()
+            result = expression_cache.run(exp, mode, self.symbol_table, scope)
+            self.profiler.expression(time.perf_counter() - start)
+        else:
+            result = expression_cache.run(exp, mode, self.symbol_table, scope)
+        if state:
+            return result
+        else:
+            return None
+
     def compare_exp_type(self, s_type, value):
-        if (type(value) is list) and (s_type == "list"): return True
+        if isinstance(value, list) and (s_type == "list"): return True
         if (type(value) is int) and (s_type == "int"): return True
         if (type(value) is float) and (s_type == "real"): return True
         if (type(value) is str) and (s_type == "text"): return True
         return False
 
 
-'''
-my = MyExpressionParser(MySymbolTable())
-my.symbol_table.insert("xx", "list", [DeclAssgnStatement("int", "a", 10)])
-my.symbol_table.insert("yy", "list", [[100]])
-r = my.parser_exp("[yy[0][0]]", obj=True)
-print(r)
-print(state)
-'''
+# Python代码缓存：程序文本编译为代码对象，按源代码哈希缓存，超出容量时淘汰最久未使用的代码对象
+class PythonCodeCache:
+    def __init__(self, capacity=256):
+        self.table = {}  # (源代码哈希, 编译模式) -> 代码对象，按最近使用的先后排列
+        self.capacity = capacity
+        self.lock = threading.Lock()
+
+    # 编译源代码，返回代码对象
+    def compile(self, source, mode="exec"):
+        key = (hashlib.sha1(source.encode("utf-8")).digest(), mode)
+        with self.lock:
+            code = self.table.pop(key, None)
+            if code is not None:
+                self.table[key] = code  # 移到末尾，表示最近使用
+                return code
+        code = compile(source, "<udil-python>", mode)
+        with self.lock:
+            if len(self.table) >= self.capacity:
+                self.table.pop(next(iter(self.table)), None)  # 淘汰最久未使用的代码对象
+            self.table[key] = code
+        return code
+
+    def clear(self):
+        with self.lock:
+            self.table.clear()
+
+
+python_code_cache = PythonCodeCache()
+
+
+# 执行Python程序：载入的上下文直接放入命名空间（列表等对象只传递引用），执行后从命名空间读取载出的上下文。
+# 文本值沿用原有约定，作为Python表达式求值后载入，例如 "'example.txt'" 载入为字符串 example.txt
+def python_exec(program, context_in, context_out, namespace=None):
+    if namespace is None: namespace = {}
+    for it in context_in:
+        name, value = it[0], it[1]
+        if type(value) is str: value = eval(python_code_cache.compile(value, "eval"), namespace)
+        namespace[name] = value
+    exec(python_code_cache.compile(program), namespace)
+    for it in context_out:
+        it[1] = namespace[it[0]]
+    return namespace
+
+
+# Python工作进程的主循环：从标准输入读取请求，执行后将载出的上下文与程序输出写回。
+# 协议使用原标准输出，程序运行期间的输出按次收集后随结果返回
+def python_worker(preload=()):
+    for name in preload: __import__(name)
+    requests = sys.stdin.buffer
+    results = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)  # 直接写入文件描述符1的输出转到标准错误，避免破坏协议
+    while True:
+        try:
+            program, context_in, names = pickle.load(requests)
+        except EOFError:
+            return
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                namespace = python_exec(program, context_in, [])
+            result = pickle.dumps(("ok", [namespace[name] for name in names], output.getvalue()))
+        except Exception:
+            result = pickle.dumps(("error", traceback.format_exc(), output.getvalue()))
+        results.write(result)
+        results.flush()
+
+
+# Python工作进程：常驻的子进程，启动时预先载入解释器模块及指定的模块，之后反复执行程序
+class PythonWorker:
+    def __init__(self, preload=()):
+        here = os.path.dirname(os.path.abspath(__file__))
+        command = "import sys; sys.path.insert(0, %r); import CodeCompiler; CodeCompiler.python_worker(%r)" % (
+            here, list(preload))
+        self.process = subprocess.Popen([sys.executable, "-c", command], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.results = queue.Queue()
+        self.reader = threading.Thread(target=self.read, daemon=True)
+        self.reader.start()
+
+    # 读取线程：逐个读取执行结果，工作进程退出时放入None
+    def read(self):
+        try:
+            while True:
+                self.results.put(pickle.load(self.process.stdout))
+        except (EOFError, OSError, ValueError, pickle.UnpicklingError):
+            self.results.put(None)
+
+    # 发送已序列化的请求并等待结果，超时则结束工作进程
+    def exec(self, request, context_out, timeout=None):
+        try:
+            self.process.stdin.write(request)
+            self.process.stdin.flush()
+        except OSError:
+            self.stop()
+            raise RuntimeError("Python 工作进程已退出")
+        try:
+            result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            self.stop()
+            raise TimeoutError("Python 程序执行超时（" + str(timeout) + "秒）")
+        if result is None:
+            self.stop()
+            raise RuntimeError("Python 工作进程异常退出")
+        status, value, output = result
+        if output: print(output, end="")
+        if status != "ok": raise RuntimeError("Python 程序执行错误：\n" + value)
+        for n in range(len(context_out)):
+            context_out[n][1] = value[n]
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        if self.alive(): self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+# Python工作进程池：多个解释器共用，每次调用占用一个空闲的工作进程，多个调用可在多核上并行执行
+class PythonWorkerPool:
+    def __init__(self, size=None, timeout=None, preload=()):
+        self.size = size or os.cpu_count() or 1  # 工作进程数上限
+        self.timeout = timeout  # 默认的单次调用超时（秒），None表示不限
+        self.preload = tuple(preload)  # 工作进程启动时预先载入的模块
+        self.idle = []  # 空闲的工作进程
+        self.count = 0  # 已创建且未结束的工作进程数
+        self.condition = threading.Condition()
+
+    # 预先启动全部工作进程
+    def warm(self):
+        workers = [self.acquire() for _ in range(self.size - self.count + len(self.idle))]
+        for worker in workers: self.release(worker)
+
+    # 取得空闲的工作进程，没有空闲且未达上限时新建，否则等待
+    def acquire(self):
+        with self.condition:
+            while not self.idle and self.count >= self.size:
+                self.condition.wait()
+            if self.idle: return self.idle.pop()
+            self.count += 1
+        try:
+            return PythonWorker(self.preload)
+        except Exception:
+            with self.condition:
+                self.count -= 1
+                self.condition.notify()
+            raise
+
+    # 归还工作进程，已退出或超出上限的工作进程直接结束
+    def release(self, worker):
+        with self.condition:
+            if worker.alive() and self.count <= self.size:
+                self.idle.append(worker)
+            else:
+                worker.stop()
+                self.count -= 1
+            self.condition.notify()
+
+    # 在工作进程中执行程序，结果写回context_out；上下文无法序列化时在本进程执行
+    def exec(self, program, context_in, context_out, timeout=None):
+        try:
+            request = pickle.dumps((program, context_in, [it[0] for it in context_out]))
+        except Exception:
+            python_exec(program, context_in, context_out)
+            return
+        worker = self.acquire()
+        try:
+            worker.exec(request, context_out, self.timeout if timeout is None else timeout)
+        finally:
+            self.release(worker)
+
+    def resize(self, size):
+        with self.condition:
+            self.size = size
+            while self.idle and self.count > self.size:
+                self.idle.pop().stop()
+                self.count -= 1
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                self.idle.pop().stop()
+                self.count -= 1
+
+
+# 共享的Python工作进程池：首次使用时创建并预先启动，之后按最近一次请求的规模调整
+python_pool = None
+python_pool_lock = threading.Lock()
+
+
+def get_python_pool(size=None):
+    global python_pool
+    with python_pool_lock:
+        if python_pool is None:
+            python_pool = PythonWorkerPool(size)
+            atexit.register(python_pool.close)
+            python_pool.warm()
+        elif size and size != python_pool.size:
+            python_pool.resize(size)
+        return python_pool
+
+
+# 异步执行时可以推迟的同步写操作：设置上下文、后端参数以及执行Python/Java程序，其余操作需先等待后端调用
+deferred_items = ("context-in", "context-out", "context-in-clear", "context-out-clear", "python", "java")
+
+
+def deferred_sync(item, name):
+    return item in deferred_items or (item == "program" and name in ("python", "java"))
+
+
+# 后端调用线程池：异步执行模式下，Python/Java程序在线程中执行，互不阻塞
+backend_executor = None
+
+
+def get_backend_executor():
+    global backend_executor
+    with python_pool_lock:
+        if backend_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            backend_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="udil-backend")
+        return backend_executor
+
+
+# Java后端会话：JVM只启动一次，源代码通过进程内的编译器接口编译，已载入的类按源代码缓存
+class JavaSession:
+    class_pattern = re.compile(r'public\s+class\s+(\w+)\s*\{')
+
+    def __init__(self, jvm_path, javac_path):
+        self.jvm_path = jvm_path
+        self.javac_path = javac_path  # 运行时没有编译器接口（仅有JRE）时改用javac编译
+        self.lock = threading.RLock()
+        self.jpype = None
+        self.compiler = None  # javax.tools.JavaCompiler
+        self.work_dir = None  # 会话私有的临时目录，存放编译产物，进程退出时删除
+        self.classes = {}  # 源代码 -> (Java类, run方法的参数名列表，没有run方法时为None)
+
+    # 启动JVM并取得编译器接口，JVM已由其他代码启动时直接使用
+    def start(self):
+        import jpype
+        if not jpype.isJVMStarted():
+            jpype.startJVM(self.jvm_path, "-ea", "-Dfile.encoding=utf-8", convertStrings=True)
+        self.jpype = jpype
+        self.compiler = jpype.JClass("javax.tools.ToolProvider").getSystemJavaCompiler()
+        self.work_dir = tempfile.mkdtemp(prefix="udil_java_")
+        atexit.register(shutil.rmtree, self.work_dir, True)
+
+    # 编译并载入程序中的公共类，同一源代码只编译一次
+    def load(self, program):
+        with self.lock:
+            loaded = self.classes.get(program)
+            if loaded is not None: return loaded
+            if self.jpype is None: self.start()
+            matches = self.class_pattern.findall(program)
+            if not matches:
+                diagnostics.error("Java 程序中没有公共类！")
+                return None
+            class_name = matches[0]
+            # 每份源代码使用独立的输出目录与类加载器，同名类的不同版本互不影响
+            out_dir = os.path.join(self.work_dir, hashlib.sha1(program.encode("utf-8")).hexdigest()[:16])
+            os.makedirs(out_dir, exist_ok=True)
+            code_path = os.path.join(out_dir, class_name + ".java")
+            with open(code_path, 'w', encoding="utf-8") as file:
+                file.write(program)
+            if not self.compile(code_path, out_dir): return None
+            jpype = self.jpype
+            URL = jpype.JClass("java.net.URL")
+            url = jpype.JClass("java.io.File")(out_dir).toURI().toURL()
+            loader = jpype.JClass("java.net.URLClassLoader")(jpype.JArray(URL)([url]))
+            java_class = jpype.JClass(class_name, loader=loader)
+            # 入口：public static run(...) 按参数名接收载入的上下文，否则调用 main
+            arguments = None
+            for method in java_class.class_.getMethods():
+                if str(method.getName()) == "run" and jpype.JClass("java.lang.reflect.Modifier").isStatic(
+                        method.getModifiers()):
+                    arguments = [str(parameter.getName()) for parameter in method.getParameters()]
+                    break
+            loaded = (java_class, arguments)
+            self.classes[program] = loaded
+            return loaded
+
+    # 编译Java文件，编译参数 -parameters 保留参数名，供按名称传入上下文
+    def compile(self, code_path, out_dir):
+        options = ["-parameters", "-encoding", "utf-8", "-d", out_dir, code_path]
+        if self.compiler is not None:
+            errors = self.jpype.JClass("java.io.ByteArrayOutputStream")()
+            if self.compiler.run(None, None, errors, *options) == 0: return True
+            diagnostics.error(f"Java 文件 {code_path} 编译失败. 错误信息: {errors.toString()}")
+            return False
+        try:
+            subprocess.run([self.javac_path] + options, check=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            diagnostics.error(f"Java 文件 {code_path} 编译失败. 错误信息: {e.stderr}")
+            return False
+
+    # 执行程序：程序未声明的上下文先加入同名静态字段；载入的上下文作为run方法的参数（或赋给同名静态字段），
+    # 载出的上下文从同名静态字段读取
+    def exec(self, program, context_in, context_out):
+        loaded = self.load(java_source(program, context_in, context_out))
+        if loaded is None: return
+        java_class, arguments = loaded
+        with self.lock:
+            values = dict((it[0], it[1]) for it in context_in)
+            if arguments is not None:
+                java_class.run(*[values.get(name) for name in arguments])
+            else:
+                for name, value in values.items():
+                    if hasattr(java_class, name): setattr(java_class, name, value)
+                java_class.main(None)
+            for it in context_out:
+                if hasattr(java_class, it[0]): it[1] = java_value(getattr(java_class, it[0]))
+
+
+# 载入/载出上下文在Java中的字段类型，载出上下文在首次执行前保存的是声明的类型名称
+java_types = {"int": "int", "real": "double", "text": "String"}
+java_keywords = {"return", "new", "throw", "case", "else", "assert", "yield"}
+
+
+def java_type(value):
+    if type(value) is bool: return "boolean"
+    if type(value) is int: return "int" if -2 ** 31 <= value < 2 ** 31 else "long"
+    if type(value) is float: return "double"
+    if type(value) is str: return java_types.get(value, "String")
+    return None
+
+
+# 程序中是否已声明（字段、局部变量或参数）该名称
+def java_declares(program, name):
+    pattern = r'([\w>\]]+)\s+' + re.escape(name) + r'\s*[;=,)]'
+    return any(word not in java_keywords for word in re.findall(pattern, program))
+
+
+# 在公共类中为程序未声明的上下文名称加入静态字段，程序可以直接使用载入的上下文、给载出的上下文赋值；
+# 字段不带初始值，同一程序的源代码只取决于上下文的名称与类型，编译结果可以复用
+def java_source(program, context_in, context_out):
+    fields = {}
+    for name, value in list(context_in) + list(context_out):
+        field_type = java_type(value)
+        if (field_type is not None) and (name not in fields) and not java_declares(program, name):
+            fields[name] = field_type
+    match = JavaSession.class_pattern.search(program)
+    if not fields or match is None: return program
+    extra_code = "".join("\n    static %s %s;" % (field_type, name) for name, field_type in fields.items())
+    return program[:match.end()] + extra_code + program[match.end():]
+
+
+# 将Java返回值转化为解释器使用的Python值
+def java_value(value):
+    if isinstance(value, int): return int(value)
+    if isinstance(value, float): return float(value)
+    if isinstance(value, str): return str(value)
+    return value
+
+
+# 共享的Java会话：JVM在进程内只能启动一次，所有解释器共用同一个会话
+java_session = None
+java_lock = threading.Lock()
+
+
+def get_java_session(jvm_path, javac_path):
+    global java_session
+    with java_lock:
+        if java_session is None: java_session = JavaSession(jvm_path, javac_path)
+        java_session.javac_path = javac_path
+        return java_session
 
 
 class Sync:
@@ -576,6 +1457,13 @@ class Sync:
         self.udil_temp = None
         self.jvm_path = "D:/Program/JDK21/bin/server/jvm.dll"
         self.javac_path = "D:/Program/JDK21/bin/javac"
+        self.python_workers = 0  # Python工作进程数，0表示在本进程内执行
+        self.python_timeout = None  # 工作进程中单次执行的超时（秒）
+        self.python_session = None  # 当前使用的Python会话名称，None表示每次执行使用新的命名空间
+        self.python_sessions = {}  # 会话名称 -> 命名空间，按最近使用的先后排列
+        self.python_session_limit = 8  # 保留的会话数上限，超出时淘汰最久未使用的会话
+        self.deferred = False  # 异步执行模式：Python/Java程序提交到线程池后立即返回
+        self.pending = []  # 未完成的后端调用：(future, [(载出上下文的条目, 条目的副本)])
 
     def sync_write(self, item, name, value):
         # print("成功执行 sync write")
@@ -586,13 +1474,14 @@ class Sync:
             name = name.replace("\"", '')
         if type(value) is str:
             if item != "udil": value = value.replace("\"", '')
+        if self.pending and not deferred_sync(item, name): self.settle()
         if item == "program": self.sync_exec(name, value)
         if item == "statement": self.sync_eval(name, value)
         if item == "context-in-clear": self.context_in = []
         if item == "context-out-clear": self.context_out = []
         if item == "context-in":
             l = [name, value]
-            if l not in self.context_in: self.context_in.append(l)
+            if l not in self.context_in: self.context_in.append([name, hold(value)])
         if item == "context-out":
             l = [name, value]
             if l not in self.context_out: self.context_out.append(l)
@@ -603,21 +1492,27 @@ class Sync:
         if item == "java":
             if name == "javac": self.javac_path = value
             if name == "jvm": self.jvm_path = value
+        if item == "python":
+            if name == "workers": self.python_workers = value
+            if name == "timeout": self.python_timeout = value or None
+            if name == "sessions": self.python_session_limit = value
+        if item == "python-session":
+            if value:
+                self.python_session = name
+            elif self.python_session == name:
+                self.python_session = None
+        if item == "python-session-clear": self.python_sessions.pop(name, None)
         if (item == "udil") and (type(self.parent_interpreter) is Interpreter):
             if name == "root": self.parent_interpreter.root = value
             if name == "text":
-                parser = MyYacc()
-                parser.debug = False
-                parser.build()
-                NodeAST = parser.exec(value)
-                N = NodeAST.child[0]
-                self.udil_temp = N.obj
+                parser = get_parser()
+                self.udil_temp = parser.exec(value, tree=False)[0]
             if name == "statement":
                 if value:
                     self.udil_temp = value.text
                 else:
                     self.udil_temp = None
-                    print("获取无效对象！")
+                    diagnostics.error("获取无效对象！")
             if name == "pc_counter": self.parent_interpreter.pc_counter = value
             if name == "restart":
                 if value == 1:
@@ -634,6 +1529,7 @@ class Sync:
         if type(name) is str:
             name = name.replace("\"", '')
         if item == "context-out":
+            self.settle()
             for it in self.context_out:
                 if name == it[0]:
                     r = it[1]
@@ -650,21 +1546,19 @@ class Sync:
         return r
 
     def sync_exec(self, compiler, program):
-        if compiler == "python":
-            code = ""
-            for it in self.context_in:
-                command = it[0] + "=" + str(it[1])
-                code = code + command + "\n"
-            code = code + program + "\nout = []"
-            for it in self.context_out:
-                code += "\nout.append(" + it[0] + ")\n"
-            exec(code)
-            output = eval("out")
-            for n in range(len(output)):
-                self.context_out[n][1] = output[n]
+        if self.deferred and (compiler == "java" or (compiler == "python" and self.python_session is None)):
+            # 异步执行：后端程序使用上下文的副本在线程池中执行，读取载出上下文前再将结果写回提交时的各条目，
+            # 提交后清空或重新登记的载出上下文不受影响，与同步执行的结果一致
+            context_in = [list(it) for it in self.context_in]
+            context_out = [list(it) for it in self.context_out]
+            future = get_backend_executor().submit(self.backend_exec, compiler, program, context_in, context_out)
+            self.pending.append((future, list(zip(self.context_out, context_out))))
+            return
+        self.settle()
+        if compiler in ("python", "java"): self.backend_exec(compiler, program, self.context_in, self.context_out)
         if compiler == "udil":
             if type(program) is not BlockStatement:
-                print("代码块错误！")
+                diagnostics.error("代码块错误！")
                 return
             temp_iter = Interpreter(MySymbolTable())
             temp_table = temp_iter.symbol_table
@@ -672,84 +1566,74 @@ class Sync:
                 var_name, var_value = it
                 if type(var_value) is int: temp_table.insert(var_name, "int", var_value)
                 if type(var_value) is float: temp_table.insert(var_name, "real", var_value)
-                if type(var_value) is list: temp_table.insert(var_name, "list", var_value)
+                if isinstance(var_value, list): temp_table.insert(var_name, "list", var_value)
                 if type(var_value) is str: temp_table.insert(var_name, "text", var_value)
                 if type(var_value) is BlockStatement: temp_table.insert(var_name, "block", var_value)
             for states in program.statements:
                 temp_iter.parse_statement(states)
             m = len(self.context_out)
             for n in range(m):
-                self.context_out[n][1] = temp_table.lookup(self.context_out[n][0])["value"]
+                self.context_out[n][1] = temp_table.lookup(self.context_out[n][0])[1]
+
+    # 执行Python/Java后端程序，结果写回context_out
+    def backend_exec(self, compiler, program, context_in, context_out):
+        if compiler == "python":
+            if self.python_session is not None:
+                # 会话中的对象（已载入的模块、模型等）保留在本进程内，不交给工作进程执行
+                python_exec(program, context_in, context_out, self.session_namespace(self.python_session))
+            elif self.python_workers:
+                try:
+                    get_python_pool(self.python_workers).exec(program, context_in, context_out, self.python_timeout)
+                except TimeoutError as e:
+                    diagnostics.error(e)
+            else:
+                python_exec(program, context_in, context_out)
         if compiler == "java":
-            class_pattern = re.compile(r'public\s+class\s+(\w+)\s*\{')
-            matches = class_pattern.findall(program)
-            class_name = matches[0]
-            first_occur = program.find('{')
-            extra_code = "\n"
-            for it in self.context_in:
-                name, value = it[0], it[1]
-                if type(value) is int: extra_code += "static int " + name + " = " + str(value) + ";\n"
-                if type(value) is float: extra_code += "static float " + name + " = " + str(value) + ";\n"
-                if type(value) is str: extra_code += "static String " + name + " = " + str(value) + ";\n"
-            for it in self.context_out:
-                name, c_type = it[0], it[1]
-                if c_type == "int": extra_code += "public static int qwertyuiop" + name + " (int zxcvbnm){return " + name + ";}\n"
-                if c_type == "real": extra_code += "public static float qwertyuiop" + name + " (int zxcvbnm){return " + name + ";}\n"
-                if c_type == "text": extra_code += "public static String qwertyuiop" + name + " (int zxcvbnm){return " + name + ";}\n"
-            program = program[0:first_occur + 1] + extra_code + program[first_occur + 1:]
-            Code_Path = os.getcwd() + "\\" + class_name + ".java"
-            Class_Path = os.getcwd() + "\\" + class_name + ".class"
-            try:
-                with open(Code_Path, 'w') as file:
-                    file.write(program)
-                # print(f"成功保存文本到文件 {Code_Path}")
-            except Exception as e:
-                print(f"保存文本时发生错误: {e}")
-            # 编译 Java 文件
-            self.compile_java(Code_Path)
-            # 启动JVM
-            jpype.startJVM(self.jvm_path, "-ea", "-Dfile.encoding=utf-8", convertStrings=True, classpath=[os.getcwd()])
-            SampleJavaClass = jpype.JClass(class_name)
-            # 创建 Java 对象
-            java_object = SampleJavaClass()
-            java_object.main(None)
-            for n in range(len(self.context_out)):
-                self.context_out[n][1] = eval("java_object.qwertyuiop" + self.context_out[n][0] + "(0)")
-            try:
-                if os.path.exists(Code_Path):
-                    os.remove(Code_Path)
-                    # print(f"成功删除文件 {Code_Path}")
-                else:
-                    print(f"文件 {Code_Path} 不存在")
-            except Exception as e:
-                print(f"删除文件时发生错误: {e}")
-            try:
-                if os.path.exists(Class_Path):
-                    os.remove(Class_Path)
-                    # print(f"成功删除文件 {Class_Path}")
-                else:
-                    print(f"文件 {Class_Path} 不存在")
-            except Exception as e:
-                print(f"删除文件时发生错误: {e}")
+            get_java_session(self.jvm_path, self.javac_path).exec(program, context_in, context_out)
+
+    # 按提交顺序等待未完成的后端调用，并将结果写回载出上下文；后端的异常在此处抛出
+    def settle(self):
+        while self.pending:
+            future, entries = self.pending.pop(0)
+            future.result()
+            for it, result in entries:
+                it[1] = result[1]
+
+    # 异步等待全部未完成的后端调用，等待期间事件循环可以运行其他解释器
+    async def settle_async(self):
+        import asyncio
+        if self.pending:
+            await asyncio.wait([asyncio.wrap_future(future) for future, _ in self.pending])
+        self.settle()
+
+    # 取得会话的命名空间，不存在时新建；会话数超出上限时淘汰最久未使用的会话
+    def session_namespace(self, name):
+        namespace = self.python_sessions.pop(name, None)
+        if namespace is None: namespace = {}
+        self.python_sessions[name] = namespace
+        while len(self.python_sessions) > max(self.python_session_limit, 1):
+            self.python_sessions.pop(next(iter(self.python_sessions)))
+        return namespace
 
     def sync_eval(self, context, statement):
         if context == "current":
             temp_iter = Interpreter(self.parent_table)
             temp_iter.parse_statement(statement)
 
-    def compile_java(self, code_path):
-        # 构建 javac 命令
-        compile_command = [self.javac_path, code_path]
-        try:
-            # 调用 javac 编译 Java 文件
-            subprocess.run(compile_command, check=True)
-            # print(f"Java 文件 {code_path} 编译成功.")
-        except subprocess.CalledProcessError as e:
-            print(f"Java 文件 {code_path} 编译失败. 错误信息: {e.stderr}")
+
+# 静态判断同步写语句在异步执行时能否推迟，键不是文本常量时按不能推迟处理
+def deferred_write(statement):
+    key = [k.value.replace("\"", '') if type(k) is ConstantExpression and type(k.value) is str else None
+           for k in statement.key]
+    return len(key) == 2 and deferred_sync(key[0], key[1])
+
+
+# 检查点数据的文件头：标识与格式版本，其后一个字节表示是否压缩
+checkpoint_magic = b"UDILCKPT1"
 
 
 class Interpreter:
-    def __init__(self, symbol_table: MySymbolTable, root=None):
+    def __init__(self, symbol_table: MySymbolTable, root=None, engine="tree"):
         self.symbol_table = symbol_table
         self.debug = True
         self.expression_parser = MyExpressionParser(self.symbol_table)
@@ -760,39 +1644,196 @@ class Interpreter:
         self.exec_index = False
         self.pc_counter = 0
         self.print_text = True
-
+        self.engine = engine  # 执行引擎："tree" 遍历语句对象，"vm" 编译为字节码后由虚拟机执行
+        self.vm = VirtualMachine(self) if engine == "vm" else None
+        self.resolved = None  # 已完成变量解析的根语句块
+        self.wait_table = {}  # 语句 -> 异步执行时是否需要先等待后端调用
+        self.steps = None  # 分时执行时未执行完的根语句块
+        self.optimizer = None  # 优化遍管理器（Optimizer.PassManager），为None时不做优化
+        self.profiler = None  # 语句级性能分析器（Profiler.Profiler），为None时不统计
+        self.statement_cache = StatementCache()  # 语句级解析缓存
+        self.frames = FramePool()  # if/while 代码块的作用域帧池
+
+    # 解析程序：再次解析修改后的程序时，未修改的顶层语句复用上一次解析得到的语句对象
     def parse_program(self, program):
-        parser = MyYacc()
-        parser.debug = False
-        parser.build()
-        NodeAST = parser.exec(program)
+        self.load_statements(self.statement_cache.parse(program))
+
+    # 解析程序文件：cache 为True时使用源文件旁的预编译文件（.udilc），与源代码和文法一致时直接载入语句，
+    # 否则解析后写入预编译文件，供下一次执行使用
+    def parse_file(self, path, cache=True):
+        with open(path, encoding="utf-8") as file:
+            program = file.read()
+        statements = load_compiled(compiled_path(path), program) if cache else None
+        if statements is None:
+            parser = get_parser()
+            statements = parser.exec(program, tree=False) or None
+            if cache and statements and (parser.result is not False) and (parser.lexer.result is not False):
+                save_compiled(compiled_path(path), program, statements)  # 有语法错误的程序不写入
+        self.load_statements(statements)
+
+    # 以顶层语句列表作为根语句块，statements 为None表示解析失败
+    def load_statements(self, statements):
         root = BlockStatement("root", [])
         self.pc_counter = 0
         self.root = root
-        if NodeAST:
-            for N in NodeAST.child:
-                obj = N.obj
-                self.root.statements.append(obj)
+        if statements is not None:
+            self.root.statements.extend(statements)
+            if self.optimizer: self.optimizer.run(self.root)
         else:
-            print("解析程序文件失败！")
+            diagnostics.error("解析程序文件失败！")
 
     def exec_root(self):
+        for _ in self.exec_steps(): pass
+
+    # 设置/取消性能分析器，虚拟机重新生成指令以统计表达式求值耗时（指令地址不变，可在暂停时设置）
+    def set_profiler(self, profiler=None):
+        self.profiler = profiler
+        self.expression_parser.profiler = profiler
+        if self.vm and (self.vm.root is not None):
+            root, registers = self.vm.root, self.vm.registers
+            self.vm.root = None
+            self.vm.compile(root)
+            if self.vm.paused is not None: self.vm.registers = registers  # 暂停时保留寄存器的内容
+
+    # 检查点：将已解析的程序、符号表链、执行位置与同步上下文保存为二进制数据，
+    # 载入时无需重新解析和执行。Python会话中的对象不保存
+    def checkpoint(self, compress=True):
+        self.sync.settle()
+        if self.resolved is not self.root:
+            MyResolver().resolve(self.root, self.symbol_table)
+            self.resolved = self.root
+        sync = self.sync
+        snapshot = {
+            "root": self.root, "symbol_table": self.symbol_table, "pc_counter": self.pc_counter,
+            "restart": self.restart, "exec_index": self.exec_index, "debug": self.debug,
+            "print_text": self.print_text, "engine": self.engine,
+            "sync": (sync.context_in, sync.context_out, sync.udil_temp, sync.jvm_path, sync.javac_path,
+                     sync.python_workers, sync.python_timeout, sync.python_session, sync.python_session_limit),
+            # 虚拟机在语句中途暂停时保存寄存器与暂停位置，指令在载入后重新编译，地址保持不变
+            "vm": (self.vm.registers, self.vm.paused, self.vm.budget) if self.vm and self.vm.paused else None,
+        }
+        data = pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+        if compress: return checkpoint_magic + b"z" + zlib.compress(data, 1)
+        return checkpoint_magic + b"p" + data
+
+    # 从检查点恢复解释器
+    @staticmethod
+    def restore(data):
+        if data[:len(checkpoint_magic)] != checkpoint_magic:
+            raise ValueError("不是有效的检查点数据")
+        body = data[len(checkpoint_magic) + 1:]
+        if data[len(checkpoint_magic):len(checkpoint_magic) + 1] == b"z": body = zlib.decompress(body)
+        snapshot = pickle.loads(body)
+        interpreter = Interpreter(snapshot["symbol_table"], snapshot["root"], snapshot["engine"])
+        interpreter.resolved = interpreter.root
+        interpreter.pc_counter = snapshot["pc_counter"]
+        interpreter.restart = snapshot["restart"]
+        interpreter.exec_index = snapshot["exec_index"]
+        interpreter.debug = snapshot["debug"]
+        interpreter.print_text = snapshot["print_text"]
+        sync = interpreter.sync
+        (sync.context_in, sync.context_out, sync.udil_temp, sync.jvm_path, sync.javac_path, sync.python_workers,
+         sync.python_timeout, sync.python_session, sync.python_session_limit) = snapshot["sync"]
+        sync.parent_table = interpreter.symbol_table
+        if snapshot["vm"] is not None:
+            interpreter.vm.compile(interpreter.root)
+            interpreter.vm.registers, interpreter.vm.paused, interpreter.vm.budget = snapshot["vm"]
+        return interpreter
+
+    # 复制解释器，用于从同一个已执行到某处的状态分出多次运行
+    def clone(self):
+        return Interpreter.restore(self.checkpoint(compress=False))
+
+    def save_checkpoint(self, path):
+        data = self.checkpoint()
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+        os.replace(path + ".tmp", path)  # 先写临时文件再替换，中途崩溃不会留下不完整的检查点
+
+    @staticmethod
+    def load_checkpoint(path):
+        with open(path, "rb") as file:
+            return Interpreter.restore(file.read())
+
+    # 异步执行根语句块：Python/Java程序调用立即返回，仅在之后的语句需要其结果时等待。
+    # 多个解释器可以在同一个事件循环中执行，各自的后端调用相互重叠。
+    # 语句全部在事件循环所在的线程中执行（表达式求值状态是模块级的，不能在多个线程中同时求值），只有后端调用在线程池中执行；
+    # 需要等待的复合语句改用虚拟机逐条执行，每条语句执行前异步等待未完成的后端调用
+    async def exec_root_async(self):
+        if self.vm is None:
+            self.engine = "vm"
+            self.vm = VirtualMachine(self)
+        self.sync.deferred = True
+        try:
+            steps = self.exec_steps()
+            statement = next(steps, None)
+            while statement is not None:
+                stepping = (statement is PAUSED) or self.waits(statement)
+                if stepping: await self.sync.settle_async()
+                self.vm.budget = 1 if stepping else -1
+                statement = next(steps, None)
+            await self.sync.settle_async()
+        finally:
+            self.vm.budget = -1
+            self.sync.deferred = False
+
+    # 语句是否需要等待未完成的后端调用：包含同步读语句，或者包含异步执行时不能推迟的同步写语句
+    def waits(self, statement):
+        result = self.wait_table.get(statement)
+        if result is None:
+            result = False
+            if type(statement) is SYNCReadStatement: result = True
+            if type(statement) is SYNCWriteStatement: result = not deferred_write(statement)
+            for block in (getattr(statement, "statements", None), getattr(statement, "main_block", None),
+                          getattr(statement, "else_block", None)):
+                if block and any(self.waits(s) for s in block): result = True
+            self.wait_table[statement] = result
+        return result
+
+    # 分时执行根语句块：最多执行 quota 条语句后暂停，返回实际执行的语句数以及程序是否执行完毕。
+    # 只有虚拟机能在复合语句（例如循环）内部暂停，因此分时执行时改用虚拟机
+    def step(self, quota):
+        if self.vm is None:
+            self.engine = "vm"
+            self.vm = VirtualMachine(self)
+        if self.steps is None: self.steps = self.exec_steps()
+        self.vm.budget = quota
+        for _ in self.steps:
+            if self.vm.budget == 0: return quota, False
+        self.steps = None
+        executed = quota - self.vm.budget
+        self.vm.budget = -1
+        return executed, True
+
+    # 逐条执行根语句块，每条语句执行前先交出该语句
+    def exec_steps(self):
         loop_mark = True
         while loop_mark:
             loop_mark = False
-            if self.debug: print("\n\n\n\n\n\n\n\n\n\n")
-            if self.debug: print("Test begin")
-            if self.debug: print()
+            if self.debug: diagnostics.debug("\n\n\n\n\n\n\n\n\n\n")
+            if self.debug: diagnostics.debug("Test begin")
+            if self.debug: diagnostics.debug("")
             statements = self.root.statements
+            if self.resolved is not self.root:
+                MyResolver().resolve(self.root, self.symbol_table)
+                self.resolved = self.root
+            if self.vm: self.vm.compile(self.root)
             m = -1
             for statement in statements:
                 m += 1
                 if self.exec_index:
                     if m < self.root.exec_counter: continue
                 if m < self.pc_counter: continue
-                result = self.parse_statement(statement)
-                if self.debug: print(result)
-                if self.debug: print()
+                yield statement
+                if self.vm:
+                    result = self.vm.run(m)
+                    while result is PAUSED:
+                        yield PAUSED
+                        result = self.vm.run(m)
+                else:
+                    result = self.parse_statement(statement)
+                if self.debug: diagnostics.debug(result)
+                if self.debug: diagnostics.debug("")
                 if self.restart: break
                 self.pc_counter += 1
             if self.debug: self.symbol_table.display()
@@ -802,6 +1843,8 @@ class Interpreter:
 
     def parse_statement(self, statement):
         r2 = False
+        profiler = self.profiler
+        if profiler is not None: profiler.enter(statement)
         self.sync.parent_table = self.symbol_table
         if type(statement) is DeclarationStatement:
             r2 = self.parse_declaration_statement(statement)
@@ -821,19 +1864,23 @@ class Interpreter:
             r2 = self.parse_expression_statement(statement)
         if type(statement) is WhileStatement:
             r2 = self.parse_while_statement(statement)
-        if self.print_text: print("statement text:  " + statement.text)
-        if r2 is False: print(f"Error Statement = {type(statement)} , Error Row = {statement.position} ")
+        if self.print_text and diagnostics.enabled(TEXT):
+            diagnostics.text("statement text:  " + statement.text, statement.position)
+        if r2 is False:
+            diagnostics.error(f"Error Statement = {type(statement)} , Error Row = {statement.position} ",
+                              statement.position)
+        if profiler is not None: profiler.leave()
         return r2
 
     def parse_declaration_statement(self, statement: DeclarationStatement):
-        if self.debug: print("parse_declaration_statement ********************")
+        if self.debug: diagnostics.debug("parse_declaration_statement ********************")
         if type(statement) is not DeclarationStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
         var_name = statement.ID
         var_type = statement.data_type
         r3 = False
-        # if self.debug: print("ID= " + var_name + "  " + "type= " + var_type)
+        # if self.debug: diagnostics.debug("ID= " + var_name + "  " + "type= " + var_type)
         if var_type == "int":
             r3 = self.symbol_table.insert(var_name, var_type, 0)
         if var_type == "real":
@@ -841,32 +1888,32 @@ class Interpreter:
         if var_type == "text":
             r3 = self.symbol_table.insert(var_name, var_type, "")
         if var_type == "list":
-            r3 = self.symbol_table.insert(var_name, var_type, [])
+            r3 = self.symbol_table.insert(var_name, var_type, ListValue())
         if var_type == "statement":
             r3 = self.symbol_table.insert(var_name, var_type, None)
         if r3 is False:
-            print("编译错误：变量重复定义")
+            diagnostics.error("编译错误：变量重复定义")
             return False
         return True
 
     def parse_decl_assgn_statement(self, statement: DeclAssgnStatement):
-        if self.debug: print("parse_decl_assgn_statementt ********************")
+        if self.debug: diagnostics.debug("parse_decl_assgn_statementt ********************")
         if type(statement) is not DeclAssgnStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
         var_name = statement.ID
         var_type = statement.data_type
         var_value = None
         if var_type == "text":
-            var_value = self.expression_parser.parser_exp(statement.expression, text=True)
+            var_value = self.expression_parser.parser_exp(statement.expression, text=True, scope=statement.scope)
         elif (var_type == "int") or (var_type == "real"):
-            var_value = self.expression_parser.parser_exp(statement.expression, logic=True)
+            var_value = self.expression_parser.parser_exp(statement.expression, logic=True, scope=statement.scope)
         else:
-            var_value = self.expression_parser.parser_exp(statement.expression, obj=True)
+            var_value = self.expression_parser.parser_exp(statement.expression, obj=True, scope=statement.scope)
         if var_value is None:
             return False
         r3 = False
-        # if self.debug: print("ID= " + var_name + "  " + "type= " + var_type)
+        # if self.debug: diagnostics.debug("ID= " + var_name + "  " + "type= " + var_type)
         if var_type == "int":
             r3 = self.symbol_table.insert(var_name, var_type, var_value)
         if var_type == "real":
@@ -878,177 +1925,560 @@ class Interpreter:
         if var_type == "statement":
             r3 = self.symbol_table.insert(var_name, var_type, var_value)
         if r3 is False:
-            print("编译错误：变量重复定义")
+            diagnostics.error("编译错误：变量重复定义")
             return False
         return True
 
     def parse_assignment_statement(self, statement: AssignmentStatement):
-        if self.debug: print("parse_assignment_statement ********************")
+        if self.debug: diagnostics.debug("parse_assignment_statement ********************")
         if type(statement) is not AssignmentStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
         variable = statement.variable
-        # if self.debug: print("variable= " + str(variable) + "  expression= " + str(statement.expression))
+        # if self.debug: diagnostics.debug("variable= " + str(variable) + "  expression= " + str(statement.expression))
         if type(variable) is list:
-            value = self.expression_parser.parser_exp(statement.expression)
+            value = self.expression_parser.parser_exp(statement.expression, scope=statement.scope)
             if value is None:
                 return False
             var_name = variable[0]
-            var_index = self.expression_parser.parser_exp(variable[1])
-            var_index2 = 0
-            if len(variable) == 3:
-                var_index2 = self.expression_parser.parser_exp(variable[2])
-            lookup = self.symbol_table.lookup(var_name)
-            if lookup is None:
+            indexes = [self.expression_parser.parser_exp(v, scope=statement.scope) for v in variable[1:]]
+            if None in indexes:
                 return False
-            if type(lookup["value"]) is not list:
-                print("被索引对象不是列表，编译错误！")
+            location = self.symbol_table.locate(var_name)
+            if location is None:
+                self.symbol_table.lookup(var_name)  # 打印查找失败信息
                 return False
-            var_list = lookup["value"]
-            if len(variable) == 2:
-                if var_index >= len(var_list): var_list = var_list + [None] * (var_index + 1 - len(var_list))
-                var_list[var_index] = value
-            if len(variable) == 3:
-                if var_index >= len(var_list): var_list = var_list + [[None] * (var_index2 + 1)] * (
-                        var_index + 1 - len(var_list))
-                var_list[var_index][var_index2] = value
-            r = self.symbol_table.update(var_name, lookup["type"], var_list)
-            if r:
-                return True
-            else:
+            table, slot = location
+            var_list = table.values[slot]
+            if not isinstance(var_list, list):
+                diagnostics.error("被索引对象不是列表，编译错误！")
                 return False
+            # 沿各级下标逐层取得可修改的列表，共享的列表先复制，下标超出长度时原地扩展
+            root = target = own_list(var_list)
+            for k, var_index in enumerate(indexes):
+                if var_index >= len(target): target.extend([None] * (var_index + 1 - len(target)))
+                if k == len(indexes) - 1:
+                    target[var_index] = hold(value)
+                    break
+                row = target[var_index]
+                if row is None:
+                    row = ListValue()
+                elif not isinstance(row, list):
+                    diagnostics.error("被索引对象不是列表，编译错误！")
+                    return False
+                row = own_list(row)
+                row.refs = 1
+                target[var_index] = row
+                target = row
+            if root is not var_list: table.values[slot] = root
+            return True
         else:
             var_name = variable
-            lookup = self.symbol_table.lookup(var_name)
-            if lookup is None:
+            if statement.scope is None:
+                location = self.symbol_table.locate(var_name)
+            else:
+                location = statement.scope.locator(var_name)(self.symbol_table)
+            if location is None:
+                self.symbol_table.lookup(var_name)  # 打印查找失败信息
                 return False
+            table, slot = location
+            var_type = table.types[slot]
             value = None
-            if lookup["type"] == "text":
-                value = self.expression_parser.parser_exp(statement.expression, text=True)
-            elif (lookup["type"] == "int") or (lookup["type"] == "real"):
-                value = self.expression_parser.parser_exp(statement.expression, logic=True)
+            if var_type == "text":
+                value = self.expression_parser.parser_exp(statement.expression, text=True, scope=statement.scope)
+            elif (var_type == "int") or (var_type == "real"):
+                value = self.expression_parser.parser_exp(statement.expression, logic=True, scope=statement.scope)
             else:
-                value = self.expression_parser.parser_exp(statement.expression, obj=True)
+                value = self.expression_parser.parser_exp(statement.expression, obj=True, scope=statement.scope)
             if value is None:
                 return False
-            type_compare = self.expression_parser.compare_exp_type(lookup["type"], value)
-            if type_compare is False:
-                print("编译错误-赋值语句错误-类型不匹配")
-                return False
-            r = self.symbol_table.update(var_name, lookup["type"], value)
-            if r:
-                return True
-            else:
-                return False
+            # 类型推导已证明类型必然正确的赋值不再检查
+            if (statement.scope is None) or not statement.scope.assignable(var_name, statement.expression):
+                type_compare = self.expression_parser.compare_exp_type(var_type, value)
+                if type_compare is False:
+                    diagnostics.error("编译错误-赋值语句错误-类型不匹配")
+                    return False
+            table.values[slot] = hold(value)
+            return True
 
     def parse_block_statement(self, statement: BlockStatement):
-        if self.debug: print("parse_block_statement ********************")
+        if self.debug: diagnostics.debug("parse_block_statement ********************")
         if type(statement) is not BlockStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
         r = self.symbol_table.insert(statement.ID, "block", statement)
         return r
 
     def parse_expression_statement(self, statement: ExpressionStatement):
-        if self.debug: print("parse_expression_statement ********************")
+        if self.debug: diagnostics.debug("parse_expression_statement ********************")
         return True
 
     def parse_if_statement(self, statement: IfStatement):
-        if self.debug: print("parse_if_statement ********************")
+        if self.debug: diagnostics.debug("parse_if_statement ********************")
         if type(statement) is not IfStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
-        exp = self.expression_parser.parser_exp(statement.expression)
+        exp = self.expression_parser.parser_exp(statement.expression, scope=statement.scope)
         r4 = True
-        temp_table = MySymbolTable()
-        temp_table.parent = self.symbol_table
         if exp != 0:
-            main_block = statement.main_block
-            self.symbol_table = temp_table
-            for state in main_block:
-                r = self.parse_statement(state)
-                if r is False: r4 = False
-            self.symbol_table = self.symbol_table.parent
+            if not self.parse_scoped_block(statement.main_block, statement.main_scope): r4 = False
         else:
             else_block = statement.else_block
             if else_block:
-                self.symbol_table = temp_table
-                for state in else_block:
-                    r = self.parse_statement(state)
-                    if r is False: r4 = False
-                self.symbol_table = self.symbol_table.parent
+                if not self.parse_scoped_block(else_block, statement.else_scope): r4 = False
         return r4
 
+    # 在新的作用域中执行代码块，作用域从帧池取得，执行后放回，返回代码块中的语句是否全部执行成功
+    def parse_scoped_block(self, block, scope):
+        parent = self.symbol_table
+        temp_table = self.frames.acquire(scope, parent)
+        self.symbol_table = temp_table
+        self.expression_parser.symbol_table = temp_table
+        result = True
+        for state in block:
+            r = self.parse_statement(state)
+            if r is False: result = False
+        self.symbol_table = parent
+        self.expression_parser.symbol_table = parent
+        self.frames.release(temp_table)
+        return result
+
     def parse_while_statement(self, statement: WhileStatement):
-        if self.debug: print("parse_while_statement ********************")
+        if self.debug: diagnostics.debug("parse_while_statement ********************")
         if type(statement) is not WhileStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
-        exp = self.expression_parser.parser_exp(statement.expression)
+        statement.entries += 1
+        exp = self.expression_parser.parser_exp(statement.expression, scope=statement.scope)
         r5 = True
-        temp_table = MySymbolTable()
-        temp_table.parent = self.symbol_table
         while exp != 0:
-            main_block = statement.main_block
-            self.symbol_table = temp_table
-            for state in main_block:
-                r = self.parse_statement(state)
-                if r is False: r5 = False
-            self.symbol_table = self.symbol_table.parent
-            exp = self.expression_parser.parser_exp(statement.expression)
+            # 每次迭代使用新的作用域，循环体中的声明在下一次迭代重新执行
+            if not self.parse_scoped_block(statement.main_block, statement.main_scope): r5 = False
+            exp = self.expression_parser.parser_exp(statement.expression, scope=statement.scope)
         return r5
 
     def parse_sync_write_statement(self, statement: SYNCWriteStatement):
-        if self.debug: print("parse_sync_write_statement ********************")
+        if self.debug: diagnostics.debug("parse_sync_write_statement ********************")
         if type(statement) is not SYNCWriteStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
         key, value = statement.key, statement.value
         r = False
         if len(key) == 2:
             r = True
-            key[0] = self.expression_parser.parser_exp(key[0])
-            key[1] = self.expression_parser.parser_exp(key[1])
-            value_out = self.expression_parser.parser_exp(value)
+            item = self.expression_parser.parser_exp(key[0], scope=statement.scope)
+            name = self.expression_parser.parser_exp(key[1], scope=statement.scope)
+            value_out = self.expression_parser.parser_exp(value, scope=statement.scope)
             temp = ""
-            if type(key[0]) is str:
-                temp = key[0].replace("\"", '')
-                if temp == "statement": value_out = self.expression_parser.parser_exp(value, obj=True)
-            self.sync.sync_write(key[0], key[1], value_out)
+            if type(item) is str:
+                temp = item.replace("\"", '')
+                if temp == "statement": value_out = self.expression_parser.parser_exp(value, obj=True, scope=statement.scope)
+            if self.profiler is not None:
+                start = time.perf_counter()
+                self.sync.sync_write(item, name, value_out)
+                self.profiler.sync(time.perf_counter() - start)
+            else:
+                self.sync.sync_write(item, name, value_out)
         return r
 
     def parse_sync_read_statement(self, statement: SYNCReadStatement):
-        if self.debug: print("parse_sync_read_statement ********************")
+        if self.debug: diagnostics.debug("parse_sync_read_statement ********************")
         if type(statement) is not SYNCReadStatement:
-            print("Error Statement Type!")
+            diagnostics.error("Error Statement Type!")
             return False
         key, value, s_type = statement.key, statement.value, statement.s_type
         r = False
         if len(value) == 2:
             r = True
-            value[0] = self.expression_parser.parser_exp(value[0])
-            value[1] = self.expression_parser.parser_exp(value[1])
-            return_value = self.sync.sync_read(value[0], value[1])
+            item = self.expression_parser.parser_exp(value[0], scope=statement.scope)
+            name = self.expression_parser.parser_exp(value[1], scope=statement.scope)
+            if self.profiler is not None:
+                start = time.perf_counter()
+                return_value = self.sync.sync_read(item, name)
+                self.profiler.sync(time.perf_counter() - start)
+            else:
+                return_value = self.sync.sync_read(item, name)
             if s_type:
                 rrr = self.symbol_table.insert(key, s_type, return_value)
                 if rrr:
                     return True
                 else:
-                    print("编译错误 sync read 变量已重复定义")
+                    diagnostics.error("编译错误 sync read 变量已重复定义")
                     return False
             l1 = self.symbol_table.lookup(key)
             if l1:
-                if self.expression_parser.compare_exp_type(l1["type"], l1["value"]):
-                    r = self.symbol_table.update(key, l1["type"], return_value)
+                if self.expression_parser.compare_exp_type(l1[0], l1[1]):
+                    r = self.symbol_table.update(key, l1[0], return_value)
                 else:
                     r = False
-                    print("编译错误 sync read 类型不一致")
+                    diagnostics.error("编译错误 sync read 类型不一致")
             else:
                 r = False
-                print("编译错误 sync read 变量不存在")
+                diagnostics.error("编译错误 sync read 变量不存在")
         return r
 
 
+# 虚拟机指令：每条指令为 (操作码, 参数a, 参数b, 参数c)，参数中的寄存器以下标表示
+OP_ASSIGN = 0  # 变量赋值：a=语句，b=(定位函数, {变量类型: 求值函数})，c=上级结果寄存器
+OP_STORE = 1  # 类型必然正确的变量赋值，不检查类型：a=语句，b=(定位函数, 求值函数)，c=上级结果寄存器
+OP_BRANCH = 2  # 条件跳转：a=条件求值函数(逻辑, 文本, 对象)或静态类型选定的(求值函数,)，b=跳转地址，c=条件不为0时跳转
+OP_JUMP = 3  # 无条件跳转：a=目标地址
+OP_LEAVE = 4  # 退出作用域，作用域放回帧池，回到父作用域
+OP_NEW_SCOPE = 5  # 从帧池取得新的作用域并进入：c=静态作用域布局
+OP_DECL_ASSIGN = 6  # 声明并赋值：a=语句，b=求值函数，c=上级结果寄存器
+OP_DECLARE = 7  # 声明变量：a=语句，c=上级结果寄存器
+OP_CALL = 8  # 调用解释器处理语句：a=语句，b=处理函数名，c=上级结果寄存器
+OP_BEGIN = 9  # 复合语句开始：a=结果寄存器，b=提示信息，c=语句（循环语句在进入循环时计数）
+OP_END = 10  # 复合语句结束：a=结果寄存器，b=上级结果寄存器，c=语句
+OP_RETURN = 11  # 顶层语句执行结束
+
+PAUSED = object()  # 虚拟机用完可执行的语句数、暂停执行的标记
+
+# 声明语句的默认值
+default_values = {"int": lambda: 0, "real": lambda: 0.0, "text": lambda: "", "list": ListValue,
+                  "statement": lambda: None}
+# 变量类型对应的值类型，与 compare_exp_type 一致
+value_types = {"int": (int,), "real": (float,), "text": (str,), "list": (ListValue, list)}
+
+
+# 基于寄存器的字节码虚拟机：将语句对象降低为带显式跳转的线性指令序列后执行
+class VirtualMachine:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.root = None  # 已编译的根语句块
+        self.code = []  # 线性指令序列
+        self.entries = []  # 每条顶层语句的入口地址
+        self.registers = []  # 寄存器：复合语句结果
+        self.budget = -1  # 剩余可执行的语句数，减到0时暂停；负数表示不限
+        self.paused = None  # 暂停时保存的 (指令地址, 当前符号表)
+
+    # 分配寄存器，返回寄存器下标
+    def register(self):
+        self.registers.append(None)
+        return len(self.registers) - 1
+
+    # 编译根语句块，根语句块未变化时复用已编译的指令
+    def compile(self, root):
+        if root is self.root: return
+        self.root = root
+        self.code = []
+        self.entries = []
+        self.registers = [True]  # 0号寄存器：顶层语句结果
+        for statement in root.statements:
+            self.entries.append(len(self.code))
+            self.emit_statement(statement, 0)
+            self.code.append((OP_RETURN, None, None, None))
+
+    # 编译并绑定表达式，启用性能分析时包装为统计求值耗时的求值函数
+    def bind(self, exp, mode, scope):
+        evaluator = expression_cache.bind(exp, mode, scope)
+        profiler = self.interpreter.profiler
+        return profiler.timed(evaluator) if profiler is not None else evaluator
+
+    # 条件表达式按静态类型选定的模式求值，类型未知时按 逻辑 -> 文本 -> 对象 的顺序求值，与 parser_exp 一致
+    def condition(self, expression, scope):
+        mode = scope.mode(expression) if scope is not None else None
+        if mode is not None: return (self.bind(expression, mode, scope),)
+        return (self.bind(expression, "logic", scope), self.bind(expression, "text", scope),
+                self.bind(expression, "obj", scope))
+
+    # 生成单条语句的指令，result 为上级结果寄存器
+    def emit_statement(self, statement, result):
+        code = self.code
+        if type(statement) is DeclarationStatement:
+            code.append((OP_DECLARE, statement, None, result))
+        elif type(statement) is DeclAssgnStatement:
+            if statement.data_type == "text":
+                mode = "text"
+            elif (statement.data_type == "int") or (statement.data_type == "real"):
+                mode = "logic"
+            else:
+                mode = "obj"
+            code.append((OP_DECL_ASSIGN, statement, self.bind(statement.expression, mode, statement.scope),
+                         result))
+        elif type(statement) is AssignmentStatement and type(statement.variable) is not list and (
+                statement.scope.assignable(statement.variable, statement.expression)):
+            scope = statement.scope
+            mode = type_modes[scope.declared[statement.variable]]
+            code.append((OP_STORE, statement, (scope.locator(statement.variable),
+                                               self.bind(statement.expression, mode, scope)), result))
+        elif type(statement) is AssignmentStatement and type(statement.variable) is not list:
+            scope = statement.scope
+            evaluators = {"text": self.bind(statement.expression, "text", scope),
+                          "int": self.bind(statement.expression, "logic", scope),
+                          "real": self.bind(statement.expression, "logic", scope),
+                          "obj": self.bind(statement.expression, "obj", scope)}
+            code.append((OP_ASSIGN, statement, (scope.locator(statement.variable), evaluators), result))
+        elif type(statement) is IfStatement and (type(statement.expression) is ConstantExpression) and (
+                statement.expression.data_type in ("int", "real")):
+            # 条件为数值常量（例如经过常量折叠）时不生成条件跳转，只生成会执行的分支
+            r = self.register()
+            code.append((OP_BEGIN, r, "parse_if_statement ********************", statement))
+            if statement.expression.value != 0:
+                block, scope = statement.main_block, statement.main_scope
+            else:
+                block, scope = statement.else_block, statement.else_scope
+            if block is not None:
+                code.append((OP_NEW_SCOPE, None, None, scope))
+                for s in block:
+                    self.emit_statement(s, r)
+                code.append((OP_LEAVE, None, None, None))
+            code.append((OP_END, r, result, statement))
+        elif type(statement) is IfStatement:
+            r = self.register()
+            code.append((OP_BEGIN, r, "parse_if_statement ********************", statement))
+            jump_else = len(code)
+            code.append(None)
+            code.append((OP_NEW_SCOPE, None, None, statement.main_scope))
+            for s in statement.main_block:
+                self.emit_statement(s, r)
+            code.append((OP_LEAVE, None, None, None))
+            jump_end = len(code)
+            code.append(None)
+            code[jump_else] = (OP_BRANCH, self.condition(statement.expression, statement.scope), len(code), False)
+            if statement.else_block:
+                code.append((OP_NEW_SCOPE, None, None, statement.else_scope))
+                for s in statement.else_block:
+                    self.emit_statement(s, r)
+                code.append((OP_LEAVE, None, None, None))
+            code[jump_end] = (OP_JUMP, len(code), None, None)
+            code.append((OP_END, r, result, statement))
+        elif type(statement) is WhileStatement:
+            # 循环体在前，条件判断在后，每次迭代只执行一次跳转；每次迭代使用新的作用域
+            r = self.register()
+            code.append((OP_BEGIN, r, "parse_while_statement ********************", statement))
+            jump_condition = len(code)
+            code.append(None)
+            body = len(code)
+            code.append((OP_NEW_SCOPE, None, None, statement.main_scope))
+            for s in statement.main_block:
+                self.emit_statement(s, r)
+            code.append((OP_LEAVE, None, None, None))
+            code[jump_condition] = (OP_JUMP, len(code), None, None)
+            code.append((OP_BRANCH, self.condition(statement.expression, statement.scope), body, True))
+            code.append((OP_END, r, result, statement))
+        else:
+            handler = None
+            if type(statement) is AssignmentStatement: handler = "parse_assignment_statement"
+            if type(statement) is BlockStatement: handler = "parse_block_statement"
+            if type(statement) is SYNCWriteStatement: handler = "parse_sync_write_statement"
+            if type(statement) is SYNCReadStatement: handler = "parse_sync_read_statement"
+            if type(statement) is ExpressionStatement: handler = "parse_expression_statement"
+            code.append((OP_CALL, statement, handler, result))
+
+    # 执行第 m 条顶层语句，返回执行结果；语句数用完时暂停并返回PAUSED，再次调用时从暂停处继续
+    def run(self, m):
+        global state
+        interpreter = self.interpreter
+        code = self.code
+        registers = self.registers
+        debug = interpreter.debug
+        print_text = interpreter.print_text and diagnostics.enabled(TEXT)  # 不输出时不生成语句文本
+        profiler = interpreter.profiler
+        frames = interpreter.frames
+        budget = self.budget
+        if profiler is not None: profiler.idle()
+        if self.paused is None:
+            registers[0] = True
+            table = interpreter.symbol_table
+            pc = self.entries[m]
+        else:
+            pc, table = self.paused
+            self.paused = None
+        while True:
+            op, a, b, c = code[pc]
+            pc += 1
+            if op == OP_ASSIGN:
+                if profiler is not None: profiler.enter(a)
+                if debug: diagnostics.debug("parse_assignment_statement ********************")
+                r = False
+                locate, evaluators = b
+                location = locate(table)
+                if location is None:
+                    table.lookup(a.variable)
+                else:
+                    frame, slot = location
+                    s_type = frame.types[slot]
+                    compiled = evaluators[s_type] if s_type in evaluators else evaluators["obj"]
+                    state = True
+                    value = compiled(table) if compiled else None
+                    if (compiled is not None) and state and (value is not None):
+                        if type(value) in value_types.get(s_type, ()):
+                            frame.values[slot] = hold(value)
+                            r = True
+                        else:
+                            diagnostics.error("编译错误-赋值语句错误-类型不匹配")
+            elif op == OP_STORE:
+                if profiler is not None: profiler.enter(a)
+                if debug: diagnostics.debug("parse_assignment_statement ********************")
+                r = False
+                locate, compiled = b
+                location = locate(table)
+                if location is None:
+                    table.lookup(a.variable)
+                else:
+                    state = True
+                    value = compiled(table) if compiled else None
+                    if (compiled is not None) and state and (value is not None):
+                        frame, slot = location
+                        frame.values[slot] = hold(value)
+                        r = True
+            elif op == OP_BRANCH:
+                value = None
+                for compiled in a:
+                    state = True
+                    value = compiled(table) if compiled else None
+                    if compiled is None: state = False
+                    if state: break
+                if not state: value = None
+                if (value != 0) is c: pc = b
+                if profiler is not None: profiler.mark()
+                continue
+            elif op == OP_JUMP:
+                pc = a
+                continue
+            elif op == OP_LEAVE:
+                parent = table.parent
+                frames.release(table)
+                table = parent
+                continue
+            elif op == OP_NEW_SCOPE:
+                table = frames.acquire(c, table)
+                continue
+            elif op == OP_DECL_ASSIGN:
+                if profiler is not None: profiler.enter(a)
+                if debug: diagnostics.debug("parse_decl_assgn_statementt ********************")
+                r = False
+                state = True
+                value = b(table) if b else None
+                if (b is not None) and state and (value is not None):
+                    if a.data_type in default_values:
+                        r = table.insert(a.ID, a.data_type, value)
+                    if r is False: diagnostics.error("编译错误：变量重复定义")
+            elif op == OP_DECLARE:
+                if profiler is not None: profiler.enter(a)
+                if debug: diagnostics.debug("parse_declaration_statement ********************")
+                r = False
+                if a.data_type in default_values:
+                    r = table.insert(a.ID, a.data_type, default_values[a.data_type]())
+                if r is False: diagnostics.error("编译错误：变量重复定义")
+            elif op == OP_CALL:
+                # 解释器的语句处理函数使用解释器当前的符号表
+                if profiler is not None: profiler.enter(a)
+                interpreter.symbol_table = table
+                interpreter.expression_parser.symbol_table = table
+                interpreter.sync.parent_table = table
+                r = getattr(interpreter, b)(a) if b else False
+            elif op == OP_BEGIN:
+                registers[a] = True
+                if type(c) is WhileStatement: c.entries += 1
+                if profiler is not None: profiler.enter(c)
+                if debug: diagnostics.debug(b)
+                continue
+            elif op == OP_END:
+                if print_text: diagnostics.text("statement text:  " + c.text, c.position)
+                if registers[a] is False:
+                    diagnostics.error(f"Error Statement = {type(c)} , Error Row = {c.position} ", c.position)
+                    registers[b] = False
+                if profiler is not None: profiler.leave()
+                continue
+            else:
+                interpreter.symbol_table = table
+                interpreter.expression_parser.symbol_table = table
+                self.budget = budget
+                return registers[0]
+            # 单条语句执行结束：打印语句并向上级报告错误
+            if print_text: diagnostics.text("statement text:  " + a.text, a.position)
+            if r is False:
+                diagnostics.error(f"Error Statement = {type(a)} , Error Row = {a.position} ", a.position)
+                registers[c] = False
+            if profiler is not None: profiler.leave()
+            budget -= 1
+            if budget == 0:
+                # 暂停时解释器的当前符号表为正在执行的作用域（此前的作用域可能已放回帧池）
+                interpreter.symbol_table = table
+                interpreter.expression_parser.symbol_table = table
+                self.budget = 0
+                self.paused = (pc, table)
+                return PAUSED
+
+
+# 调度中的程序：记录优先级、已执行的语句数、占用的CPU时间以及完成情况
+class ScheduledProgram:
+    def __init__(self, interpreter, priority=1, name=None):
+        self.interpreter = interpreter
+        self.priority = priority  # 每轮可执行的语句数为调度器配额乘以优先级
+        self.name = name
+        self.statements = 0  # 已执行的语句数
+        self.cpu_time = 0.0  # 占用的CPU时间（秒）
+        self.slices = 0  # 获得的时间片数
+        self.submitted = time.perf_counter()
+        self.finished = None  # 执行完毕的时间
+        self.done = False
+        self.error = None  # 执行中抛出的异常
+
+    # 从提交到执行完毕经过的时间（秒）
+    def latency(self):
+        if self.finished is None: return None
+        return self.finished - self.submitted
+
+
+# 多程序调度器：轮流执行多个解释器，每次最多执行 配额×优先级 条语句，长时间运行的循环不会阻塞其他程序
+class Scheduler:
+    def __init__(self, quota=100):
+        self.quota = quota  # 优先级为1的程序每轮可执行的语句数
+        self.programs = []  # 全部程序，按提交顺序排列
+        self.active = []  # 尚未执行完毕的程序
+
+    # 加入已载入根语句块的解释器
+    def add(self, interpreter, priority=1, name=None):
+        program = ScheduledProgram(interpreter, priority, name or "program-" + str(len(self.programs) + 1))
+        self.programs.append(program)
+        self.active.append(program)
+        return program
+
+    # 解析程序文本并加入调度
+    def submit(self, text, priority=1, name=None):
+        interpreter = Interpreter(MySymbolTable(), engine="vm")
+        interpreter.parse_program(text)
+        return self.add(interpreter, priority, name)
+
+    # 执行一轮：每个未完成的程序获得一个时间片，返回是否还有未完成的程序
+    def step(self):
+        for program in list(self.active):
+            start = time.thread_time()
+            try:
+                executed, done = program.interpreter.step(self.quota * program.priority)
+            except Exception as e:
+                executed, done = 0, True
+                program.error = e
+                diagnostics.error(f"程序 {program.name} 执行出错: {e!r}")
+            program.cpu_time += time.thread_time() - start
+            program.statements += executed
+            program.slices += 1
+            if done:
+                program.done = True
+                program.finished = time.perf_counter()
+                self.active.remove(program)
+        return len(self.active) > 0
+
+    # 执行全部程序直至完成
+    def run(self):
+        while self.step(): pass
+        return self.programs
+
+    # 各程序的执行统计表，按CPU时间从高到低排列
+    def report(self):
+        lines = ["%-16s %8s %12s %8s %12s %12s %s" % ("程序", "优先级", "语句数", "时间片", "CPU时间(s)", "延迟(s)", "状态")]
+        for program in sorted(self.programs, key=lambda p: -p.cpu_time):
+            latency = program.latency()
+            status = "出错" if program.error else ("完成" if program.done else "运行中")
+            lines.append("%-16s %8d %12d %8d %12.4f %12s %s" % (program.name, program.priority, program.statements,
+                                                              program.slices, program.cpu_time,
+                                                              "-" if latency is None else "%.4f" % latency, status))
+        return "\n".join(lines)
+
+
 # 声明赋值运行测试
 RUN_DeclarationAssignment = '''
 int a;
@@ -1195,9 +2625,7 @@ RUN_TextStatSwap = RUN_TextStatSwap[1:]
 def RUN_Test(RUN_Code):
     interpreter = Interpreter(MySymbolTable())
     # interpreter.symbol_table.insert("x", "list", [1, 2, 3])
-    parser = MyYacc()
-    parser.debug = False
-    parser.build()
+    parser = get_parser()
     NodeAST = parser.exec(RUN_Code)
     print("\n\n\n\n\n\n\n\n\n\n")
     print("Test begin")
@@ -1215,9 +2643,10 @@ def RUN_Test(RUN_Code):
     print("Test end")
 
 
-# 开始代码测试
-# RUN_Test(RUN_UdilEXEC)
-RUN_Test(RUN_PythonEXEC)
+# 开始代码测试：仅在直接运行本文件时执行，导入本模块没有副作用
+if __name__ == "__main__":
+    # RUN_Test(RUN_UdilEXEC)
+    RUN_Test(RUN_PythonEXEC)
 
 '''
 inter = Interpreter(MySymbolTable())
@@ -0,0 +1,108 @@
+import contextlib
+
+# 诊断级别
+DEBUG = 10  # 调试信息：语法分析与语句处理过程、符号表内容
+TEXT = 20  # 已执行语句的文本
+WARNING = 30  # 警告
+ERROR = 40  # 词法、语法、语义与运行错误
+DISABLED = 100  # 没有输出时的级别，所有事件都被丢弃
+
+level_names = {DEBUG: "debug", TEXT: "text", WARNING: "warning", ERROR: "error"}
+
+
+# 诊断事件：级别、内容与源代码行号（未知时为None）
+class Event:
+    __slots__ = ('level', 'message', 'position')
+
+    def __init__(self, level, message, position=None):
+        self.level = level
+        self.message = message
+        self.position = position
+
+    def __str__(self):
+        return str(self.message)
+
+    def __repr__(self):
+        return "Event(%s, %r, %r)" % (level_names.get(self.level, self.level), self.message, self.position)
+
+
+# 输出到标准输出，与原先直接打印的内容一致
+def print_sink(event):
+    print(event.message)
+
+
+# 收集事件的输出，errors() 返回其中的错误
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def errors(self):
+        return [event for event in self.events if event.level >= ERROR]
+
+    def clear(self):
+        self.events.clear()
+
+
+# 诊断通道：事件按级别分发给各输出，每个输出有自己的最低级别。
+# 低于所有输出最低级别的事件在构造之前就被丢弃；调用方在构造消息代价较大时先用 enabled() 判断
+class Diagnostics:
+    def __init__(self):
+        self.sinks = [(print_sink, DEBUG)]  # (输出, 最低级别)
+        self.level = DEBUG  # 所有输出最低级别中的最小值
+
+    def refresh(self):
+        self.level = min((level for _, level in self.sinks), default=DISABLED)
+
+    def add_sink(self, sink, level=DEBUG):
+        self.sinks.append((sink, level))
+        self.refresh()
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks = [(s, level) for s, level in self.sinks if s is not sink]
+        self.refresh()
+
+    # 设置输出：set_sinks() 关闭全部输出
+    def set_sinks(self, *sinks, level=DEBUG):
+        self.sinks = [(sink, level) for sink in sinks]
+        self.refresh()
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, message, position=None):
+        if level < self.level: return
+        event = Event(level, message, position)
+        for sink, sink_level in self.sinks:
+            if level >= sink_level: sink(event)
+
+    def debug(self, message):
+        if DEBUG >= self.level: self.emit(DEBUG, message)
+
+    def text(self, message, position=None):
+        if TEXT >= self.level: self.emit(TEXT, message, position)
+
+    def warning(self, message, position=None):
+        self.emit(WARNING, message, position)
+
+    def error(self, message, position=None):
+        self.emit(ERROR, message, position)
+
+    # 临时把全部事件改为收集到列表中（不输出到标准输出），例如：
+    # with diagnostics.collect(ERROR) as sink: ...; sink.errors()
+    @contextlib.contextmanager
+    def collect(self, level=DEBUG):
+        saved = self.sinks
+        sink = ListSink()
+        self.set_sinks(sink, level=level)
+        try:
+            yield sink
+        finally:
+            self.sinks = saved
+            self.refresh()
+
+
+diagnostics = Diagnostics()  # 进程内共享的诊断通道
@@ -0,0 +1,278 @@
+import CodeCompiler
+from StatementParser import *
+
+
+# 语句的子语句列表：if 的两个分支、while 的循环体，代码块中的语句作为数据，不在这里列出
+def statement_blocks(statement):
+    if type(statement) is IfStatement:
+        return [b for b in (statement.main_block, statement.else_block) if b is not None]
+    if type(statement) is WhileStatement:
+        return [statement.main_block]
+    return []
+
+
+# 常量折叠：子表达式全部为常量时在优化阶段求值，替换为常量表达式。
+# 求值使用解释器的表达式编译器，并按表达式在原位置上的求值方式（是否在开头、是否允许比较运算）编译，
+# 原表达式在该位置不合法或求值出错时不折叠，保证运行时行为（包括错误）不变
+class ConstantFolding:
+    name = "constant-folding"
+
+    def __init__(self):
+        self.enabled = True
+        self.compiler = CodeCompiler.MyExpressionCompiler()
+        self.count = 0
+
+    def run(self, root):
+        self.count = 0
+        self.fold_statements(root.statements)
+        return self.count
+
+    def fold_statements(self, statements):
+        for statement in statements:
+            self.fold_statement(statement)
+
+    def fold_statement(self, statement):
+        t = type(statement)
+        if t is AssignmentStatement:
+            statement.expression = self.fold(statement.expression)
+            if type(statement.variable) is list:
+                for i in range(1, len(statement.variable)):
+                    statement.variable[i] = self.fold(statement.variable[i])
+        elif (t is DeclAssgnStatement) or (t is ExpressionStatement):
+            statement.expression = self.fold(statement.expression)
+        elif (t is IfStatement) or (t is WhileStatement):
+            statement.expression = self.fold(statement.expression)
+            for block in statement_blocks(statement):
+                self.fold_statements(block)
+        elif t is BlockStatement:
+            self.fold_statements(statement.statements)
+        # 同步语句的键需要保持原样（异步执行时据此判断能否推迟），不折叠
+
+    # start：表达式是否位于算术表达式开头；logic：是否允许比较运算
+    def fold(self, exp, start=True, logic=True):
+        t = type(exp)
+        if t is BinaryExpression:
+            if exp.operator in CodeCompiler.logic_operations:
+                exp.left, exp.right = self.fold(exp.left), self.fold(exp.right)
+            else:
+                exp.left, exp.right = self.fold(exp.left, start, False), self.fold(exp.right, False, False)
+            children = [exp.left, exp.right]
+        elif t is UnaryExpression:
+            exp.operand = self.fold(exp.operand, True, False)
+            children = [exp.operand]
+        elif t is ParenExpression:
+            exp.expression = self.fold(exp.expression, True, False)
+            children = [exp.expression]
+        elif t is IndexExpression:
+            exp.position = self.fold(exp.position, True, False)
+            return exp
+        elif t is ListExpression:
+            exp.elements = [self.fold(e) for e in exp.elements]
+            return exp
+        else:
+            return exp
+        for child in children:
+            if type(child) is not ConstantExpression: return exp
+        if (t is BinaryExpression) and (exp.operator == '/') and (exp.right.value == 0):
+            return exp  # 除数为0的错误留到运行时报告
+        value = self.evaluate(exp, start, logic)
+        if value is None: return exp
+        if type(value) is str:
+            result = ConstantExpression(value, "text")
+        else:
+            result = ConstantExpression(value, "real" if type(value) is float else "int")
+        result._text = exp.text  # 保留原表达式文本，显示与原程序一致
+        self.count += 1
+        return result
+
+    def evaluate(self, exp, start, logic):
+        build = self.compiler.logic(exp) if logic else self.compiler.math(exp, start)
+        if build is None: build = self.compiler.text(exp)
+        if build is None: return None
+        CodeCompiler.state = True
+        try:
+            value = build(None)(None)
+        except Exception:
+            return None
+        if not CodeCompiler.state: return None
+        return value
+
+
+# 死分支消除：条件为数值常量的 if 只保留会执行的分支，条件为0的 while 清空循环体
+class DeadBranchElimination:
+    name = "dead-branch"
+
+    def __init__(self):
+        self.enabled = True
+        self.count = 0
+
+    def run(self, root):
+        self.count = 0
+        self.eliminate(root.statements)
+        return self.count
+
+    def eliminate(self, statements):
+        for statement in statements:
+            if type(statement) is BlockStatement:
+                self.eliminate(statement.statements)
+                continue
+            condition = statement.expression if type(statement) in (IfStatement, WhileStatement) else None
+            if (type(condition) is ConstantExpression) and (condition.data_type in ("int", "real")):
+                if type(statement) is IfStatement:
+                    if condition.value != 0:
+                        if statement.else_block is not None: self.count += 1
+                        statement.else_block = None
+                    elif statement.main_block:
+                        self.count += 1
+                        statement.main_block = []
+                elif (condition.value == 0) and statement.main_block:
+                    self.count += 1
+                    statement.main_block = []
+            for block in statement_blocks(statement):
+                self.eliminate(block)
+
+
+# 循环不变量外提：循环中只读取循环内不会修改的变量的算术/文本子表达式，包装为循环不变表达式，
+# 每次进入循环只求值一次。循环中有同步语句时（可能修改符号表）不做处理
+class LoopInvariantHoisting:
+    name = "loop-invariant"
+
+    def __init__(self):
+        self.enabled = True
+        self.count = 0
+
+    def run(self, root):
+        self.count = 0
+        self.visit(root.statements)
+        return self.count
+
+    def visit(self, statements):
+        for statement in statements:
+            if type(statement) is WhileStatement:
+                changed = self.changed(statement.main_block)
+                if changed is not None: self.hoist_statement(statement, changed, statement)
+            for block in statement_blocks(statement):
+                self.visit(block)
+
+    # 循环体中被赋值或声明的变量名，包括嵌套语句；出现同步语句时返回None
+    def changed(self, statements, names=None):
+        if names is None: names = set()
+        for statement in statements:
+            t = type(statement)
+            if (t is SYNCReadStatement) or (t is SYNCWriteStatement):
+                return None
+            if t is AssignmentStatement:
+                names.add(statement.variable[0] if type(statement.variable) is list else statement.variable)
+            elif (t is DeclarationStatement) or (t is DeclAssgnStatement) or (t is BlockStatement):
+                names.add(statement.ID)
+            for block in statement_blocks(statement):
+                if self.changed(block, names) is None: return None
+        return names
+
+    def hoist_statement(self, statement, changed, loop):
+        t = type(statement)
+        if t is AssignmentStatement:
+            statement.expression = self.hoist(statement.expression, changed, loop)
+            if type(statement.variable) is list:
+                for i in range(1, len(statement.variable)):
+                    statement.variable[i] = self.hoist(statement.variable[i], changed, loop)
+        elif t in (DeclAssgnStatement, ExpressionStatement, IfStatement, WhileStatement):
+            statement.expression = self.hoist(statement.expression, changed, loop)
+        for block in statement_blocks(statement):
+            for s in block:
+                self.hoist_statement(s, changed, loop)
+
+    # 包装最大的不变子表达式：至少含一个运算与一个变量，不含索引、列表与调用
+    def hoist(self, exp, changed, loop):
+        t = type(exp)
+        if t in (BinaryExpression, UnaryExpression, ParenExpression):
+            if self.invariant(exp, changed) == (True, True) and self.has_operation(exp):
+                self.count += 1
+                return InvariantExpression(exp, loop)
+        if t is BinaryExpression:
+            exp.left, exp.right = self.hoist(exp.left, changed, loop), self.hoist(exp.right, changed, loop)
+        elif t is UnaryExpression:
+            exp.operand = self.hoist(exp.operand, changed, loop)
+        elif t is ParenExpression:
+            exp.expression = self.hoist(exp.expression, changed, loop)
+        elif t is IndexExpression:
+            exp.position = self.hoist(exp.position, changed, loop)
+        elif t is ListExpression:
+            exp.elements = [self.hoist(e, changed, loop) for e in exp.elements]
+        return exp
+
+    # 返回 (是否不变, 是否含变量)
+    def invariant(self, exp, changed):
+        t = type(exp)
+        if t is ConstantExpression:
+            return True, False
+        if t is IdentifierExpression:
+            return exp.name not in changed, True
+        if t is BinaryExpression:
+            left, right = self.invariant(exp.left, changed), self.invariant(exp.right, changed)
+            return left[0] and right[0], left[1] or right[1]
+        if t is UnaryExpression:
+            return self.invariant(exp.operand, changed)
+        if t is ParenExpression:
+            return self.invariant(exp.expression, changed)
+        return False, False
+
+    def has_operation(self, exp):
+        if (type(exp) is BinaryExpression) or (type(exp) is UnaryExpression): return True
+        if type(exp) is ParenExpression: return self.has_operation(exp.expression)
+        return False
+
+
+# 无用语句消除：删除 if/while 代码块中只计算表达式的语句。
+# 根语句块与代码块中的语句可能被作为数据索引，不做处理
+class NoOpElimination:
+    name = "no-op"
+
+    def __init__(self):
+        self.enabled = True
+        self.count = 0
+
+    def run(self, root):
+        self.count = 0
+        self.eliminate(root.statements)
+        return self.count
+
+    def eliminate(self, statements):
+        for statement in statements:
+            if type(statement) is IfStatement:
+                statement.main_block = self.remove(statement.main_block)
+                if statement.else_block is not None: statement.else_block = self.remove(statement.else_block)
+            elif type(statement) is WhileStatement:
+                statement.main_block = self.remove(statement.main_block)
+            for block in statement_blocks(statement):
+                self.eliminate(block)
+
+    def remove(self, block):
+        result = [s for s in block if type(s) is not ExpressionStatement]
+        self.count += len(block) - len(result)
+        return result
+
+
+# 优化遍管理：按顺序在解析得到的根语句块上执行各优化遍，每个优化遍可单独开关。
+# 优化会改变执行过程中的语句输出（被删除的分支与语句不再执行），因此解释器默认不启用，
+# 需要时设置 interpreter.optimizer = PassManager()
+class PassManager:
+    def __init__(self, passes=None):
+        if passes is None:
+            passes = [ConstantFolding(), DeadBranchElimination(), LoopInvariantHoisting(), NoOpElimination()]
+        self.passes = passes
+        self.stats = {}  # 优化遍名称 -> 最近一次执行时处理的表达式/语句数
+
+    def enable(self, name, flag=True):
+        for p in self.passes:
+            if p.name == name:
+                p.enabled = flag
+                return True
+        return False
+
+    def run(self, root):
+        self.stats = {}
+        root.text  # 语句文本在首次访问时生成，先生成并缓存原程序的文本，优化后的语句仍显示原程序
+        for p in self.passes:
+            if p.enabled: self.stats[p.name] = p.run(root)
+        return self.stats
@@ -0,0 +1,133 @@
+import time
+
+
+# 行号的显示文本，没有行号的语句（例如匿名代码块）显示为 -
+def position_text(position):
+    return "-" if position is None else str(position)
+
+
+# 单条源代码行的统计：执行次数、包含子语句的耗时、不含子语句的耗时、其中表达式求值与同步后端调用的耗时
+class LineRecord:
+    __slots__ = ('position', 'text', 'label', 'count', 'inclusive', 'exclusive', 'expression', 'sync')
+
+    def __init__(self, position, text):
+        self.position = position
+        self.text = text
+        self.label = "line " + position_text(position) + ": " + text.replace(";", "").strip()[:48]  # 火焰图中的语句标签
+        self.count = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        self.expression = 0.0
+        self.sync = 0.0
+
+
+# 语句级性能分析器：解释器在语句开始/结束时调用 enter/leave，两次事件之间的时间计入当时栈顶的语句，
+# 表达式求值与同步后端调用的耗时先暂存，在下一次事件时计入同一条语句。
+# 两种执行引擎都可使用：interpreter.set_profiler(Profiler())，执行后 report()/collapsed() 输出结果
+class Profiler:
+    def __init__(self):
+        self.records = {}  # 源代码行号 -> LineRecord
+        self.stacks = {}  # 调用栈（各层语句标签组成的元组） -> 不含子语句的耗时，用于生成火焰图
+        self.stack = []  # 正在执行的语句：[行统计, 调用栈, 开始时间, 开始时已空闲的时间]
+        self.last = time.perf_counter()  # 上一次事件的时间
+        self.idle_time = 0.0  # 程序暂停（例如分时调度让出执行）的累计时间，不计入任何语句
+        self.expression_time = 0.0  # 自上一次事件以来表达式求值的耗时
+        self.sync_time = 0.0  # 自上一次事件以来同步后端调用的耗时
+
+    # 把距上一次事件的时间计入栈顶语句
+    def close(self):
+        now = time.perf_counter()
+        if self.stack:
+            record, path = self.stack[-1][0], self.stack[-1][1]
+            record.exclusive += now - self.last
+            record.expression += self.expression_time
+            record.sync += self.sync_time
+            self.stacks[path] = self.stacks.get(path, 0.0) + now - self.last
+        self.expression_time = 0.0
+        self.sync_time = 0.0
+        self.last = now
+        return now
+
+    def record(self, statement):
+        record = self.records.get(statement.position)
+        if record is None:
+            record = LineRecord(statement.position, statement.text.split("\n")[0])
+            self.records[statement.position] = record
+        return record
+
+    def enter(self, statement):
+        now = self.close()
+        record = self.record(statement)
+        path = (self.stack[-1][1] if self.stack else ()) + (record.label,)
+        self.stack.append([record, path, now, self.idle_time])
+
+    def leave(self):
+        now = self.close()
+        if not self.stack: return  # 语句在设置分析器之前已经开始执行
+        record, path, start, idle = self.stack.pop()
+        record.count += 1
+        record.inclusive += now - start - (self.idle_time - idle)
+
+    # 语句内部的阶段结束（例如循环条件求值），已经过的时间计入栈顶语句
+    def mark(self):
+        self.close()
+
+    # 程序从暂停中恢复：距上一次事件的时间不计入任何语句
+    def idle(self):
+        now = time.perf_counter()
+        self.idle_time += now - self.last
+        self.expression_time = 0.0
+        self.sync_time = 0.0
+        self.last = now
+
+    def expression(self, cost):
+        self.expression_time += cost
+
+    def sync(self, cost):
+        self.sync_time += cost
+
+    # 包装求值函数，统计表达式求值耗时
+    def timed(self, evaluator):
+        if evaluator is None: return None
+        clock = time.perf_counter
+
+        def timed(table):
+            start = clock()
+            try:
+                return evaluator(table)
+            finally:
+                self.expression_time += clock() - start
+
+        return timed
+
+    def clear(self):
+        self.records.clear()
+        self.stacks.clear()
+        self.stack.clear()
+        self.idle_time = 0.0
+        self.idle()
+
+    # 按指定列从高到低排列的统计表，sort 为 count/inclusive/exclusive/expression/sync
+    def report(self, sort="exclusive", limit=None):
+        records = sorted(self.records.values(),
+                         key=lambda r: (-getattr(r, sort), r.position is None, r.position or 0))
+        if limit is not None: records = records[:limit]
+        lines = ["%6s %10s %12s %12s %12s %12s  %s" % ("行号", "次数", "总耗时(ms)", "自身耗时(ms)",
+                                                    "表达式(ms)", "同步(ms)", "语句")]
+        for r in records:
+            lines.append("%6s %10d %12.3f %12.3f %12.3f %12.3f  %s" % (
+                position_text(r.position), r.count, r.inclusive * 1e3, r.exclusive * 1e3, r.expression * 1e3, r.sync * 1e3,
+                r.text[:60]))
+        return "\n".join(lines)
+
+    # 折叠调用栈格式（每行“栈;栈 微秒数”），可直接交给 flamegraph.pl 等工具生成火焰图
+    def collapsed(self):
+        lines = []
+        for path, cost in sorted(self.stacks.items()):
+            micros = int(cost * 1e6)
+            if micros > 0: lines.append(";".join(path) + " " + str(micros))
+        return "\n".join(lines) + "\n"
+
+    def save_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.collapsed())
@@ -1,7 +1,17 @@
 import ply.lex as lex
 import ply.yacc as yacc
 import re
-import turtle
+import os
+import gc
+import hashlib
+import pickle
+import threading
+import zlib
+
+from Diagnostics import diagnostics
+
+# 语法分析表缓存目录：分析表以文法哈希命名，文法变化后自动生成新的分析表
+table_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
 
 
 # 词法分析器：t函数为主构建主体
@@ -101,6 +111,7 @@ class MyLexer:
     def __init__(self):
         self.debug = True
         self.result = None
+        self.quiet = False  # 为True时不报告错误，用于试探性的分析，失败后由调用方重新分析并报告
         self.lexer = None
         self.text = ""
 
@@ -142,6 +153,22 @@ class MyLexer:
         t.type = 'TEXT'
         return t
 
+    # 注释处理：单行注释 // comment 与多行注释 /* comment(multi-lines) */ 在词法分析时直接丢弃，
+    # 多行注释中的换行符计入行号，以免影响后续错误定位
+    def t_comment(self, t):
+        r'//[^\n]*|/\*[\s\S]*?\*/'
+        t.lexer.lineno += t.value.count("\n")
+
+    # 未闭合的多行注释：报告错误并放弃其后的输入
+    def t_comment_error(self, t):
+        r'/\*'
+        self.result = False  # 表示词法分析失败
+        self.aborted = True  # 其后的输入被放弃，语法分析结果作废
+        if not self.quiet:
+            diagnostics.error("词法错误：多行注释错误  错误位置：行号=" + str(t.lexer.lineno) + "，列号=" + str(
+                self.find_column(t.lexer.lexdata, t)), t.lexer.lineno)
+        t.lexer.lexpos = len(t.lexer.lexdata)
+
     # 换行符处理，行号追踪
     def t_newline(self, t):
         r'\n+'  # 正则表达式进行符号匹配
@@ -155,9 +182,10 @@ class MyLexer:
 
     # 错误符处理，提示错误
     def t_error(self, t):
-        print("Illegal character '%s'" % t.value[0])
-        print(
-            f"Illegal character '{t.value[0]}' at position: row={t.lexer.lineno},column={self.find_column(self.text, t)}")
+        if not self.quiet:
+            diagnostics.error("Illegal character '%s'" % t.value[0], t.lexer.lineno)
+            diagnostics.error(f"Illegal character '{t.value[0]}' at position: "
+                              f"row={t.lexer.lineno},column={self.find_column(self.text, t)}", t.lexer.lineno)
         t.lexer.skip(1)  # 不返回token对象t即视为丢弃该token
         self.result = False  # 表示词法分析失败
 
@@ -165,61 +193,28 @@ class MyLexer:
     def build(self, **kwargs):
         self.lexer = lex.lex(module=self, **kwargs)
         self.result = True
-        if self.debug: print("词法分析器初始化成功！")
+        self.aborted = False
+        if self.debug: diagnostics.debug("词法分析器初始化成功！")
 
-    # 执行注释解析过程
-    def comment(self, data):
-        # 被注释部分替换成换行符和空格符即可，以免影响后续行号计算
-        input = data
-        while True:
-            # 优先处理多行注释 形式为 /* comment(multi-lines) */
-            comment_begin = re.search(r"/\*", input)
-            comment_end = re.search(r"\*/", input)
-            if comment_begin is None and comment_end is None:
-                # 此处处理单行注释 形式为 // comment
-                comment_index = re.search(r"//", input)
-                if comment_index is None: return input
-                index = comment_index.start()
-                next_line = len(input)
-                if "\n" in input[index:]:
-                    next_line = input.index("\n", index)
-                input = input[0:index] + input[next_line:len(input)]
-                continue
-            if (comment_begin is not None and comment_end is None) or (
-                    comment_begin is None and comment_end is not None):
-                self.result = False  # 表示词法分析失败
-                if comment_begin is not None: index = comment_begin.start()
-                if comment_end is not None: index = comment_end.start()
-                row = 1 + len(re.findall(r"\n", input[0:index]))
-                column = index - input[0:index].rfind("\n")
-                print("词法错误：多行注释错误  错误位置：行号=" + str(row) + "，列号=" + str(column))
-                break
-            number_line = 0
-            if "\n" in input[comment_begin.start():comment_end.start() + 2]:
-                number_line = len(re.findall(r"\n", input[comment_begin.start():comment_end.start() + 2]))
-            input = input[0:comment_begin.start()] + ("\n" * number_line) + input[comment_end.start() + 2:len(input)]
-            return input
-
-    # 执行词法分析过程
+    # 执行词法分析过程，注释在词法分析时丢弃
     def exec(self, data):
-        # 先处理注释，注释分单行注释和多行注释,注意去掉注释的时候保留换行符，避免错误定位时行号不对
-        data = self.comment(data)
         self.text = data
         words = []
-        if self.debug: print("词法分析输入：\n" + data)
         if data is None:
-            print("执行注释解析过程 异常退出")
+            diagnostics.error("执行注释解析过程 异常退出")
             return
+        if self.debug: diagnostics.debug("词法分析输入：\n" + data)
+        self.lexer.lineno = 1
         self.lexer.input(data)
-        if self.debug: print("非注释部分开始词法分析...")
+        if self.debug: diagnostics.debug("非注释部分开始词法分析...")
         while True:
             tok = self.lexer.token()
             if not tok: break
-            if self.debug: print(tok)
+            if self.debug: diagnostics.debug(tok)
             words.append(tok)
         if self.debug:
-            print("词法分析结果：")
-            print(words)
+            diagnostics.debug("词法分析结果：")
+            diagnostics.debug(words)
         return words
 
 
@@ -232,6 +227,8 @@ class MyYacc:
         ('left', 'TIMES', 'DIVIDE'),
         ('right', 'UMINUS'),  # Unary minus operator
     )
+    # 常量记号对应的数据类型
+    constant_types = {'NUMBER': 'int', 'FLOAT': 'real', 'TEXT': 'text', 'CHAR': 'char'}
 
     def __init__(self):
         self.lexer = None
@@ -239,24 +236,46 @@ class MyYacc:
         self.result = None
         self.yacc = None
         self.text = ""
+        self.lock = threading.RLock()  # 共享的语法分析器一次只解析一个程序
+        self.quiet = False  # 为True时不报告语法错误
+        self.tree = True  # 为True时同时构建用于显示的语法树节点，否则只构建可执行的语句
+
+    # 产生式的语义值：构建语法树时保存在节点的obj中，否则产生式的结果就是语义值
+    def value(self, p):
+        return p.obj if self.tree else p
 
     # 程序整体框架：由多条语句构成，基本单位是statement
     def p_program(self, p):
         '''program  : statements
         '''
-        if self.debug: print("program")
-        if p[1] is not None: p[0] = Node("program", p[1].child)
+        if self.debug: diagnostics.debug("program")
+        if p[1] is None: return
+        if self.tree:
+            p[0] = Node("program", p[1].child)
+            p[0].obj = p[1].obj
+        else:
+            p[0] = p[1]
 
-    # 多条语句框架：由多条语句构成，基本单位是statement
+    # 多条语句框架：由多条语句构成，基本单位是statement。
+    # 语句列表在左递归中原地追加，分析时间与语句数成线性关系
     def p_statements(self, p):
         '''statements  : statement
                     | statements statement
         '''
-        if self.debug: print("statements")
+        if self.debug: diagnostics.debug("statements")
         if len(p) == 2:
-            p[0] = Node("statements", [p[1]])
+            if self.tree:
+                p[0] = Node("statements", [p[1]])
+                p[0].obj = [p[1].obj]
+            else:
+                p[0] = [p[1]]
         else:
-            p[0] = Node("statements", p[1].child + [p[2]])
+            p[0] = p[1]
+            if self.tree:
+                p[0].child.append(p[2])
+                p[0].obj.append(p[2].obj)
+            else:
+                p[0].append(p[2])
 
     # 语句整体框架：由许多种类语句组成，语句各具特色
     def p_statement(self, p):
@@ -273,7 +292,7 @@ class MyYacc:
                     | sync-write-statement
                     | sync-read-statement
         '''
-        if self.debug: print("statement")
+        if self.debug: diagnostics.debug("statement")
         p[0] = p[1]
 
     # 块语句：由标识符+代码块构成，匿名情况下无标识符
@@ -281,86 +300,89 @@ class MyYacc:
         '''block-statement :  ID block
                             | block
         '''
-        if self.debug: print("block-statement")
+        if self.debug: diagnostics.debug("block-statement")
         if len(p) == 2:
-            p[0] = Node("block-statement", p[1].child)
-            p[0].statement = True
-            p[0].obj = BlockStatement("", p[1].obj)
-            p[0].obj.position = p[1].extra
+            statements, line = self.value(p[1])
+            statement = BlockStatement("", statements)
+            statement.position = line
+            if self.tree: p[0] = Node("block-statement", p[1].child)
         else:
-            p1 = Node("identifier", [p[1]])
-            p[0] = Node("block-statement", [p1] + p[2].child)
+            statement = BlockStatement(p[1], self.value(p[2])[0])
+            statement.position = p.lineno(1)
+            if self.tree: p[0] = Node("block-statement", [Node("identifier", [p[1]])] + p[2].child)
+        if self.tree:
             p[0].statement = True
-            p[0].obj = BlockStatement(p[1], p[2].obj)
-            p[0].obj.position = p.lineno(1)
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
-    # 代码块中间结构：包含空块等三种基本情况
+    # 代码块中间结构：包含空块等三种基本情况，语义值为 (语句列表, 起始行号)
     def p_block(self, p):
         '''block : LBRACE  RBRACE
                 | LBRACE statements RBRACE
                 | LBRACE  RBRACE SEMICOLON
                 | LBRACE statements RBRACE SEMICOLON
         '''
-        if self.debug: print("block")
+        if self.debug: diagnostics.debug("block")
         if len(p) == 3:
-            p[0] = Node("block", [Node("lbrace", [p[1]]), Node("rbrace", [p[2]])])
-            p[0].extra = p.lineno(1)
-            p[0].obj = []
-            return
-        p1 = Node("lbrace", [p[1]])
-        p3 = Node("rbrace", [p[3]])
-        if len(p) == 4:
-            if type(p[2]) is not Node:
-                p2 = Node("rbrace", [p[2]])
-                p3 = Node("semicolon", [p[3]])
-                p[0] = Node("block", [p1, p2, p3])
-                p[0].extra = p.lineno(1)
-                return
-            p[0] = Node("block", [p1] + p[2].child + [p3])
-            states = []
-            for s in p[2].child:
-                states.append(s.obj)
-            p[0].obj = states
-        if len(p) == 5:
-            p[0] = Node("block", [p1] + p[2].child + [p3, Node("semicolon", [p[4]])])
-            states = []
-            for s in p[2].child:
-                states.append(s.obj)
-            p[0].obj = states
-            p[0].extra = p.lineno(1)
+            block = ([], p.lineno(1))
+            if self.tree: p[0] = Node("block", [Node("lbrace", [p[1]]), Node("rbrace", [p[2]])])
+        elif p.slice[2].type == "RBRACE":
+            block = (None, p.lineno(1))
+            if self.tree:
+                p[0] = Node("block", [Node("lbrace", [p[1]]), Node("rbrace", [p[2]]), Node("semicolon", [p[3]])])
+        elif len(p) == 4:
+            block = (self.value(p[2]), None)
+            if self.tree: p[0] = Node("block", [Node("lbrace", [p[1]])] + p[2].child + [Node("rbrace", [p[3]])])
+        else:
+            block = (self.value(p[2]), p.lineno(1))
+            if self.tree:
+                p[0] = Node("block", [Node("lbrace", [p[1]])] + p[2].child + [Node("rbrace", [p[3]]),
+                                                                               Node("semicolon", [p[4]])])
+        if self.tree:
+            p[0].obj = block
+        else:
+            p[0] = block
 
     # if语句：表达式+代码块结构，两种基本情况
     def p_if_statement(self, p):
         '''if-statement  : if LPAREN expression RPAREN block
                         |  if LPAREN expression RPAREN block else block
         '''
-        if self.debug: print("if_statement")
-        p1 = Node("keyword", [p[1]])
-        p2 = Node("lparen", [p[2]])
-        p4 = Node("rparen", [p[4]])
+        if self.debug: diagnostics.debug("if_statement")
         if len(p) == 6:
-            p[0] = Node("if-statement", [p1, p2, p[3], p4] + p[5].child)
-            p[0].statement = True
-            p[0].obj = IfStatement(p[3].obj, p[5].obj)
-            p[0].obj.position = p.lineno(1)
-        if len(p) == 8:
-            p[0] = Node("if-statement", [p[1], p[2], p[3], p[4], p[5], p[6], p[7]])
+            statement = IfStatement(self.value(p[3]), self.value(p[5])[0])
+            if self.tree:
+                p1 = Node("keyword", [p[1]])
+                p2 = Node("lparen", [p[2]])
+                p4 = Node("rparen", [p[4]])
+                p[0] = Node("if-statement", [p1, p2, p[3], p4] + p[5].child)
+        else:
+            statement = IfStatement(self.value(p[3]), self.value(p[5])[0], self.value(p[7])[0])
+            if self.tree: p[0] = Node("if-statement", [p[1], p[2], p[3], p[4], p[5], p[6], p[7]])
+        statement.position = p.lineno(1)
+        if self.tree:
             p[0].statement = True
-            p[0].obj = IfStatement(p[3].obj, p[5].obj, p[7].obj)
-            p[0].obj.position = p.lineno(1)
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # while语句：表达式+代码块结构，一种基本情况
     def p_while_statement(self, p):
         '''while-statement  : while LPAREN expression RPAREN block
         '''
-        if self.debug: print("while_statement")
-        p1 = Node("keyword", [p[1]])
-        p2 = Node("lparen", [p[2]])
-        p4 = Node("rparen", [p[4]])
-        p[0] = Node("while_statement", [p1, p2, p[3], p4] + p[5].child)
-        p[0].statement = True
-        p[0].obj = WhileStatement(p[3].obj, p[5].obj)
-        p[0].obj.position = p.lineno(1)
+        if self.debug: diagnostics.debug("while_statement")
+        statement = WhileStatement(self.value(p[3]), self.value(p[5])[0])
+        statement.position = p.lineno(1)
+        if self.tree:
+            p1 = Node("keyword", [p[1]])
+            p2 = Node("lparen", [p[2]])
+            p4 = Node("rparen", [p[4]])
+            p[0] = Node("while_statement", [p1, p2, p[3], p4] + p[5].child)
+            p[0].statement = True
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # for语句：声明/赋值+表达式+赋值/空
     def p_for_statement(self, p):
@@ -369,7 +391,7 @@ class MyYacc:
                         | for LPAREN assignment SEMICOLON expression SEMICOLON RPAREN block
                         | for LPAREN declaration SEMICOLON expression SEMICOLON RPAREN block
         '''
-        if self.debug: print("for_statement")
+        if self.debug: diagnostics.debug("for_statement")
         if len(p) == 9: p[0] = Node("for_statement", [p[1], p[2], p[3], p[4], p[5], p[6], p[7], p[8]])
         if len(p) == 10: p[0] = Node("for_statement", [p[1], p[2], p[3], p[4], p[5], p[6], p[7], p[8], p[9]])
         p[0].obj.position = p.lineno(1)
@@ -378,27 +400,33 @@ class MyYacc:
     def p_declaration(self, p):
         '''declaration : type ID
         '''
-        if self.debug: print("declaration")
-        p2 = Node("identifier", [p[2]])
-        p[0] = Node("declaration", [p[1], p2])
-        ty = p[1].child
-        p[0].obj = [ty[0], p[2]]
+        if self.debug: diagnostics.debug("declaration")
+        declaration = [self.value(p[1]), p[2]]
+        if self.tree:
+            p[0] = Node("declaration", [p[1], Node("identifier", [p[2]])])
+            p[0].obj = declaration
+        else:
+            p[0] = declaration
 
     # 赋值中间结构：辅助构成包含赋值的相关语句
     def p_assignment(self, p):
         '''assignment  : ID EQUAL expression
                        | index EQUAL expression
         '''
-        if self.debug: print("assignment")
-        p2 = Node("equal", [p[2]])
-        p[0] = Node("assignment", [p[1], p2, p[3]])
-        if type(p[1]) is Node:
-            p[0].obj = [p[1].extra] + [p[3].obj]
-            p[0].child = p[1].child + [p2, p[3]]
-        else:
-            p[0].obj = [p[1], p[3].obj]
-            p1 = Node("identifier", [p[1]])
-            p[0].child[0] = p1
+        if self.debug: diagnostics.debug("assignment")
+        if type(p[1]) is str:
+            assignment = [p[1], self.value(p[3])]
+        else:
+            assignment = [self.value(p[1])[0], self.value(p[3])]
+        if self.tree:
+            p2 = Node("equal", [p[2]])
+            if type(p[1]) is str:
+                p[0] = Node("assignment", [Node("identifier", [p[1]]), p2, p[3]])
+            else:
+                p[0] = Node("assignment", p[1].child + [p2, p[3]])
+            p[0].obj = assignment
+        else:
+            p[0] = assignment
 
     # 类型中间结构：所有可能的类型，辅助构成
     def p_type(self, p):
@@ -413,15 +441,19 @@ class MyYacc:
                     | blockW
                     | statementW
         '''
-        if self.debug: print("type")
-        p[0] = Node("type", [p[1]])
+        if self.debug: diagnostics.debug("type")
+        if self.tree:
+            p[0] = Node("type", [p[1]])
+            p[0].obj = p[1]
+        else:
+            p[0] = p[1]
 
     # return语句：函数返回等情况调用
     def p_return_statement(self, p):
         '''return-statement  : return expression SEMICOLON
                             |  return SEMICOLON
         '''
-        if self.debug: print("return_statement")
+        if self.debug: diagnostics.debug("return_statement")
         if len(p) == 3: p[0] = Node("return_statement", [p[1], p[2]])
         if len(p) == 4: p[0] = Node("return_statement", [p[1], p[2], p[3]])
         p[0].obj.position = p.lineno(1)
@@ -430,55 +462,71 @@ class MyYacc:
     def p_assignment_statement(self, p):
         '''assignment-statement  : assignment SEMICOLON
         '''
-        if self.debug: print("assignment_statement")
-        p2 = Node("semicolon", [p[2]])
-        p[0] = Node("assignment_statement", p[1].child + [p2])
-        p[0].statement = True
-        assign = p[1].obj
-        p[0].obj = AssignmentStatement(assign[0], assign[1])
-        p[0].obj.position = p.lineno(2)
+        if self.debug: diagnostics.debug("assignment_statement")
+        assign = self.value(p[1])
+        statement = AssignmentStatement(assign[0], assign[1])
+        statement.position = p.lineno(2)
+        if self.tree:
+            p[0] = Node("assignment_statement", p[1].child + [Node("semicolon", [p[2]])])
+            p[0].statement = True
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # 声明语句：
     def p_declaration_statement(self, p):
         '''declaration-statement : declaration SEMICOLON
         '''
-        if self.debug: print("declaration_statement")
-        p2 = Node("semicolon", [p[2]])
-        p[0] = Node("declaration_statement", p[1].child + [p2])
-        p[0].statement = True
-        assign = p[1].obj
-        p[0].obj = DeclarationStatement(assign[0], assign[1])
-        p[0].obj.position = p.lineno(2)
+        if self.debug: diagnostics.debug("declaration_statement")
+        assign = self.value(p[1])
+        statement = DeclarationStatement(assign[0], assign[1])
+        statement.position = p.lineno(2)
+        if self.tree:
+            p[0] = Node("declaration_statement", p[1].child + [Node("semicolon", [p[2]])])
+            p[0].statement = True
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # 声明赋值语句：
     def p_decl_assgn_statement(self, p):
         '''decl-assgn-statement : type ID EQUAL expression SEMICOLON
         '''
-        if self.debug: print("decl_assgn_statement")
-        p2 = Node("identifier", [p[2]])
-        p3 = Node("equal", [p[3]])
-        p5 = Node("semicolon", [p[5]])
-        p[0] = Node("decl_assgn_statement", [p[1], p2, p3, p[4], p5])
-        p[0].statement = True
-        p[0].obj = DeclAssgnStatement(p[1].child[0], p[2], p[4].obj)
-        p[0].obj.position = p.lineno(2)
+        if self.debug: diagnostics.debug("decl_assgn_statement")
+        statement = DeclAssgnStatement(self.value(p[1]), p[2], self.value(p[4]))
+        statement.position = p.lineno(2)
+        if self.tree:
+            p2 = Node("identifier", [p[2]])
+            p3 = Node("equal", [p[3]])
+            p5 = Node("semicolon", [p[5]])
+            p[0] = Node("decl_assgn_statement", [p[1], p2, p3, p[4], p5])
+            p[0].statement = True
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # 表达语句：单纯只有表达式的语句
     def p_expression_statement(self, p):
         '''expression-statement  : expression SEMICOLON
         '''
-        if self.debug: print("expression_statement")
-        p2 = Node("semicolon", [p[2]])
-        p[0] = Node("expression_statement", [p[1], p2])
-        p[0].statement = True
-        p[0].obj = ExpressionStatement(p[1].obj)
-        p[0].obj.position = p.lineno(2)
+        if self.debug: diagnostics.debug("expression_statement")
+        statement = ExpressionStatement(self.value(p[1]))
+        statement.position = p.lineno(2)
+        if self.tree:
+            p[0] = Node("expression_statement", [p[1], Node("semicolon", [p[2]])])
+            p[0].statement = True
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     def p_expr_uminus(self, p):
         'expression : MINUS expression %prec UMINUS'
-        p[0] = p[2]
-        p[0].child = [Node("minus", [p[1]])] + p[2].child
-        p[0].obj = "-" + p[0].obj
+        if self.tree:
+            p[0] = p[2]
+            p[0].child = [Node("minus", [p[1]])] + p[2].child
+            p[0].obj = UnaryExpression("-", p[2].obj)
+        else:
+            p[0] = UnaryExpression("-", p[2])
 
     # 表达式中间结构：
     def p_expression(self, p):
@@ -502,61 +550,93 @@ class MyYacc:
                   | list
                   | index
         '''
-        if self.debug: print("expression")
+        if self.debug: diagnostics.debug("expression")
+        self.build_operand(p, "expression")
+
+    # 表达式与可索引表达式共用的构建过程
+    def build_operand(self, p, info):
         if len(p) == 2:
-            p[0] = Node("expression", [p[1]])
-            if type(p[1]) is Node:
-                p[0].obj = p[1].obj
+            token = p.slice[1].type
+            if token == "ID":
+                exp = IdentifierExpression(p[1])
+            elif token in self.constant_types:
+                exp = ConstantExpression(p[1], self.constant_types[token])
+            elif token == "index":
+                exp = self.value(p[1])[1]
             else:
-                p[0].obj = str(p[1])
-            if type(p[1]) is Node and (p[1].info == "index"):
-                p[0].obj = p[1].obj
-        if len(p) == 4:
-            p[0] = Node("expression", [p[1], p[2], p[3]])
-            p[0].obj = p[1].obj + p[2] + p[3].obj
+                exp = self.value(p[1])
+            if self.tree: p[0] = Node(info, [p[1]])
+        else:
+            if p.slice[1].type == "LPAREN":
+                exp = ParenExpression(self.value(p[2]))
+            else:
+                exp = BinaryExpression(p[2], self.value(p[1]), self.value(p[3]))
+            if self.tree: p[0] = Node(info, [p[1], p[2], p[3]])
+        if self.tree:
+            p[0].obj = exp
+        else:
+            p[0] = exp
 
     # 列表中间结构：列表用[]表示，列表索引混淆，词法不易识别
     def p_list(self, p):
         '''list  : LBRACK elements RBRACK
                 |  LBRACK RBRACK
         '''
-        if self.debug: print("list")
+        if self.debug: diagnostics.debug("list")
         if len(p) == 3:
-            p[0] = Node("list", [p[1], p[2]])
-            p[0].obj = p[1] + p[2]
-        if len(p) == 4:
-            p[0] = Node("list", [p[1], p[2], p[3]])
-            p[0].obj = p[1] + p[2].obj + p[3]
+            exp = ListExpression()
+            if self.tree: p[0] = Node("list", [p[1], p[2]])
+        else:
+            exp = ListExpression(self.value(p[2]))
+            if self.tree: p[0] = Node("list", [p[1], p[2], p[3]])
+        if self.tree:
+            p[0].obj = exp
+        else:
+            p[0] = exp
 
     def p_elements(self, p):
         '''elements  : expression COMMA elements
                 | expression
         '''
-        if self.debug: print("elements")
+        if self.debug: diagnostics.debug("elements")
+        self.build_sequence(p, "elements")
+
+    # 逗号分隔的表达式序列（列表元素与调用参数），语义值为表达式列表
+    def build_sequence(self, p, info):
         if len(p) == 2:
-            p[0] = Node("elements", [p[1]])
-            p[0].obj = p[1].obj
-        if len(p) == 4:
-            p[0] = Node("elements", [p[1], p[2]] + p[3].child)
-            p[0].obj = p[1].obj + p[2] + p[3].obj
+            if self.tree:
+                p[0] = Node(info, [p[1]])
+                p[0].obj = [p[1].obj]
+            else:
+                p[0] = [p[1]]
+        elif self.tree:
+            p[0] = Node(info, [p[1], p[2]] + p[3].child)
+            p[0].obj = [p[1].obj] + p[3].obj
+        else:
+            p[0] = [p[1]] + p[3]
 
-    # 索引中间结构：需要与列表区分开
+    # 索引中间结构：需要与列表区分开，语义值为 (赋值目标：变量名与各级下标, 索引表达式)
     def p_index(self, p):
         '''index  : ID LBRACK expression RBRACK
                 | index LBRACK expression RBRACK
         '''
-        if self.debug: print("index")
-        p2 = Node("lbrack", [p[2]])
-        p4 = Node("rbrack", [p[4]])
+        if self.debug: diagnostics.debug("index")
+        position = self.value(p[3])
         if type(p[1]) is str:
-            p1 = Node("identifier", [p[1]])
-            p[0] = Node("index", [p1, p2, p[3], p4])
-            p[0].extra = [p[1], p[3].obj]
-            p[0].obj = p[1] + p[2] + p[3].obj + p[4]
+            index = ([p[1], position], IndexExpression(IdentifierExpression(p[1]), position))
+        else:
+            target = self.value(p[1])
+            index = (target[0] + [position], IndexExpression(target[1], position))
+        if self.tree:
+            p2 = Node("lbrack", [p[2]])
+            p4 = Node("rbrack", [p[4]])
+            if type(p[1]) is str:
+                p[0] = Node("index", [Node("identifier", [p[1]]), p2, p[3], p4])
+            else:
+                p[0] = Node("index", p[1].child + [p2, p[3], p4])
+            p[0].obj = index
         else:
-            p[0] = Node("index", p[1].child + [p2, p[3], p4])
-            p[0].obj = p[1].obj + p[2] + p[3].obj + p[4]
-            p[0].extra = p[1].extra + [p[3].obj]
+            p[0] = index
 
     # 可索引表达式：一部分表达式子集
     def p_expression_index(self, p):
@@ -570,20 +650,15 @@ class MyYacc:
                   | function
                   | index
         '''
-        if self.debug: print("expression-index")
-        if len(p) == 2:
-            p[0] = Node("expression-index", [p[1]])
-            p[0].obj = str(p[1])
-        if len(p) == 4:
-            p[0] = Node("expression-index", [p[1], p[2], p[3]])
-            p[0].obj = p[1].obj + p[2] + p[3].obj
+        if self.debug: diagnostics.debug("expression-index")
+        self.build_operand(p, "expression-index")
 
     # 函数定义语句：函数参数+代码块结构
     def p_fun_define_statement(self, p):
         '''fun-define-statement  : type ID LPAREN params RPAREN  block
                                 |  type ID LPAREN RPAREN  block
         '''
-        if self.debug: print("fun_define_statement")
+        if self.debug: diagnostics.debug("fun_define_statement")
         if len(p) == 6: p[0] = Node("fun_define_statement", [p[1], p[2], p[3], p[4], p[5]])
         if len(p) == 7: p[0] = Node("fun_define_statement", [p[1], p[2], p[3], p[4], p[5], p[6]])
         p[0].obj.position = p.lineno(2)
@@ -593,7 +668,7 @@ class MyYacc:
         '''params  : type ID
                   |  type ID COMMA params
         '''
-        if self.debug: print("params")
+        if self.debug: diagnostics.debug("params")
         if len(p) == 3: p[0] = Node("params", [p[1], p[2]])
         if len(p) == 5: p[0] = Node("params", [p[1], p[2], p[3], p[4]])
 
@@ -602,47 +677,56 @@ class MyYacc:
         '''function  : ID LPAREN params-call RPAREN
                     |  ID LPAREN RPAREN
         '''
-        if self.debug: print("function")
-        if len(p) == 4: p[0] = Node("function", [p[1], p[2], p[3]])
-        if len(p) == 5: p[0] = Node("function", [p[1], p[2], p[3], p[4]])
+        if self.debug: diagnostics.debug("function")
+        if len(p) == 4:
+            exp = CallExpression(p[1])
+            if self.tree: p[0] = Node("function", [p[1], p[2], p[3]])
+        else:
+            exp = CallExpression(p[1], self.value(p[3]))
+            if self.tree: p[0] = Node("function", [p[1], p[2], p[3], p[4]])
+        if self.tree:
+            p[0].obj = exp
+        else:
+            p[0] = exp
 
     # 参数：
     def p_params_call(self, p):
         '''params-call  : expression
                     | expression COMMA params-call
         '''
-        if self.debug: print("params_call")
-        if len(p) == 2:
-            p[0] = Node("params_call", [p[1]])
-            p[0].obj = [p[1].obj]
-        if len(p) == 4:
-            p[0] = Node("params_call", [p[1], p[2]] + p[3].child)
-            p[0].obj = [p[1].obj] + p[3].obj
+        if self.debug: diagnostics.debug("params_call")
+        self.build_sequence(p, "params_call")
 
     # 同步赋值语句：
     def p_sync_write_statement(self, p):
         '''sync-write-statement  : sync  LPAREN  params-call  RPAREN EQUAL  expression SEMICOLON
                                 |  sync  LPAREN  RPAREN EQUAL  expression SEMICOLON
         '''
-        if self.debug: print("sync_write_statement")
-        p1 = Node("keyword", [p[1]])
-        p2 = Node("lparen", [p[2]])
+        if self.debug: diagnostics.debug("sync_write_statement")
         if len(p) == 7:
-            p3 = Node("rparen", [p[3]])
-            p4 = Node("equal", [p[4]])
-            p6 = Node("semicolon", [p[4]])
-            p[0] = Node("sync_write_statement", [p1, p2, p3, p4, p[5], p6])
-            p[0].statement = True
-            p[0].obj = SYNCWriteStatement([], p[5].obj)
-            p[0].obj.position = p.lineno(1)
-        if len(p) == 8:
-            p4 = Node("rparen", [p[4]])
-            p5 = Node("equal", [p[5]])
-            p7 = Node("semicolon", [p[7]])
-            p[0] = Node("sync_write_statement", [p1, p2, p[3], p4, p5, p[6], p7])
+            statement = SYNCWriteStatement([], self.value(p[5]))
+            if self.tree:
+                p1 = Node("keyword", [p[1]])
+                p2 = Node("lparen", [p[2]])
+                p3 = Node("rparen", [p[3]])
+                p4 = Node("equal", [p[4]])
+                p6 = Node("semicolon", [p[4]])
+                p[0] = Node("sync_write_statement", [p1, p2, p3, p4, p[5], p6])
+        else:
+            statement = SYNCWriteStatement(self.value(p[3]), self.value(p[6]))
+            if self.tree:
+                p1 = Node("keyword", [p[1]])
+                p2 = Node("lparen", [p[2]])
+                p4 = Node("rparen", [p[4]])
+                p5 = Node("equal", [p[5]])
+                p7 = Node("semicolon", [p[7]])
+                p[0] = Node("sync_write_statement", [p1, p2, p[3], p4, p5, p[6], p7])
+        statement.position = p.lineno(1)
+        if self.tree:
             p[0].statement = True
-            p[0].obj = SYNCWriteStatement(p[3].obj, p[6].obj)
-            p[0].obj.position = p.lineno(1)
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # 同步取值语句：
     def p_sync_read_statement(self, p):
@@ -650,73 +734,346 @@ class MyYacc:
                                 | ID EQUAL sync  LPAREN RPAREN  SEMICOLON
                                 | type ID EQUAL sync  LPAREN params-call RPAREN  SEMICOLON
         '''
-        if self.debug: print("sync_read_statement")
-        p1 = Node("identifier", [p[1]])
-        p2 = Node("equal", [p[2]])
-        p3 = Node("keyword", [p[3]])
-        p4 = Node("lparen", [p[4]])
-        if len(p) == 7:
-            p5 = Node("rparen", [p[5]])
-            p6 = Node("semicolon", [p[6]])
-            p[0] = Node("sync_read_statement", [p1, p2, p3, p4, p5, p6])
-            p[0].statement = True
-            p[0].obj = SYNCReadStatement(p[1], [])
-            p[0].obj.position = p.lineno(1)
-        if len(p) == 8:
-            p6 = Node("rparen", [p[6]])
-            p7 = Node("semicolon", [p[7]])
-            p[0] = Node("sync_read_statement", [p1, p2, p3, p4, p[5], p6, p7])
-            p[0].statement = True
-            p[0].obj = SYNCReadStatement(p[1], p[5].obj)
-            p[0].obj.position = p.lineno(1)
+        if self.debug: diagnostics.debug("sync_read_statement")
         if len(p) == 9:
-            p2 = Node("identifier", [p[2]])
-            p3 = Node("equal", [p[3]])
-            p4 = Node("keyword", [p[4]])
-            p5 = Node("lparen", [p[5]])
-            p7 = Node("rparen", [p[7]])
-            p8 = Node("semicolon", [p[8]])
-            p[0] = Node("sync_read_statement", [p[1], p2, p3, p4, p5, p[6], p7, p8])
+            statement = SYNCReadStatement(p[2], self.value(p[6]), s_type=self.value(p[1]))
+        else:
+            statement = SYNCReadStatement(p[1], self.value(p[5]) if len(p) == 8 else [])
+        statement.position = p.lineno(1)
+        if self.tree:
+            p1 = Node("identifier", [p[1]])
+            p2 = Node("equal", [p[2]])
+            p3 = Node("keyword", [p[3]])
+            p4 = Node("lparen", [p[4]])
+            if len(p) == 7:
+                p5 = Node("rparen", [p[5]])
+                p6 = Node("semicolon", [p[6]])
+                p[0] = Node("sync_read_statement", [p1, p2, p3, p4, p5, p6])
+            if len(p) == 8:
+                p6 = Node("rparen", [p[6]])
+                p7 = Node("semicolon", [p[7]])
+                p[0] = Node("sync_read_statement", [p1, p2, p3, p4, p[5], p6, p7])
+            if len(p) == 9:
+                p2 = Node("identifier", [p[2]])
+                p3 = Node("equal", [p[3]])
+                p4 = Node("keyword", [p[4]])
+                p5 = Node("lparen", [p[5]])
+                p7 = Node("rparen", [p[7]])
+                p8 = Node("semicolon", [p[8]])
+                p[0] = Node("sync_read_statement", [p[1], p2, p3, p4, p5, p[6], p7, p8])
             p[0].statement = True
-            p[0].obj = SYNCReadStatement(p[2], p[6].obj, s_type=p[1].child[0])
-            p[0].obj.position = p.lineno(1)
+            p[0].obj = statement
+        else:
+            p[0] = statement
 
     # 处理错误模块：
     def p_error(self, p):
-        print("Syntax error in input!")
         self.result = False
+        if self.quiet: return
         if p:
             pos = p.lexpos
             row = self.text[0:pos].count("\n") + 1
             column = pos - self.text[0:pos].rfind("\n")
-            print(f"Syntax error at position: row={row},column={column}")
+            diagnostics.error("Syntax error in input!", row)
+            diagnostics.error(f"Syntax error at position: row={row},column={column}", row)
         else:
-            print("Syntax error: unexpected end of input")
-
-    # 初始化语法分析器
+            diagnostics.error("Syntax error in input!")
+            diagnostics.error("Syntax error: unexpected end of input")
+
+    # 文法哈希：由记号、优先级和各产生式（按定义顺序）计算
+    @classmethod
+    def grammar_hash(cls):
+        rules = [getattr(cls, name) for name in dir(cls) if name.startswith("p_")]
+        rules.sort(key=lambda rule: rule.__code__.co_firstlineno)
+        h = hashlib.sha1(repr((cls.tokens, cls.precedence, yacc.__tabversion__)).encode("utf-8"))
+        for rule in rules:
+            h.update((rule.__name__ + ":" + (rule.__doc__ or "")).encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    # 初始化语法分析器：分析表已缓存时直接载入，否则生成后写入缓存
     def build(self):
         self.lexer = MyLexer()
         self.lexer.debug = self.debug
         self.lexer.build()
         self.lexer.debug = False
-        self.yacc = yacc.yacc(module=self, debug=self.debug)
+        try:
+            os.makedirs(table_dir, exist_ok=True)
+            picklefile = os.path.join(table_dir, "udil_parsetab_" + self.grammar_hash() + ".pickle")
+        except OSError:
+            picklefile = None
+        try:
+            self.yacc = yacc.yacc(module=self, debug=self.debug, picklefile=picklefile, write_tables=False)
+        except (EOFError, pickle.UnpicklingError):
+            # 缓存文件不完整（例如写入时进程中断），删除后重新生成
+            os.remove(picklefile)
+            self.yacc = yacc.yacc(module=self, debug=self.debug, picklefile=picklefile, write_tables=False)
         self.result = True
-        if self.debug: print("语法分析器初始化成功！")
-
-    # 执行语法分析过程
-    def exec(self, data):
-        self.text = data
-        parse = self.yacc.parse(self.lexer.comment(data))
-        if self.debug:
-            print("语法分析结果：")
-            print(parse)
-        self.yacc = None
-        return parse
+        if self.debug: diagnostics.debug("语法分析器初始化成功！")
+
+    # 执行语法分析过程，quiet 为True时不报告错误，出错时 result 为False。
+    # tree 为True时返回语法树的根节点（各子节点的obj为语句），否则只返回语句列表，供解释执行使用
+    def exec(self, data, quiet=False, tree=True):
+        with self.lock:
+            self.text = data
+            self.tree = tree
+            self.quiet = self.lexer.quiet = quiet
+            self.result = self.lexer.result = True
+            self.lexer.text = data
+            self.lexer.aborted = False
+            self.lexer.lexer.lineno = 1
+            parse = self.yacc.parse(data, lexer=self.lexer.lexer)
+            if self.lexer.aborted: return None
+            if self.debug:
+                diagnostics.debug("语法分析结果：")
+                diagnostics.debug(parse)
+            return parse
 
     def mylex(self, inp):
         self.lexer.input(inp)
 
 
+# 共享的语法分析器：每个进程按调试开关各构建一次，之后重复使用
+shared_parsers = {}
+shared_lock = threading.Lock()
+
+
+def get_parser(debug=False):
+    with shared_lock:
+        parser = shared_parsers.get(debug)
+        if parser is None:
+            parser = MyYacc()
+            parser.debug = debug
+            parser.build()
+            shared_parsers[debug] = parser
+        return parser
+
+
+# 跳过空白与注释，返回下一个有效字符的位置与行号；多行注释未闭合时返回None
+def skip_blank(data, i, line):
+    n = len(data)
+    while i < n:
+        c = data[i]
+        if c == "\n":
+            line += 1
+        elif c in " \t\r":
+            pass
+        elif data.startswith("//", i):
+            end = data.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif data.startswith("/*", i):
+            end = data.find("*/", i + 2)
+            if end < 0: return None
+            line += data.count("\n", i, end)
+            i = end + 2
+            continue
+        else:
+            break
+        i += 1
+    return i, line
+
+
+# 切分语句时需要处理的字符
+split_pattern = re.compile(r'[\n"\'/;(){}\[\]]')
+
+
+# 把程序文本按顶层语句切分，返回[(起始行号, 起始位置, 语句文本)]。
+# 语句在括号外的分号处结束，或在括号外的右花括号处结束（其后的分号与 else 分支属于同一语句）；
+# 文本、字符常量与注释中的符号不参与切分。文本无法切分（如括号不匹配）时返回None
+def split_statements(data):
+    result = []
+    n = len(data)
+    blank = skip_blank(data, 0, 1)
+    if blank is None: return None
+    i, line = blank
+    while i < n:
+        start, start_line = i, line
+        depth = 0
+        while True:
+            match = split_pattern.search(data, i)
+            if match is None:
+                result.append((start_line, start, data[start:]))  # 不完整的语句，交给语法分析报告错误
+                return result
+            i = match.start()
+            c = data[i]
+            if c == "\n":
+                line += 1
+            elif (c == '"') or (c == "'"):
+                j = i + 1
+                while (j < n) and (data[j] != c):
+                    j += 2 if data[j] == "\\" else 1
+                if j >= n: return None
+                i = j  # 与词法分析一致，文本中的换行不计入行号
+            elif c == "/":
+                if data.startswith("//", i) or data.startswith("/*", i):
+                    blank = skip_blank(data, i, line)
+                    if blank is None: return None
+                    i, line = blank
+                    continue
+            elif c in "([{":
+                depth += 1
+            elif c in ")]}":
+                depth -= 1
+                if depth < 0: return None
+                if (depth == 0) and (c == "}"):
+                    end, end_line = i + 1, line
+                    blank = skip_blank(data, end, end_line)
+                    if blank is None: return None
+                    j, next_line = blank
+                    if data.startswith(";", j):
+                        end, end_line = j + 1, next_line
+                        blank = skip_blank(data, end, end_line)
+                        if blank is None: return None
+                        j, next_line = blank
+                    if data.startswith("else", j) and not (data[j + 4:j + 5].isalnum() or data[j + 4:j + 5] == "_"):
+                        i, line = j + 4, next_line
+                        continue
+                    i, line = end, end_line
+                    break
+            elif depth == 0:  # 括号外的分号
+                i += 1
+                break
+            i += 1
+        result.append((start_line, start, data[start:i]))
+        blank = skip_blank(data, i, line)
+        if blank is None: return None
+        i, line = blank
+    return result
+
+
+# 调整语句及其子语句的行号，行号为0（语法分析未记录）的保持不变
+def shift_position(statement, delta):
+    if statement.position: statement.position += delta
+    if type(statement) is IfStatement:
+        for s in statement.main_block: shift_position(s, delta)
+        for s in statement.else_block or []: shift_position(s, delta)
+    elif type(statement) is WhileStatement:
+        for s in statement.main_block: shift_position(s, delta)
+    elif type(statement) is BlockStatement:
+        for s in statement.statements: shift_position(s, delta)
+
+
+# 语句级解析缓存：程序按顶层语句切分，以语句文本为键保存上一次解析得到的语句对象。
+# 再次解析修改后的程序时，文本未变的语句直接复用（行号按新位置调整），只有修改过的连续区域重新进行语法分析。
+# 只保存最近一次解析的程序中的语句，复用的语句对象不再属于之前的根语句块
+class StatementCache:
+    def __init__(self):
+        self.table = {}  # 语句文本 -> [(起始行号, 语句对象)]
+        self.reused = 0  # 最近一次解析复用的语句数
+        self.parsed = 0  # 最近一次解析重新分析的语句数
+
+    # 解析程序，返回顶层语句对象列表，解析失败时返回None
+    def parse(self, data):
+        parser = get_parser()
+        chunks = split_statements(data)
+        if not chunks: return self.parse_all(parser, data)
+        available = {}
+        table = {}
+        statements = [None] * len(chunks)
+        pending = []  # 需要重新分析的连续区域：[(第一条语句下标, 最后一条语句下标)]
+        for k, (line, _, text) in enumerate(chunks):
+            if text not in available: available[text] = list(self.table.get(text, ()))
+            if available[text]:
+                old_line, statement = available[text].pop(0)
+                if old_line != line: shift_position(statement, line - old_line)
+                statements[k] = statement
+                table.setdefault(text, []).append((line, statement))
+            elif pending and (pending[-1][1] == k - 1):
+                pending[-1] = (pending[-1][0], k)
+            else:
+                pending.append((k, k))
+        self.reused = len(chunks) - sum(last - first + 1 for first, last in pending)
+        self.parsed = len(chunks) - self.reused
+        for first, last in pending:
+            # 同一区域的语句在原文中连续，一次分析，再按切分结果对应到各条语句
+            region = data[chunks[first][1]:chunks[last][1] + len(chunks[last][2])]
+            region_statements = parser.exec(region, quiet=True, tree=False)
+            if (not region_statements) or (parser.result is False) or (parser.lexer.result is False) or (
+                    len(region_statements) != last - first + 1):
+                return self.parse_all(parser, data)
+            for k in range(first, last + 1):
+                line, _, text = chunks[k]
+                statement = region_statements[k - first]
+                shift_position(statement, chunks[first][0] - 1)
+                statements[k] = statement
+                table.setdefault(text, []).append((line, statement))
+        self.table = table
+        return statements
+
+    # 整体解析并报告错误，成功时按切分结果重建缓存
+    def parse_all(self, parser, data):
+        statements = parser.exec(data, tree=False)
+        self.table = {}
+        self.reused = 0
+        if not statements: return None
+        self.parsed = len(statements)
+        return statements
+
+
+# 预编译程序文件（.udilc）：保存语法分析得到的顶层语句，与源文件放在一起，再次执行时直接载入，
+# 无需注释处理、词法与语法分析。文件头依次为标识与格式版本、文法哈希、节点布局哈希、源代码哈希，任一不一致即视为过期。
+# 变量解析依赖执行时的符号表，优化依赖解释器的设置，都在载入后进行
+compiled_magic = b"UDILC2"  # 文件格式变化时修改版本号；节点的 __slots__ 变化由布局哈希检测
+grammar_version = None  # 文法哈希，首次使用时计算
+layout_version = None  # 节点布局哈希，首次使用时计算
+
+
+# 各语句与表达式节点类的名称与 __slots__ 的哈希：增加或重命名槽位后，旧文件载入的节点缺少属性，必须重新解析
+def node_layout_hash():
+    classes, pending = [], [Expression, Statement]
+    while pending:
+        cls = pending.pop()
+        classes.append(cls)
+        pending.extend(cls.__subclasses__())
+    layout = sorted((cls.__module__ + "." + cls.__qualname__, tuple(cls.__dict__.get("__slots__", ())))
+                    for cls in classes)
+    return hashlib.sha1(repr(layout).encode("utf-8")).hexdigest()[:16]
+
+
+def compiled_path(path):
+    return os.path.splitext(path)[0] + ".udilc"
+
+
+def compiled_header(source):
+    global grammar_version, layout_version
+    if grammar_version is None: grammar_version = MyYacc.grammar_hash()
+    if layout_version is None: layout_version = node_layout_hash()
+    return (compiled_magic + grammar_version.encode("ascii") + layout_version.encode("ascii") +
+            hashlib.sha1(source.encode("utf-8")).hexdigest().encode("ascii"))
+
+
+# 写入预编译文件，先写临时文件再替换；写入失败（例如目录只读、嵌套过深）时返回False，不影响执行
+def save_compiled(path, source, statements):
+    try:
+        data = compiled_header(source) + zlib.compress(pickle.dumps(statements, pickle.HIGHEST_PROTOCOL), 1)
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+        os.replace(path + ".tmp", path)
+        return True
+    except (OSError, RecursionError, pickle.PicklingError):
+        return False
+
+
+# 载入预编译文件，文件不存在、已过期或已损坏时返回None
+def load_compiled(path, source):
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    header = compiled_header(source)
+    if data[:len(header)] != header: return None
+    # 载入时一次创建大量对象，暂停垃圾回收，避免反复扫描刚创建的语句
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(zlib.decompress(data[len(header):]))
+    except Exception:
+        return None
+    finally:
+        if enabled: gc.enable()
+
+
 # 语法树节点
 class Node:
     def __init__(self, info, child=None, leaf=None):
@@ -755,118 +1112,327 @@ class Node:
         return tree_height
 
 
-class IfStatement:
+# 表达式节点：语法分析时直接构建表达式树，解释器按节点编译求值，文本形式只在需要显示时生成
+class Expression:
+    __slots__ = ()
+
+    # 表达式文本，首次访问时生成
+    @property
+    def text(self):
+        if self._text is None: self._text = self.render()
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+
+# 常量表达式：data_type 为 int/real/text/char，文本与字符保留引号
+class ConstantExpression(Expression):
+    __slots__ = ('value', 'data_type', '_text')
+
+    def __init__(self, value, data_type):
+        self.value = value
+        self.data_type = data_type
+        self._text = None
+
+    def render(self):
+        return str(self.value)
+
+
+# 标识符表达式
+class IdentifierExpression(Expression):
+    __slots__ = ('name', '_text')
+
+    def __init__(self, name):
+        self.name = name
+        self._text = None
+
+    def render(self):
+        return self.name
+
+
+# 二元运算表达式：算术运算与比较运算
+class BinaryExpression(Expression):
+    __slots__ = ('operator', 'left', 'right', '_text')
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+        self._text = None
+
+    def render(self):
+        return self.left.text + self.operator + self.right.text
+
+
+# 一元运算表达式：负号
+class UnaryExpression(Expression):
+    __slots__ = ('operator', 'operand', '_text')
+
+    def __init__(self, operator, operand):
+        self.operator = operator
+        self.operand = operand
+        self._text = None
+
+    def render(self):
+        return self.operator + self.operand.text
+
+
+# 括号表达式：只影响结构，求值时与内部表达式相同
+class ParenExpression(Expression):
+    __slots__ = ('expression', '_text')
+
+    def __init__(self, expression):
+        self.expression = expression
+        self._text = None
+
+    def render(self):
+        return "(" + self.expression.text + ")"
+
+
+# 列表表达式
+class ListExpression(Expression):
+    __slots__ = ('elements', '_text')
+
+    def __init__(self, elements=None):
+        self.elements = elements if elements else []
+        self._text = None
+
+    def render(self):
+        return "[" + ",".join(e.text for e in self.elements) + "]"
+
+
+# 索引表达式：target 为标识符表达式或索引表达式
+class IndexExpression(Expression):
+    __slots__ = ('target', 'position', '_text')
+
+    def __init__(self, target, position):
+        self.target = target
+        self.position = position
+        self._text = None
+
+    def render(self):
+        return self.target.text + "[" + self.position.text + "]"
+
+
+# 函数调用表达式
+class CallExpression(Expression):
+    __slots__ = ('name', 'arguments', '_text')
+
+    def __init__(self, name, arguments=None):
+        self.name = name
+        self.arguments = arguments if arguments else []
+        self._text = None
+
+    def render(self):
+        return self.name + "(" + ",".join(e.text for e in self.arguments) + ")"
+
+
+# 循环不变表达式：由优化遍生成，包装循环中值不变的子表达式，每次进入循环 loop 后只求值一次
+class InvariantExpression(Expression):
+    __slots__ = ('expression', 'loop', '_text')
+
+    def __init__(self, expression, loop):
+        self.expression = expression
+        self.loop = loop  # 所属的循环语句
+        self._text = None
+
+    def render(self):
+        return self.expression.text
+
+
+# 语句节点：使用 __slots__ 减少每条语句的内存占用，与表达式一样，文本形式在首次访问时由子节点的文本生成并缓存，
+# 嵌套的代码块不会在语法分析时反复拼接子语句的文本
+class Statement:
+    __slots__ = ()
+
+    # 语句文本，首次访问时生成
+    @property
+    def text(self):
+        if self._text is None: render_nested(self)
+        return self._text
+
+    # 子语句，复合语句重写
+    def children(self):
+        return ()
+
+
+# 由内向外生成嵌套语句的文本：用显式的栈代替递归，嵌套很深的代码块不会超出递归深度限制，
+# 每条语句生成文本时子语句的文本都已缓存
+def render_nested(statement):
+    stack = [statement]
+    while stack:
+        top = stack[-1]
+        pending = [s for s in top.children() if s._text is None]
+        if pending:
+            stack.extend(pending)
+        else:
+            stack.pop()
+            top._text = top.render()
+
+
+def render_block(statements):
+    return "".join(s.text + "\n" for s in statements)
+
+
+class IfStatement(Statement):
+    __slots__ = ('expression', 'main_block', 'else_block', 'position', 'scope', 'main_scope', 'else_scope',
+                 '_text')
+
     def __init__(self, expression, main_block, else_block=None):
         self.expression = expression
         self.main_block = main_block
         self.else_block = else_block
         self.position = 0
-        self.text = "if ( " + expression + " ) {\n"
-        for s in main_block:
-            self.text += s.text + "\n"
-        if else_block:
-            self.text += "}else{\n"
-            for s in else_block:
-                self.text += s.text + "\n"
-        self.text += "}"
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self.main_scope = None  # 主代码块的静态作用域
+        self.else_scope = None  # else代码块的静态作用域
+        self._text = None
+
+    def render(self):
+        text = "if ( " + self.expression.text + " ) {\n" + render_block(self.main_block)
+        if self.else_block:
+            text += "}else{\n" + render_block(self.else_block)
+        return text + "}"
+
+    def children(self):
+        return self.main_block + self.else_block if self.else_block else self.main_block
 
 
-class WhileStatement:
+class WhileStatement(Statement):
+    __slots__ = ('expression', 'main_block', 'position', 'scope', 'main_scope', 'entries', '_text')
+
     def __init__(self, expression, main_block):
         self.expression = expression
         self.main_block = main_block
         self.position = 0
-        self.text = "while ( " + expression + " ) {\n"
-        for s in main_block:
-            self.text += s.text + "\n"
-        self.text += "}"
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self.main_scope = None  # 循环体的静态作用域
+        self.entries = 0  # 循环被执行的次数，循环不变表达式据此判断缓存的值是否仍然有效
+        self._text = None
+
+    def render(self):
+        return "while ( " + self.expression.text + " ) {\n" + render_block(self.main_block) + "}"
+
+    def children(self):
+        return self.main_block
 
 
-class BlockStatement:
+class BlockStatement(Statement):
+    __slots__ = ('ID', 'position', 'scope', 'exec_counter', 'statements', '_text')
+
     def __init__(self, ID, statements=None):
         self.ID = ID
         self.position = 0
+        self.scope = None  # 所在的静态作用域，由变量解析填写
         self.exec_counter = 0
-        self.text = ID + "{\n"
         if statements:
             self.statements = statements
         else:
             self.statements = []
-        for s in self.statements:
-            self.text += s.text + "\n"
-        self.text += "}"
+        self._text = None
+
+    def render(self):
+        return self.ID + "{\n" + render_block(self.statements) + "}"
+
+    def children(self):
+        return self.statements
 
 
-class AssignmentStatement:
+class AssignmentStatement(Statement):
+    __slots__ = ('variable', 'expression', 'position', 'scope', '_text')
+
     def __init__(self, variable, expression):
         self.variable = variable
         self.expression = expression
         self.position = 0
-        self.text = ""
-        if type(variable) is str:
-            self.text = variable + " = " + expression + ";"
-        else:
-            index = variable[0]
-            for i in range(1, len(variable)):
-                index = index + "[" + variable[i] + "]"
-            self.text = index + " = " + expression + ";"
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self._text = None
+
+    def render(self):
+        if type(self.variable) is str:
+            return self.variable + " = " + self.expression.text + ";"
+        index = self.variable[0]
+        for i in range(1, len(self.variable)):
+            index = index + "[" + self.variable[i].text + "]"
+        return index + " = " + self.expression.text + ";"
+
 
+class DeclarationStatement(Statement):
+    __slots__ = ('data_type', 'ID', 'position', 'scope', '_text')
 
-class DeclarationStatement:
     def __init__(self, data_type, ID):
         self.data_type = data_type
         self.ID = ID
         self.position = 0
-        self.text = data_type + " " + ID + ";"
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self._text = None
+
+    def render(self):
+        return self.data_type + " " + self.ID + ";"
+
 
+class ExpressionStatement(Statement):
+    __slots__ = ('expression', 'position', 'scope', '_text')
 
-class ExpressionStatement:
     def __init__(self, expression):
         self.expression = expression
         self.position = 0
-        self.text = expression + ";"
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self._text = None
 
+    def render(self):
+        return self.expression.text + ";"
+
+
+class DeclAssgnStatement(Statement):
+    __slots__ = ('data_type', 'ID', 'expression', 'position', 'scope', '_text')
 
-class DeclAssgnStatement:
     def __init__(self, data_type, ID, expression):
         self.data_type = data_type
         self.ID = ID
         self.expression = expression
         self.position = 0
-        self.text = data_type + " " + ID + " = " + expression + ";"
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self._text = None
+
+    def render(self):
+        return self.data_type + " " + self.ID + " = " + self.expression.text + ";"
 
 
-class SYNCWriteStatement:
+class SYNCWriteStatement(Statement):
+    __slots__ = ('key', 'value', 'position', 'scope', '_text')
+
     def __init__(self, key, value):
         self.key = key
         self.value = value
         self.position = 0
-        self.text = "sync( "
-        n = len(key)
-        for i in range(0, n):
-            self.text += key[i]
-            if i != n - 1: self.text += ","
+        self.scope = None  # 所在的静态作用域，由变量解析填写
+        self._text = None
+
+    def render(self):
+        return "sync( " + ",".join(k.text for k in self.key) + ") = " + self.value.text + ";"
 
-        self.text += ") = " + value + ";"
 
+class SYNCReadStatement(Statement):
+    __slots__ = ('key', 'value', 'position', 'scope', 's_type', '_text')
 
-class SYNCReadStatement:
     def __init__(self, key, value, s_type=None):
         self.key = key
         self.value = value
         self.position = 0
+        self.scope = None  # 所在的静态作用域，由变量解析填写
         self.s_type = s_type
-        self.text = key + " = sync( "
-        if s_type: self.text = s_type + " " + self.text
-        n = len(value)
-        for i in range(0, n):
-            self.text += value[i]
-            if i != n - 1: self.text += ","
+        self._text = None
 
-        self.text += ")" + ";"
+    def render(self):
+        text = self.key + " = sync( " + ",".join(v.text for v in self.value) + ")" + ";"
+        if self.s_type: text = self.s_type + " " + text
+        return text
 
 
 def draw_multiway_tree(tree, x, y, width, height, degree):
+    import turtle  # 绘图依赖Tk，仅在绘制语法树时载入
     if tree:
         # 绘制当前节点
         turtle.goto(x, y)
@@ -889,6 +1455,7 @@ def draw_multiway_tree(tree, x, y, width, height, degree):
 
 # 绘画语法树时请将画布全屏显示，否则部分绘画区域可能看不到
 def drawAST(inputs, x, y, width, height):
+    import turtle  # 绘图依赖Tk，仅在绘制语法树时载入
     # 一个例子的多叉树结构
     sample_multiway_tree = inputs
     turtle.title('AST：抽象语法树结构')
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+import CodeCompiler
+from Diagnostics import diagnostics, ERROR
+
+# 调用Python后端的循环，循环体（复合语句）中的同步读需要等待后端调用的结果
+backend_program = '''text code = "a = a + 1";
+int i = 0;
+int c = 0;
+int b = 0;
+sync("context-in", "a") = 0;
+sync("context-out", "a") = 0;
+while (c < 2000) {
+sync("program", "python") = code;
+b = sync("context-out", "a");
+if (b > 0) {
+i = i + 1;
+}
+c = c + 1;
+}
+'''
+
+# 不断求值失败的表达式
+failing_program = '''int k = 0;
+int x = 0;
+while (k < 30000) {
+k = k + 1;
+x = missing + 1;
+}
+'''
+
+# 后端调用之后清空并重新登记同名的载出上下文：调用结果只写回提交时的条目，同步读取到重新登记的值
+reregister_program = '''text code = "r = 5";
+int r = 0;
+int s = 0;
+sync("context-out", "r") = 0;
+sync("program", "python") = code;
+sync("context-out-clear", "r") = 0;
+sync("context-out", "r") = 1;
+r = sync("context-out", "r");
+sync("context-in", "r") = r;
+sync("context-out", "s") = 0;
+sync("program", "python") = "s = r * 10";
+s = sync("context-out", "s");
+'''
+
+
+def interpreter(program):
+    result = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable())
+    result.debug = False
+    result.print_text = False
+    result.parse_program(program)
+    return result
+
+
+class ExecRootAsyncTest(unittest.TestCase):
+    # 两个解释器在同一个事件循环中交替执行，一个解释器求值失败不影响另一个解释器
+    def test_side_by_side(self):
+        for _ in range(3):
+            backend, failing = interpreter(backend_program), interpreter(failing_program)
+
+            async def main():
+                await asyncio.gather(backend.exec_root_async(), failing.exec_root_async())
+
+            with diagnostics.collect(ERROR):
+                asyncio.run(main())
+            self.assertEqual(backend.symbol_table.read("c"), 2000)
+            self.assertEqual(backend.symbol_table.read("i"), 2000)
+            self.assertEqual(failing.symbol_table.read("k"), 30000)
+
+    # 同一程序按同步与异步方式执行，结果相同
+    def test_matches_sync(self):
+        for program in (reregister_program, backend_program):
+            expected = interpreter(program)
+            with diagnostics.collect(ERROR):
+                expected.exec_root()
+            actual = interpreter(program)
+            with diagnostics.collect(ERROR):
+                asyncio.run(actual.exec_root_async())
+            for name in ("r", "s", "i", "c"):
+                self.assertEqual(actual.symbol_table.read(name), expected.symbol_table.read(name))
+        self.assertEqual(actual.symbol_table.read("c"), 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
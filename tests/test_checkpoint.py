@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import CodeCompiler
+from Diagnostics import diagnostics, ERROR
+
+PROGRAMS = [
+    "int a = 1;\nint b = a + 2;\na = b * 3;\ntext t = \"x\" + \"y\";\n",
+    "int i = 0;\nreal s = 0.5;\nwhile (i < 40) {\nif (i < 20) {\ns = s + i;\n} else {\ns = s - 1;\n}\ni = i + 1;\n}\n",
+    "list l = [1, 2, 3];\nint k = 0;\nwhile (k < 10) {\nl[k] = k * k;\nk = k + 1;\n}\nlist m = l;\nm[0] = 7;\n",
+]
+
+
+def interpreter(program, engine="tree"):
+    result = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable(), engine=engine)
+    result.debug = False
+    result.print_text = False
+    result.parse_program(program)
+    return result
+
+
+def state(interpreter):
+    table = interpreter.symbol_table
+    return {name: (table.types[i], table.values[i]) for name, i in table.slots.items()}
+
+
+# 在普通的树遍历解释器中执行
+def expected_state(program):
+    plain = interpreter(program)
+    with diagnostics.collect(ERROR):
+        plain.exec_root()
+    return state(plain)
+
+
+class CheckpointTest(unittest.TestCase):
+    # 每个时间片之后保存检查点并从检查点恢复，继续执行的结果与不中断执行相同
+    def test_restore_after_every_slice(self):
+        for program in PROGRAMS:
+            expected = expected_state(program)
+            for quota in (1, 7, 50):
+                current = interpreter(program, "vm")
+                with diagnostics.collect(ERROR):
+                    while True:
+                        current = CodeCompiler.Interpreter.restore(current.checkpoint(compress=quota != 7))
+                        _, done = current.step(quota)
+                        if done: break
+                self.assertEqual(state(current), expected, "quota=%d" % quota)
+
+    # 从同一状态复制出的解释器各自执行，互不影响
+    def test_clone(self):
+        program = PROGRAMS[2]
+        expected = expected_state(program)
+        original = interpreter(program, "vm")
+        with diagnostics.collect(ERROR):
+            original.step(5)
+            copies = [original.clone() for _ in range(2)]
+            for copy in copies + [original]:
+                while not copy.step(3)[1]: pass
+        for copy in copies + [original]:
+            self.assertEqual(state(copy), expected)
+
+    # 检查点文件的保存与载入
+    def test_file(self):
+        program = PROGRAMS[1]
+        current = interpreter(program, "vm")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.ckpt")
+            with diagnostics.collect(ERROR):
+                current.step(30)
+                current.save_checkpoint(path)
+                restored = CodeCompiler.Interpreter.load_checkpoint(path)
+                while not restored.step(30)[1]: pass
+            self.assertEqual(state(restored), expected_state(program))
+        with self.assertRaises(ValueError):
+            CodeCompiler.Interpreter.restore(b"not a checkpoint")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import CodeCompiler
+import StatementParser
+from Diagnostics import diagnostics, ERROR
+
+PROGRAMS = [
+    "int a = 1;\nint b = a + 2;\na = b * 3;\n",
+    "int i = 0;\nint s = 0;\nwhile (i < 5) {\nif (i < 2) {\ns = s + i;\n} else {\ns = s - 1;\n}\ni = i + 1;\n}\n",
+    "list l = [1, 2, 3];\nl[1] = 5;\ntext t = \"x\" + \"y\";\n",
+]
+
+
+def run(interpreter):
+    interpreter.debug = False
+    interpreter.print_text = False
+    with diagnostics.collect(ERROR):
+        interpreter.exec_root()
+    table = interpreter.symbol_table
+    return {name: (table.types[i], table.values[i]) for name, i in table.slots.items()}
+
+
+def run_text(program):
+    interpreter = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable())
+    interpreter.parse_program(program)
+    return run(interpreter)
+
+
+def run_file(path):
+    interpreter = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable())
+    interpreter.parse_file(path)
+    return run(interpreter)
+
+
+class CompiledProgramTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, program):
+        path = os.path.join(self.dir.name, "program.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(program)
+        return path
+
+    # 首次执行写入预编译文件，再次执行载入该文件，两次的结果都与直接解析相同
+    def test_cached_program_matches_tree(self):
+        for program in PROGRAMS:
+            path = self.write(program)
+            expected = run_text(program)
+            self.assertEqual(run_file(path), expected)
+            compiled = StatementParser.compiled_path(path)
+            self.assertTrue(os.path.exists(compiled))
+            self.assertIsNotNone(StatementParser.load_compiled(compiled, program))
+            self.assertEqual(run_file(path), expected)
+            os.remove(compiled)
+
+    # 源代码或节点布局变化后预编译文件过期
+    def test_stale_header(self):
+        program = PROGRAMS[0]
+        path = self.write(program)
+        run_file(path)
+        compiled = StatementParser.compiled_path(path)
+        self.assertIsNone(StatementParser.load_compiled(compiled, program + "a = 0;\n"))
+        StatementParser.compiled_header(program)
+        layout = StatementParser.layout_version
+        try:
+            StatementParser.layout_version = "0" * len(layout)
+            self.assertIsNone(StatementParser.load_compiled(compiled, program))
+        finally:
+            StatementParser.layout_version = layout
+        self.assertIsNotNone(StatementParser.load_compiled(compiled, program))
+
+
+if __name__ == "__main__":
+    unittest.main()
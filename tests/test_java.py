@@ -0,0 +1,36 @@
+import os
+import unittest
+
+import CodeCompiler
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def example_program():
+    with open(os.path.join(root, "example.txt"), encoding="utf-8") as file:
+        text = file.read()
+    return text[text.index("public class"):text.rindex('}";') + 1]
+
+
+class JavaSourceTest(unittest.TestCase):
+    # example.txt 中的程序直接使用载入的上下文 input：加入其静态字段，程序已声明的 output 保持不变
+    def test_example_declares_context_in(self):
+        program = example_program()
+        source = CodeCompiler.java_source(program, [["input", 0]], [["output", "int"]])
+        self.assertIn("static int input;", source)
+        self.assertNotIn("static int output;", source)
+        self.assertEqual(source.replace("\n    static int input;", "", 1), program)
+
+    # 未声明的载出上下文按声明的类型加入字段，run 方法的参数不再重复声明
+    def test_declarations(self):
+        program = "public class A {\n    public static void run(int x) {\n        y = x;\n    }\n}"
+        source = CodeCompiler.java_source(program, [["x", 1]], [["y", "real"], ["z", "text"]])
+        self.assertNotIn("static int x;", source)
+        self.assertIn("static double y;", source)
+        self.assertIn("static String z;", source)
+        # 源代码只取决于上下文的名称与类型，不同的值复用同一编译结果
+        self.assertEqual(CodeCompiler.java_source(program, [["x", 2]], [["y", 3.5], ["z", "text"]]), source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import CodeCompiler
+import Optimizer
+from Diagnostics import diagnostics, ERROR
+
+# 含常量表达式、条件为常量的分支、循环不变表达式与无用表达式语句的程序，以及求值出错时不能折叠的程序
+PROGRAMS = [
+    "int a = 2 * 3 + 4;\nreal r = 1.5 * 2;\ntext t = \"a\" + \"b\";\nint b = a * (60 * 60 - 1);\n",
+    ("int i = 0;\nint s = 0;\nint k = 7;\nwhile (i < 30) {\ns = s + k * 3 + (k - 1) * 2;\nif (1 < 2) {\ns = s + 1;\n"
+     "} else {\ns = s - 1;\n}\ns + k;\ni = i + 1;\n}\n"),
+    "int x = 1;\nif (2 < 1) {\nx = 2;\n} else {\nx = 3;\n}\nwhile (1 > 2) {\nx = 4;\n}\n",
+    "int y = 1;\nint z = 0;\nz = y / (1 - 1);\nz = missing + 1;\n",
+]
+
+
+def run(program, engine="tree", optimizer=None):
+    interpreter = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable(), engine=engine)
+    interpreter.debug = False
+    interpreter.print_text = False
+    interpreter.optimizer = optimizer
+    interpreter.parse_program(program)
+    with diagnostics.collect(ERROR) as sink:
+        interpreter.exec_root()
+    table = interpreter.symbol_table
+    return {name: (table.types[i], table.values[i]) for name, i in table.slots.items()}, len(sink.errors())
+
+
+class OptimizerTest(unittest.TestCase):
+    # 每个优化遍单独启用以及全部启用时，两种执行引擎的结果（包括错误数）都与不优化的树遍历解释器相同
+    def test_passes_match_tree(self):
+        names = [p.name for p in Optimizer.PassManager().passes]
+        for program in PROGRAMS:
+            expected = run(program)
+            for enabled in [[name] for name in names] + [names]:
+                for engine in ("tree", "vm"):
+                    optimizer = Optimizer.PassManager()
+                    for name in names: optimizer.enable(name, name in enabled)
+                    self.assertEqual(run(program, engine, optimizer), expected, "%s %s" % (engine, enabled))
+
+    # 各优化遍确实处理了程序，关闭的优化遍不执行
+    def test_enable(self):
+        optimizer = Optimizer.PassManager()
+        self.assertTrue(optimizer.enable("loop-invariant", False))
+        self.assertFalse(optimizer.enable("missing"))
+        run(PROGRAMS[1], optimizer=optimizer)
+        self.assertNotIn("loop-invariant", optimizer.stats)
+        self.assertGreater(optimizer.stats["constant-folding"], 0)
+        self.assertGreater(optimizer.stats["dead-branch"], 0)
+        self.assertGreater(optimizer.stats["no-op"], 0)
+        optimizer = Optimizer.PassManager()
+        run(PROGRAMS[1], optimizer=optimizer)
+        self.assertGreater(optimizer.stats["loop-invariant"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+import CodeCompiler
+import Profiler
+from Diagnostics import diagnostics, ERROR
+
+
+class ProfilerTest(unittest.TestCase):
+    # 匿名代码块没有行号，统计表与火焰图中显示为 -
+    def test_statement_without_position(self):
+        for engine in ("tree", "vm"):
+            interpreter = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable(), engine=engine)
+            interpreter.debug = False
+            interpreter.print_text = False
+            interpreter.parse_program("int x = 1;\n{\nx = 2;\n}\n")
+            profiler = Profiler.Profiler()
+            interpreter.set_profiler(profiler)
+            with diagnostics.collect(ERROR):
+                interpreter.exec_root()
+            for sort in ("count", "inclusive", "exclusive", "expression", "sync"):
+                lines = profiler.report(sort).split("\n")
+                self.assertEqual(len(lines), 3)
+                self.assertIn("-", [line.split()[0] for line in lines[1:]])
+            self.assertIn("line -: {", profiler.collapsed())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+import CodeCompiler
+import StatementParser
+from Diagnostics import diagnostics, ERROR
+
+BASE = ("int a = 1;\n// 注释 { 不影响切分\nint i = 0;\nwhile (i < 5) {\na = a + i;\ni = i + 1;\n}\n"
+        "text t = \"} ; {\";\nif (a > 3) {\na = a * 2;\n}\nelse {\na = 0;\n}\n{\nint b = a;\n}\nreal r = a / 2;\n")
+
+# 依次在前一版本上修改：改一行、在开头插入、删除循环体中的语句、在复合语句中间修改、引入语法错误、再改回
+EDITS = [
+    BASE,
+    BASE.replace("int a = 1;", "int a = 2;"),
+    "int z = 9;\n" + BASE.replace("int a = 1;", "int a = 2;"),
+    "int z = 9;\n" + BASE.replace("int a = 1;", "int a = 2;").replace("a = a + i;\n", ""),
+    BASE.replace("a = a * 2;", "a = a * 3;"),
+    BASE.replace("a = a * 2;", "a = a * ;"),
+    BASE,
+]
+
+
+def positions(statements):
+    result = []
+    for statement in statements or ():
+        result.append((type(statement).__name__, statement.position, statement.text))
+        if type(statement) in (StatementParser.IfStatement, StatementParser.WhileStatement):
+            result.extend(positions(statement.main_block))
+            if type(statement) is StatementParser.IfStatement: result.extend(positions(statement.else_block))
+        elif type(statement) is StatementParser.BlockStatement:
+            result.extend(positions(statement.statements))
+    return result
+
+
+def run(program, cache=None):
+    interpreter = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable())
+    interpreter.debug = False
+    interpreter.print_text = False
+    if cache is not None:
+        interpreter.statement_cache = cache
+        interpreter.parse_program(program)
+    else:
+        interpreter.load_statements(CodeCompiler.get_parser().exec(program, quiet=True, tree=False) or None)
+    listing = positions(interpreter.root.statements)
+    with diagnostics.collect(ERROR) as sink:
+        interpreter.exec_root()
+    table = interpreter.symbol_table
+    # 代码块变量的值是语句对象，按文本比较
+    values = {name: (table.types[i], getattr(table.values[i], "text", table.values[i]))
+              for name, i in table.slots.items()}
+    return values, listing, len(sink.errors())
+
+
+class IncrementalReparseTest(unittest.TestCase):
+    # 每次修改后增量解析并执行，语句、行号与执行结果都与整体重新解析相同
+    def test_edits_match_full_parse(self):
+        cache = StatementParser.StatementCache()
+        for k, program in enumerate(EDITS):
+            with diagnostics.collect(ERROR):
+                expected = run(program)
+                actual = run(program, cache)
+            self.assertEqual(actual, expected, "edit %d" % k)
+
+    # 只重新分析修改过的语句
+    def test_reuse(self):
+        cache = StatementParser.StatementCache()
+        run(EDITS[0], cache)
+        self.assertEqual(cache.reused, 0)
+        run(EDITS[1], cache)
+        self.assertEqual(cache.parsed, 1)
+        self.assertEqual(cache.reused, len(CodeCompiler.get_parser().exec(EDITS[1], tree=False)) - 1)
+        run(EDITS[2], cache)
+        self.assertEqual(cache.parsed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
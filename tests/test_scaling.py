@@ -0,0 +1,40 @@
+import gc
+import time
+import unittest
+
+import Benchmark
+import CodeCompiler
+
+
+# 解析生成的程序，返回顶层语句数与每条语句的耗时（秒）；计时期间暂停垃圾回收，减少抖动
+def parse(size, tree):
+    data, count = Benchmark.generated_program(size)
+    parser = CodeCompiler.get_parser()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = parser.exec(data, quiet=True, tree=tree)
+        cost = time.perf_counter() - start
+    finally:
+        if enabled: gc.enable()
+    parsed = len(result.child if tree else result)
+    del result
+    return parsed, count, cost / count
+
+
+class ParserScalingTest(unittest.TestCase):
+    # 十万条语句的程序：语句数正确，每条语句的耗时与小程序相近（二次方的实现会慢数十倍），且有宽松的绝对上限
+    def test_100k_statements(self):
+        for tree in (False, True):
+            parsed, count, small = parse(5000, tree)
+            self.assertEqual(parsed, count)
+            parsed, count, large = parse(100000, tree)
+            self.assertEqual(parsed, count)
+            self.assertEqual(count, 100000)
+            self.assertLess(large, max(small, 50e-6) * 5, "tree=%s" % tree)
+            self.assertLess(large, 2e-3, "tree=%s" % tree)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import CodeCompiler
+from Diagnostics import diagnostics, ERROR
+
+
+def run(program, engine):
+    interpreter = CodeCompiler.Interpreter(CodeCompiler.MySymbolTable(), engine=engine)
+    interpreter.debug = False
+    interpreter.print_text = False
+    interpreter.parse_program(program)
+    with diagnostics.collect(ERROR) as sink:
+        interpreter.exec_root()
+    return interpreter, [str(event) for event in sink.errors()]
+
+
+class TypeInferenceTest(unittest.TestCase):
+    # int 变量可能保存实数，赋值后又保存整数：变量的类型由声明与赋值共同决定，赋值给 real 变量时仍需检查
+    def test_assignment_widens_type(self):
+        program = "int q = 2.5;\nq = 3;\nreal x = 1.5;\nx = q;\n"
+        for engine in ("tree", "vm"):
+            interpreter, errors = run(program, engine)
+            self.assertEqual(interpreter.symbol_table.read("x"), 1.5)
+            self.assertIn("编译错误-赋值语句错误-类型不匹配", errors)
+
+    # 类型确定的赋值与条件只按一种模式求值
+    def test_proven_assignments(self):
+        program = ("int i = 0;\nreal r = 0.5;\ntext t = \"a\";\nwhile (i < 3) {\nif (t) {\nt = t + \"b\";\n}\n"
+                   "r = r + i;\ni = i + 1;\n}\n")
+        for engine in ("tree", "vm"):
+            interpreter, errors = run(program, engine)
+            self.assertEqual(errors, [])
+            self.assertEqual(interpreter.symbol_table.read("r"), 3.5)
+            self.assertEqual(interpreter.symbol_table.read("t"), "\"abbb\"")
+        codes = [instruction[0] for instruction in interpreter.vm.code]
+        self.assertNotIn(CodeCompiler.OP_ASSIGN, codes)
+        branches = [instruction[1] for instruction in interpreter.vm.code if instruction[0] == CodeCompiler.OP_BRANCH]
+        self.assertTrue(all(len(evaluators) == 1 for evaluators in branches))
+
+
+if __name__ == "__main__":
+    unittest.main()